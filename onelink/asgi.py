@@ -3,6 +3,9 @@ ASGI config for the onelink project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with e.g. ``uvicorn onelink.asgi:application --workers 4`` and set
+PUBLIC_PROFILE_ASYNC=1 so public profile pages use the native async view.
+
 For more details, see:
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -42,6 +42,10 @@ ALLOWED_HOSTS = [
     ".herokuapp.com",
 ]
 
+# Canonical origin for absolute URLs on cached pages, e.g. share links.
+# Never taken from the request, whose Host would be cached for everyone.
+SITE_URL = os.environ.get("SITE_URL", "http://localhost:8000").rstrip("/")
+
 
 # -------------------------
 # Installed Apps
@@ -63,13 +67,16 @@ INSTALLED_APPS = [
 # Middleware
 # -------------------------
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    "profiles.metrics.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "profiles.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "profiles.middleware.current_profile_middleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -110,6 +117,10 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"
     },
+    # Zipped account exports (`manage.py export_account --archive`)
+    "exports": {
+        "BACKEND": "cloudinary_storage.storage.RawMediaCloudinaryStorage"
+    },
 }
 
 MESSAGE_STORAGE = (
@@ -133,6 +144,150 @@ DATABASES = {
 }
 
 
+# -------------------------
+# Cache
+# -------------------------
+# Local memory by default; point CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache (LOCATION = a
+# directory) or django.core.cache.backends.db.DatabaseCache (LOCATION =
+# a table made with `createcachetable`) to share it between workers.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "onelink"),
+    }
+}
+
+PROFILE_CACHE_ALIAS = "default"
+PROFILE_PAGE_CACHE_TIMEOUT = int(
+    os.environ.get("PROFILE_PAGE_CACHE_TIMEOUT", 300)
+)
+
+# Cache-Control max-age for public profile pages. They are sent as
+# "public" so CDNs and proxies may store them; the default of 0 has
+# every hit revalidated (a cheap 304), so edits show up immediately.
+PUBLIC_PROFILE_MAX_AGE = int(os.environ.get("PUBLIC_PROFILE_MAX_AGE", 0))
+
+# Per-worker handle -> profile id resolver (profiles.cache.HandleCache)
+HANDLE_CACHE_MAX_SIZE = 10_000
+HANDLE_CACHE_TTL = 300
+HANDLE_CACHE_NEGATIVE_TTL = 60
+
+# Per-worker Bloom filter of taken handles behind the live availability
+# check (profiles.handles.HandleIndex): seconds between picking up other
+# workers' changes, and between full rebuilds (which drop freed handles)
+HANDLE_INDEX_REFRESH = 30
+HANDLE_INDEX_REBUILD = 3600
+
+# Results per page of the profile directory search / handle autocomplete
+SEARCH_RESULTS_LIMIT = 20
+AUTOCOMPLETE_LIMIT = 10
+# Full-text matches ranked per search; bounds the cost of broad queries
+SEARCH_MAX_CANDIDATES = 5000
+
+# Read-only JSON API (/api/v1/): Cache-Control max-age of its responses,
+# and the most handles one batch request may ask for
+API_MAX_AGE = 60
+API_BATCH_LIMIT = 100
+
+# Most links accepted by one bulk import (view or import_links command)
+LINK_IMPORT_MAX_ROWS = 500
+
+# Seconds each worker buffers link clicks before writing them
+LINK_CLICK_FLUSH_INTERVAL = int(
+    os.environ.get("LINK_CLICK_FLUSH_INTERVAL", 30)
+)
+
+
+# Raw view/click events older than this are pruned by rollup_analytics
+ANALYTICS_RAW_RETENTION_DAYS = int(
+    os.environ.get("ANALYTICS_RAW_RETENTION_DAYS", 30)
+)
+# How far back each rollup re-aggregates to catch late buffered events
+ANALYTICS_LATE_EVENT_GRACE = 900
+
+
+# -------------------------
+# Admin
+# -------------------------
+# Changelists count rows exactly up to this many; past it they page
+# through planner estimates (PostgreSQL) or stop counting (elsewhere).
+# See profiles.admin.EstimatedCountPaginator.
+ADMIN_EXACT_COUNT_LIMIT = 10_000
+
+
+# -------------------------
+# Background jobs (profiles.jobs, run by `manage.py run_jobs`)
+# -------------------------
+# Seconds a claimed job may run before another worker may take it over
+JOB_VISIBILITY_TIMEOUT = 300
+# Retry n waits about JOB_RETRY_BASE_DELAY * 2**(n-1), capped
+JOB_RETRY_BASE_DELAY = 10
+JOB_RETRY_MAX_DELAY = 3600
+# Finished jobs (and their idempotency keys) are kept this long
+JOB_RETENTION_DAYS = 7
+# Jobs the workers enqueue themselves: {name: interval in seconds}
+JOB_SCHEDULE = {
+    "profiles.rollup_analytics": 3600,
+    "profiles.check_links": 3600,
+}
+
+
+# -------------------------
+# Dead-link checker (profiles.linkcheck, `manage.py check_links`)
+# -------------------------
+# Links are re-checked once this many seconds have passed, at most
+# LINK_CHECK_BATCH per scheduled job run
+LINK_CHECK_INTERVAL = 86400
+LINK_CHECK_BATCH = 2000
+# Concurrent requests overall, and per host; the starts of requests to
+# one host are spaced at least LINK_CHECK_HOST_INTERVAL seconds apart
+LINK_CHECK_WORKERS = 8
+LINK_CHECK_PER_HOST = 2
+LINK_CHECK_HOST_INTERVAL = 1.0
+LINK_CHECK_TIMEOUT = 10
+# A URL's result is reused for this long, however many links share it
+LINK_CHECK_CACHE_TTL = 3600
+# Never fetch URLs resolving to loopback/private addresses (tests only)
+LINK_CHECK_ALLOW_PRIVATE = False
+
+
+# -------------------------
+# Pre-rendered profiles (`manage.py prerender_profiles`)
+# -------------------------
+# Output tree of @<handle>/index.html (+ .gz/.br) pages for the front
+# proxy to serve directly, and the site URL their share links point at.
+PRERENDER_ROOT = os.environ.get("PRERENDER_ROOT") or BASE_DIR / "prerendered"
+PRERENDER_BASE_URL = os.environ.get("PRERENDER_BASE_URL", SITE_URL)
+
+
+# -------------------------
+# ASGI
+# -------------------------
+# Route public profile pages to the native async view. Only worth it when
+# served by an ASGI server (see onelink/asgi.py); under WSGI it would run
+# each request through an event loop for nothing.
+PUBLIC_PROFILE_ASYNC = os.environ.get("PUBLIC_PROFILE_ASYNC") == "1"
+
+
+# -------------------------
+# Metrics
+# -------------------------
+# Each worker keeps its own counters. Under gunicorn, point METRICS_DIR at
+# a directory writable by all workers (emptied on deploy) and each one
+# writes a snapshot there every METRICS_WRITE_INTERVAL seconds, so
+# /metrics/ reports the sum over all workers whichever one serves it.
+METRICS_DIR = os.environ.get("METRICS_DIR") or None
+METRICS_WRITE_INTERVAL = 10
+
+# /metrics/ is open to staff sessions, or to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>" when this is set.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+
+
 # -------------------------
 # CSRF Trusted Origins
 # -------------------------
@@ -190,6 +345,17 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+# Mixed into public page ETags and cache keys (profiles.assets.build_version)
+# so a deploy invalidates them. Defaults to a hash of the templates and the
+# static manifest; set it (e.g. to the release's commit) to skip hashing.
+BUILD_VERSION = os.environ.get("BUILD_VERSION", "")
+# Upstream TTFs that `manage.py build_assets` subsets into static/fonts/
+# (see profiles.assets.FONT_FACES). Pages use those self-hosted files once
+# built; until then they load the same faces from Google Fonts without
+# blocking render, or use site.css's system fonts with
+# GOOGLE_FONTS_FALLBACK=0.
+FONTS_SRC_DIR = os.environ.get("FONTS_SRC_DIR") or BASE_DIR / "fonts"
+GOOGLE_FONTS_FALLBACK = os.environ.get("GOOGLE_FONTS_FALLBACK", "1") == "1"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
@@ -207,6 +373,19 @@ CLOUDINARY_STORAGE = {
 }
 
 
+# -------------------------
+# Authentication
+# -------------------------
+# ProfileModelBackend loads request.user and its profile in one query and
+# handles every login; a failed one stops there (no second hash). The
+# stock ModelBackend stays listed only so sessions stored with its path
+# (from before the switch) remain signed in until they expire.
+AUTHENTICATION_BACKENDS = [
+    "profiles.backends.ProfileModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+
 # -------------------------
 # Authentication Redirects
 # -------------------------
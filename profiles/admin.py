@@ -1,13 +1,125 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Profile, Link
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.utils.functional import cached_property
+
+from .models import Job, Profile, Link
+from .search import _handles_starting_with
+
+
+# ---------- Scaling helpers ----------
+
+
+def estimated_row_count(model):
+    """
+    The planner's row estimate for ``model``'s table, or None where the
+    database keeps none (or hasn't analyzed the table yet).
+    """
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 until the first ANALYZE on PostgreSQL 14+, 0 before on older ones
+    return row[0] if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    An unfiltered changelist of a table the planner thinks is bigger than
+    ADMIN_EXACT_COUNT_LIMIT shows the planner's estimate. Anything else is
+    counted exactly, but only up to that limit: past it the count (and so
+    the last reachable page) stops at limit + 1 rows.
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, "ADMIN_EXACT_COUNT_LIMIT", 10_000)
+        queryset = self.object_list
+        if not hasattr(queryset, "query"):
+            return len(queryset)
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset[:limit + 1].count()
+
+
+class ProfileHandleFilter(admin.SimpleListFilter):
+    """
+    Filter by a single profile, typed as a handle with suggestions from
+    the admin's profile autocomplete, instead of listing every profile.
+    """
+
+    title = "profile"
+    parameter_name = "profile"
+    template = "admin/profiles/handle_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        # For the autocomplete URL: the view checks this field's admin
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def handle(self):
+        return (self.value() or "").strip().lstrip("@").lower()
+
+    def choices(self, changelist):
+        yield {
+            "value": self.handle(),
+            "clear_url": changelist.get_query_string(remove=[self.parameter_name]),
+            # Kept across a new search; the page number is reset
+            "hidden": [
+                (name, value)
+                for name, value in changelist.params.items()
+                if name not in (self.parameter_name, "p")
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if self.handle():
+            return queryset.filter(profile__handle=self.handle())
+        return queryset
+
+
+# ---------- Admins ----------
 
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "handle", "display_name", "created_at")
+    list_select_related = ("user",)
     search_fields = ("handle", "display_name", "user__username")
     list_filter = ("created_at",)
     ordering = ("handle",)
+    autocomplete_fields = ("user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip().lower()
+        if term.startswith("@"):
+            # "@handle": one lookup on the handle's unique index
+            return queryset.filter(handle=term[1:]), False
+        if "field_name" in request.GET:
+            # Autocomplete widgets (and ProfileHandleFilter) search by
+            # handle prefix: an index range scan, not a LIKE '%term%'
+            prefix = term.lstrip("@")
+            return queryset & _handles_starting_with(prefix), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(Link)
@@ -18,9 +130,42 @@ class LinkAdmin(admin.ModelAdmin):
         "title",
         "url",
         "position",
+        "click_count",
+        "check_status",
+        "checked_at",
         "created_at",
     )
-    list_filter = ("profile",)
-    search_fields = ("title", "url", "profile__handle")
+    list_select_related = ("profile",)
+    list_filter = (ProfileHandleFilter, "checked_at")
+    search_fields = ("title", "url")
     ordering = ("profile", "position", "id")
-    list_editable = ("position",)
\ No newline at end of file
+    list_editable = ("position",)
+    autocomplete_fields = ("profile",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip().lower()
+        if term.startswith("@"):
+            # "@handle": that profile's links, through the handle index
+            return queryset.filter(profile__handle=term[1:]), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "name",
+        "status",
+        "attempts",
+        "run_at",
+        "locked_by",
+        "finished_at",
+    )
+    list_filter = ("status", "name")
+    search_fields = ("name", "idempotency_key")
+    ordering = ("-id",)
+    readonly_fields = ("locked_until", "locked_by", "last_error", "finished_at")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,190 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import (
+    DailyStat,
+    HourlyStat,
+    Link,
+    Profile,
+    ProfileEvent,
+    RollupCursor,
+)
+
+
+CURSOR_NAME = "profile-events"
+
+
+def _floor_hour(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _existing_ids(model, ids):
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return set()
+    return set(model.objects.filter(pk__in=ids).values_list("pk", flat=True))
+
+
+def _rebuild_hourly(start, end):
+    """Recompute HourlyStat rows for hours in [start, end) from raw events."""
+    rows = list(
+        ProfileEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(hour=TruncHour("created_at"))
+        .values("profile_id", "link_id", "kind", "hour")
+        .annotate(n=Count("id"))
+    )
+    # Events may outlive their profile or link; drop those rows
+    profiles = _existing_ids(Profile, (r["profile_id"] for r in rows))
+    links = _existing_ids(Link, (r["link_id"] for r in rows))
+
+    HourlyStat.objects.filter(bucket__gte=start, bucket__lt=end).delete()
+    HourlyStat.objects.bulk_create(
+        [
+            HourlyStat(
+                profile_id=r["profile_id"],
+                link_id=r["link_id"],
+                kind=r["kind"],
+                bucket=r["hour"],
+                count=r["n"],
+            )
+            for r in rows
+            if r["profile_id"] in profiles
+            and (r["link_id"] is None or r["link_id"] in links)
+        ],
+        batch_size=1000,
+    )
+
+
+def _rebuild_daily(start, end):
+    """Recompute DailyStat rows for the days overlapping [start, end)."""
+    first_day = start.date()
+    last_day = (end - timedelta(microseconds=1)).date()
+    day_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=(last_day - first_day).days + 1)
+
+    rows = (
+        HourlyStat.objects.filter(bucket__gte=day_start, bucket__lt=day_end)
+        .annotate(day=TruncDate("bucket"))
+        .values("profile_id", "link_id", "kind", "day")
+        .annotate(n=Sum("count"))
+    )
+    DailyStat.objects.filter(
+        bucket__gte=first_day, bucket__lte=last_day
+    ).delete()
+    DailyStat.objects.bulk_create(
+        [
+            DailyStat(
+                profile_id=r["profile_id"],
+                link_id=r["link_id"],
+                kind=r["kind"],
+                bucket=r["day"],
+                count=r["n"],
+            )
+            for r in rows
+        ],
+        batch_size=1000,
+    )
+
+
+def rollup(now=None, grace=None, retention_days=None):
+    """
+    Incrementally aggregate raw events and prune old ones.
+
+    Only hours from the previous high-water mark (less a grace period
+    for events still sitting in worker buffers) up to now are rebuilt.
+    Each rebuild replaces its buckets outright, so re-running is safe.
+    Returns (hours rebuilt, raw rows pruned).
+    """
+    now = now or timezone.now()
+    if grace is None:
+        grace = timedelta(
+            seconds=getattr(settings, "ANALYTICS_LATE_EVENT_GRACE", 900)
+        )
+    if retention_days is None:
+        retention_days = getattr(settings, "ANALYTICS_RAW_RETENTION_DAYS", 30)
+
+    RollupCursor.objects.get_or_create(name=CURSOR_NAME)
+    hours = 0
+    with transaction.atomic():
+        # Held until commit: an overlapping run (say an overrunning job
+        # and the manual command) waits here, then starts from this
+        # run's mark instead of rebuilding the same window alongside it
+        cursor = RollupCursor.objects.select_for_update().get(name=CURSOR_NAME)
+        if cursor.rolled_up_until:
+            start = cursor.rolled_up_until - grace
+        else:
+            start = ProfileEvent.objects.aggregate(first=Min("created_at"))[
+                "first"
+            ]
+
+        if start is not None:
+            start = _floor_hour(start)
+            end = _floor_hour(now) + timedelta(hours=1)
+            _rebuild_hourly(start, end)
+            _rebuild_daily(start, end)
+            cursor.rolled_up_until = now
+            cursor.save(update_fields=["rolled_up_until", "updated_at"])
+            hours = int((end - start).total_seconds() // 3600)
+
+    # Never prune raw rows that a later run may still need to rebuild
+    cutoff = now - timedelta(days=retention_days)
+    if cursor.rolled_up_until:
+        cutoff = min(cutoff, _floor_hour(cursor.rolled_up_until - grace))
+    pruned, _ = ProfileEvent.objects.filter(created_at__lt=cutoff).delete()
+    return hours, pruned
+
+
+# ---------- Dashboard queries ----------
+
+
+def hourly_totals(profile, hours=48, now=None):
+    """Profile-wide views/clicks per hour for the last ``hours`` hours."""
+    now = now or timezone.now()
+    since = _floor_hour(now) - timedelta(hours=hours - 1)
+    return _totals(HourlyStat.objects, profile, since)
+
+
+def daily_totals(profile, days=30, now=None):
+    """Profile-wide views/clicks per day for the last ``days`` days."""
+    now = now or timezone.now()
+    since = now.date() - timedelta(days=days - 1)
+    return _totals(DailyStat.objects, profile, since)
+
+
+def _totals(manager, profile, since):
+    totals = {}
+    rows = (
+        manager.filter(profile=profile, bucket__gte=since)
+        .values("bucket", "kind")
+        .annotate(n=Sum("count"))
+        .order_by("bucket")
+    )
+    for r in rows:
+        bucket = totals.setdefault(
+            r["bucket"],
+            {"bucket": r["bucket"], "views": 0, "clicks": 0},
+        )
+        bucket["views" if r["kind"] == ProfileEvent.VIEW else "clicks"] = r["n"]
+    return list(totals.values())
+
+
+def link_click_totals(profile, days=30, now=None):
+    """Clicks per link over the last ``days`` days, busiest first."""
+    now = now or timezone.now()
+    since = now.date() - timedelta(days=days - 1)
+    return list(
+        DailyStat.objects.filter(
+            profile=profile,
+            kind=ProfileEvent.CLICK,
+            link__isnull=False,
+            bucket__gte=since,
+        )
+        .values("link_id", "link__title", "link__url")
+        .annotate(clicks=Sum("count"))
+        .order_by("-clicks")
+    )
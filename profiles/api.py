@@ -0,0 +1,124 @@
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.http import quote_etag
+
+from .cache import _page_cache, profile_api_key
+from .models import Link, Profile
+
+
+API_VERSION = "v1"
+
+PROFILE_FIELDS = (
+    "id", "handle", "display_name", "bio", "profile_image",
+    "updated_at", "links_updated_at",
+)
+LINK_FIELDS = ("id", "profile_id", "title", "url", "position")
+
+
+def batch_limit():
+    return getattr(settings, "API_BATCH_LIMIT", 100)
+
+
+def _entry(row, links):
+    """Cache entry for one profile: its JSON payload plus validators."""
+    changed = max(filter(None, [row["updated_at"], row["links_updated_at"]]))
+    raw = ":".join(
+        [
+            API_VERSION,
+            str(row["id"]),
+            row["handle"],
+            row["updated_at"].isoformat(),
+            row["links_updated_at"].isoformat()
+            if row["links_updated_at"]
+            else "",
+        ]
+    )
+    image = row["profile_image"]
+    return {
+        "etag": hashlib.md5(raw.encode()).hexdigest(),
+        "last_modified": int(changed.timestamp()),
+        "data": {
+            "handle": row["handle"],
+            "display_name": row["display_name"],
+            "bio": row["bio"],
+            "url": reverse("profile-detail", args=[row["handle"]]),
+            "avatar": (
+                Profile._meta.get_field("profile_image").storage.url(image)
+                if image
+                else None
+            ),
+            "updated_at": changed.isoformat(),
+            "links": [
+                {
+                    "id": link["id"],
+                    "title": link["title"],
+                    "url": link["url"],
+                    "position": link["position"],
+                }
+                for link in links
+            ],
+        },
+    }
+
+
+def _load(handles):
+    """
+    Entries for whichever ``handles`` exist, in two queries however many
+    there are: the profiles, then all of their links. Rows are plain
+    values() dicts; no model instances are built.
+    """
+    rows = list(
+        Profile.objects.filter(handle__in=handles).values(*PROFILE_FIELDS)
+    )
+    links = defaultdict(list)
+    if rows:
+        for link in (
+            Link.objects.filter(profile_id__in=[row["id"] for row in rows])
+            .order_by("profile_id", "position", "id")
+            .values(*LINK_FIELDS)
+        ):
+            links[link["profile_id"]].append(link)
+    return {row["handle"]: _entry(row, links[row["id"]]) for row in rows}
+
+
+def get_entries(handles):
+    """
+    {handle: entry} for the existing profiles among ``handles``.
+
+    Entries are cached per handle in the page cache and dropped with the
+    public page whenever the profile or its links change, so hits need no
+    query and misses cost two queries in total. Unknown handles are
+    cached (as None) for HANDLE_CACHE_NEGATIVE_TTL seconds.
+    """
+    cache = _page_cache()
+    keys = {profile_api_key(handle): handle.lower() for handle in handles}
+    found = {keys[key]: entry for key, entry in cache.get_many(keys).items()}
+    missing = [handle for handle in keys.values() if handle not in found]
+    if missing:
+        loaded = _load(missing)
+        cache.set_many(
+            {profile_api_key(h): entry for h, entry in loaded.items()},
+            getattr(settings, "PROFILE_PAGE_CACHE_TIMEOUT", 300),
+        )
+        cache.set_many(
+            {profile_api_key(h): None for h in missing if h not in loaded},
+            getattr(settings, "HANDLE_CACHE_NEGATIVE_TTL", 60),
+        )
+        found.update(loaded)
+    return {handle: entry for handle, entry in found.items() if entry}
+
+
+def combined_validators(entries):
+    """ETag and Last-Modified for a response made of several entries."""
+    if not entries:
+        return quote_etag(hashlib.md5(b"").hexdigest()), None
+    digest = hashlib.md5()
+    for entry in entries:
+        digest.update(entry["etag"].encode())
+    return (
+        quote_etag(digest.hexdigest()),
+        max(entry["last_modified"] for entry in entries),
+    )
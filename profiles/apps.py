@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProfilesConfig(AppConfig):
@@ -6,4 +7,6 @@ class ProfilesConfig(AppConfig):
     name = "profiles"
 
     def ready(self):
-        from . import signals  # noqa
\ No newline at end of file
+        from . import signals  # noqa
+
+        post_migrate.connect(signals.repair_search_index, sender=self)
\ No newline at end of file
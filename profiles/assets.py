@@ -0,0 +1,256 @@
+import functools
+import hashlib
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+
+CRITICAL_CSS_PATH = "css/critical/profile.css"
+
+# Markup the public page gains after load (the signed-in nav, login status
+# and flash messages fetched by app.js); their rules are inlined too so
+# they don't flash unstyled while site.css is still on its way.
+CRITICAL_SAFELIST = {
+    "tags": {"li", "a", "span", "div", "ul"},
+    "classes": {"alerts", "alert", "success", "error", "info", "warning",
+                "login-status", "logged-in", "logged-out", "dot", "label"},
+    "ids": {"profile-link"},
+}
+
+# Self-hosted faces. Sources are the upstream TTFs (SIL OFL), placed in
+# FONTS_SRC_DIR (or --fonts-src) when running build_assets; the subset
+# woff2 files land in static/fonts/. Until they're built, pages load the
+# same faces from Google Fonts (unless GOOGLE_FONTS_FALLBACK is off).
+FONT_FACES = [
+    {
+        "family": "Montserrat",
+        "weight": "400 700",
+        "source": "Montserrat[wght].ttf",
+        # site.css only uses 400-700; pinning the axis range drops the rest
+        "axes": {"wght": (400, 700)},
+        "output": "fonts/montserrat-latin.woff2",
+    },
+    {
+        "family": "Lato",
+        "weight": "700",
+        "source": "Lato-Bold.ttf",
+        "output": "fonts/lato-700-latin.woff2",
+    },
+]
+
+# Google Fonts' "latin" range
+LATIN_UNICODES = (
+    "U+0000-00FF,U+0131,U+0152-0153,U+02BB-02BC,U+02C6,U+02DA,U+02DC,"
+    "U+0304,U+0308,U+0329,U+2000-206F,U+20AC,U+2122,U+2191,U+2193,"
+    "U+2212,U+2215,U+FEFF,U+FFFD"
+)
+
+
+# ---------- Reading built assets ----------
+
+
+def _static_file(path):
+    """Filesystem path of a static file, collected or not, or None."""
+    try:
+        name = staticfiles_storage.stored_name(path)
+        if staticfiles_storage.exists(name):
+            return staticfiles_storage.path(name)
+    except (ValueError, NotImplementedError):
+        pass  # not in the manifest (yet): look in the source dirs
+    return finders.find(path)
+
+
+@functools.lru_cache(maxsize=None)
+def read_static(path):
+    """Text of a static file, read once per process; '' if missing."""
+    found = _static_file(path)
+    return Path(found).read_text(encoding="utf-8") if found else ""
+
+
+@functools.lru_cache(maxsize=None)
+def built_font_faces():
+    """The FONT_FACES whose subset woff2 has been built."""
+    return [face for face in FONT_FACES if _static_file(face["output"])]
+
+
+@functools.lru_cache(maxsize=None)
+def build_version():
+    """
+    Identifies the deployed templates and static files, once per process:
+    BUILD_VERSION if set, otherwise a hash of the template sources and
+    the collected static file names they link to.
+    """
+    version = getattr(settings, "BUILD_VERSION", "")
+    if version:
+        return version
+    digest = hashlib.md5()
+    for directory in settings.TEMPLATES[0]["DIRS"]:
+        for path in sorted(Path(directory).rglob("*.html")):
+            digest.update(str(path.relative_to(directory)).encode())
+            digest.update(path.read_bytes())
+    digest.update(getattr(staticfiles_storage, "manifest_hash", "").encode())
+    return digest.hexdigest()
+
+
+# ---------- Fonts ----------
+
+
+def subset_fonts(src_dir, out_dir):
+    """
+    Subset every FONT_FACES source found in ``src_dir`` to the Latin
+    range as woff2 under ``out_dir``. Returns the outputs written.
+    """
+    from fontTools import subset
+    from fontTools.varLib import instancer
+
+    written = []
+    for face in FONT_FACES:
+        source = Path(src_dir) / face["source"]
+        if not source.exists():
+            continue
+        target = Path(out_dir) / face["output"]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        options = subset.Options()
+        options.flavor = "woff2"
+        options.layout_features = ["kern", "liga", "calt"]
+        options.name_IDs = ["*"]
+        font = subset.load_font(str(source), options)
+        if face.get("axes") and "fvar" in font:
+            font = instancer.instantiateVariableFont(font, face["axes"])
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=subset.parse_unicodes(LATIN_UNICODES))
+        subsetter.subset(font)
+        subset.save_font(font, str(target), options)
+        written.append(face["output"])
+    return written
+
+
+# ---------- Critical CSS ----------
+
+
+class _UsedSelectors(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tags, self.classes, self.ids = {"html", "body"}, set(), set()
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        for name, value in attrs:
+            if name == "class" and value:
+                self.classes.update(value.split())
+            elif name == "id" and value:
+                self.ids.add(value)
+
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_PSEUDO_ARGS = re.compile(r"\((?:[^()]|\([^()]*\))*\)")
+_ATTRIBUTE = re.compile(r"\[[^\]]*\]")
+_TOKEN = re.compile(r"([.#]?)(-?[_a-zA-Z][-_a-zA-Z0-9]*|\*)")
+_NESTED_AT_RULES = ("@media", "@supports", "@layer", "@container")
+
+
+def _matching_brace(css, start):
+    depth = 0
+    for i in range(start, len(css)):
+        if css[i] == "{":
+            depth += 1
+        elif css[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(css) - 1
+
+
+def _selector_used(selector, used):
+    # Pseudo-classes/elements and attribute tests don't decide whether
+    # the element exists, so only tags, classes and ids are checked.
+    stripped = _ATTRIBUTE.sub("", _PSEUDO_ARGS.sub("", selector))
+    stripped = re.sub(r"::?[-a-zA-Z]+", "", stripped)
+    for prefix, name in _TOKEN.findall(stripped):
+        if name == "*":
+            continue
+        if prefix == "." and name not in used.classes:
+            return False
+        if prefix == "#" and name not in used.ids:
+            return False
+        if not prefix and name.lower() not in used.tags:
+            return False
+    return True
+
+
+def _critical_rules(css, used):
+    out, pos = [], 0
+    while pos < len(css):
+        brace = css.find("{", pos)
+        semi = css.find(";", pos)
+        if brace == -1:
+            break
+        if semi != -1 and semi < brace:
+            statement = css[pos:semi].strip()
+            if statement.startswith("@charset"):
+                out.append(statement + ";")
+            pos = semi + 1
+            continue
+        prelude = " ".join(css[pos:brace].split())
+        end = _matching_brace(css, brace)
+        body = css[brace + 1:end]
+        pos = end + 1
+
+        if prelude.startswith(_NESTED_AT_RULES):
+            inner = _critical_rules(body, used)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            continue  # @keyframes, @font-face, @page: not needed up front
+        else:
+            selectors = [
+                s.strip() for s in prelude.split(",")
+                if s.strip() and _selector_used(s, used)
+            ]
+            declarations = ";".join(
+                " ".join(d.split()) for d in body.split(";") if d.strip()
+            )
+            if selectors and declarations:
+                out.append(f"{','.join(selectors)}{{{declarations}}}")
+    return "".join(out)
+
+
+def extract_critical_css(html, css):
+    """
+    The subset of ``css`` whose selectors match elements in ``html``
+    (plus CRITICAL_SAFELIST), whitespace-collapsed, ready to inline.
+    """
+    used = _UsedSelectors()
+    used.feed(html)
+    used.tags |= CRITICAL_SAFELIST["tags"]
+    used.classes |= CRITICAL_SAFELIST["classes"]
+    used.ids |= CRITICAL_SAFELIST["ids"]
+    return _critical_rules(_COMMENT.sub("", css), used)
+
+
+def render_sample_profile_page():
+    """Render profile_detail.html for a representative, unsaved profile."""
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+
+    from .models import Link, Profile
+
+    profile = Profile(
+        handle="sample_user",
+        display_name="Sample User",
+        bio="A short bio.",
+    )
+    links = [
+        Link(pk=n, title=f"Link {n}", url="https://example.com")
+        for n in (1, 2)
+    ]
+    request = RequestFactory().get("/@sample_user", HTTP_HOST="localhost")
+    return render_to_string(
+        "profiles/profile_detail.html",
+        {"profile": profile, "links": links, "public_page": True},
+        request=request,
+    )
@@ -0,0 +1,263 @@
+import gc
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from .cache import handle_cache
+from .metrics import _QueryTimer
+from .models import Profile
+from .provisioning import provision_batch
+from .tracking import tracking_buffer
+
+
+PASSWORD = "bench-Passw0rd!"
+
+# Relative slack allowed against a baseline before a number counts as a
+# regression. Query counts are deterministic and get no slack.
+DEFAULT_TOLERANCE = 0.25
+
+
+def seed(profiles, links_per_profile, batch_size=500):
+    """
+    Create ``profiles`` accounts (bench1, bench2, ...) with
+    ``links_per_profile`` links each, all sharing PASSWORD.
+    """
+    password = make_password(PASSWORD)  # hash once, not per account
+    records = (
+        {
+            "username": f"bench{n}",
+            "password": password,
+            "handle": f"bench{n}",
+            "links": [
+                {"title": f"Link {i}", "url": f"https://example.com/{n}/{i}"}
+                for i in range(1, links_per_profile + 1)
+            ],
+        }
+        for n in range(1, profiles + 1)
+    )
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            provision_batch(batch)
+            batch = []
+    if batch:
+        provision_batch(batch)
+
+
+def _editor_post_data(client):
+    """Build an editor submission from the GET page's own formset."""
+    response = client.get(reverse("link-list"))
+    profile, formset = response.context["profile"], response.context["formset"]
+    data = {
+        "display_name": profile.display_name,
+        "handle": profile.handle,
+        "bio": profile.bio or "",
+        f"{formset.prefix}-TOTAL_FORMS": str(len(formset.forms)),
+        f"{formset.prefix}-INITIAL_FORMS": str(formset.initial_form_count()),
+        f"{formset.prefix}-MIN_NUM_FORMS": "0",
+        f"{formset.prefix}-MAX_NUM_FORMS": "1000",
+    }
+    for n, form in enumerate(formset.forms, start=1):
+        instance = form.instance if form.instance.pk else None
+        data[form.add_prefix("id")] = instance.pk if instance else ""
+        data[form.add_prefix("title")] = instance.title if instance else ""
+        data[form.add_prefix("url")] = instance.url if instance else ""
+        data[form.add_prefix("ORDER")] = n if instance else ""
+    return data, formset.forms[0].add_prefix("title")
+
+
+class Scenarios:
+    """
+    The routes under test. Each scenario is a callable taking the
+    iteration number and returning a response; setup happens in
+    ``build`` so none of it is timed.
+    """
+
+    def __init__(self, profiles, rng):
+        self.profiles = profiles
+        self.rng = rng
+        self.registered = 0
+
+    def _handle(self):
+        return f"bench{self.rng.randint(1, self.profiles)}"
+
+    def _signed_in(self):
+        client = Client()
+        client.login(username=self._handle(), password=PASSWORD)
+        return client
+
+    def build(self):
+        anonymous = Client()
+        editor = self._signed_in()
+        poster = self._signed_in()
+        post_data, title_key = _editor_post_data(poster)
+
+        def public_profile(i):
+            return anonymous.get(f"/@{self._handle()}")
+
+        def editor_get(i):
+            return editor.get(reverse("link-list"))
+
+        def editor_post(i):
+            # Alternate the first title so every save has a real change
+            post_data[title_key] = f"Renamed {i % 2}"
+            return poster.post(reverse("link-list"), post_data)
+
+        def register(i):
+            self.registered += 1
+            return Client().post(
+                reverse("register"),
+                {
+                    "username": f"benchnew{self.registered}",
+                    "password1": PASSWORD,
+                    "password2": PASSWORD,
+                },
+            )
+
+        def login(i):
+            return Client().post(
+                reverse("login"),
+                {"username": self._handle(), "password": PASSWORD},
+            )
+
+        return {
+            "public_profile": public_profile,
+            "editor_get": editor_get,
+            "editor_post": editor_post,
+            "register": register,
+            "login": login,
+        }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = round(pct / 100 * (len(sorted_values) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(func, requests, warmup, alloc_samples):
+    """Time ``requests`` calls of ``func``; returns a dict of results."""
+    for i in range(warmup):
+        func(i)
+
+    latencies, queries = [], _QueryTimer()
+    started = time.perf_counter()
+    for i in range(requests):
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(queries))
+            t0 = time.perf_counter()
+            response = func(warmup + i)
+            latencies.append(time.perf_counter() - t0)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{func.__name__} returned HTTP {response.status_code}"
+            )
+    elapsed = time.perf_counter() - started
+
+    # Allocations are sampled separately: tracemalloc slows everything
+    # down enough to spoil the timings above.
+    peaks = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for i in range(alloc_samples):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            func(warmup + requests + i)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "queries_per_request": round(queries.count / requests, 2),
+        "db_ms_per_request": round(queries.seconds * 1000 / requests, 3),
+        "alloc_peak_kib": (
+            round(statistics.fmean(peaks) / 1024, 1) if peaks else None
+        ),
+    }
+
+
+def run(profiles, links_per_profile, requests, warmup=20, alloc_samples=20,
+        only=None, seed_value=0):
+    """
+    Run every scenario (or those named in ``only``) against the current
+    database, which must already hold the seeded dataset.
+    """
+    rng = random.Random(seed_value)
+    scenarios = Scenarios(profiles, rng).build()
+    results = {}
+    for name, func in scenarios.items():
+        if only and name not in only:
+            continue
+        # Start each scenario from empty caches so earlier ones don't
+        # warm them for it
+        caches["default"].clear()
+        handle_cache.clear()
+        tracking_buffer.flush()
+        results[name] = run_scenario(func, requests, warmup, alloc_samples)
+    tracking_buffer.flush()
+
+    return {
+        "meta": {
+            "profiles": profiles,
+            "links_per_profile": links_per_profile,
+            "requests": requests,
+            "warmup": warmup,
+            "seed": seed_value,
+            "database": connections["default"].vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "seeded_profiles": Profile.objects.count(),
+        },
+        "scenarios": results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return a list of human-readable regressions of ``current`` against
+    ``baseline``; empty means the run passes.
+    """
+    problems = []
+    for name, base in baseline.get("scenarios", {}).items():
+        cur = current["scenarios"].get(name)
+        if cur is None:
+            continue
+        if cur["queries_per_request"] > base["queries_per_request"]:
+            problems.append(
+                f"{name}: queries/request {base['queries_per_request']} -> "
+                f"{cur['queries_per_request']}"
+            )
+        for key in ("p50_ms", "p95_ms", "p99_ms", "alloc_peak_kib"):
+            if base.get(key) and cur.get(key) is not None:
+                if cur[key] > base[key] * (1 + tolerance):
+                    problems.append(
+                        f"{name}: {key} {base[key]} -> {cur[key]}"
+                    )
+        if cur["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            problems.append(
+                f"{name}: throughput_rps {base['throughput_rps']} -> "
+                f"{cur['throughput_rps']}"
+            )
+    return problems
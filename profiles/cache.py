@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .assets import build_version
+from .metrics import count_cache
+from .models import Profile
+
+
+PAGE_KEY_PREFIX = "profiles:page"
+API_KEY_PREFIX = "profiles:api:v1"
+
+
+def _page_cache():
+    return caches[getattr(settings, "PROFILE_CACHE_ALIAS", "default")]
+
+
+def profile_page_key(handle):
+    # Per build, so a deploy never serves pages cached by the old one
+    return f"{PAGE_KEY_PREFIX}:{build_version()}:{(handle or '').lower()}"
+
+
+def profile_api_key(handle):
+    return f"{API_KEY_PREFIX}:{(handle or '').lower()}"
+
+
+def get_cached_profile_page(handle):
+    """
+    Return the cached entry for a public profile page, or None.
+
+    Entries are plain dicts so they pickle cleanly into the local-memory,
+    file and database cache backends alike.
+    """
+    entry = _page_cache().get(profile_page_key(handle))
+    count_cache("profile_page", entry is not None)
+    return entry
+
+
+async def aget_cached_profile_page(handle):
+    entry = await _page_cache().aget(profile_page_key(handle))
+    count_cache("profile_page", entry is not None)
+    return entry
+
+
+def _page_entry(profile, response, etag, last_modified):
+    return {
+        "profile_id": profile.pk,
+        "content": response.content,
+        "content_type": response["Content-Type"],
+        "etag": etag,
+        "last_modified": last_modified,
+    }
+
+
+def cache_profile_page(profile, response, etag, last_modified):
+    _page_cache().set(
+        profile_page_key(profile.handle),
+        _page_entry(profile, response, etag, last_modified),
+        getattr(settings, "PROFILE_PAGE_CACHE_TIMEOUT", 300),
+    )
+
+
+async def acache_profile_page(profile, response, etag, last_modified):
+    await _page_cache().aset(
+        profile_page_key(profile.handle),
+        _page_entry(profile, response, etag, last_modified),
+        getattr(settings, "PROFILE_PAGE_CACHE_TIMEOUT", 300),
+    )
+
+
+def invalidate_profile_page(*handles):
+    """
+    Purge cached public pages (and their JSON API entries) for the given
+    handles once the current transaction commits, so readers can't
+    re-cache pre-commit data.
+    """
+    keys = [profile_page_key(h) for h in handles if h]
+    keys += [profile_api_key(h) for h in handles if h]
+    if keys:
+        transaction.on_commit(lambda: _page_cache().delete_many(keys))
+
+
+# ---------- Handle resolution ----------
+
+
+class HandleCache:
+    """
+    Bounded per-process LRU of handle -> profile id, with expiry.
+
+    A cached id of None records that the handle does not exist, so typo
+    and scraper traffic for missing handles skips the database. Local
+    saves and deletes invalidate entries through profiles.signals. Other
+    workers catch up when the TTL runs out, and a positive entry is
+    always re-checked against the handle when the profile is loaded.
+    """
+
+    def __init__(self, max_size, ttl, negative_ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, handle):
+        """Return (hit, profile_id); profile_id is None for known misses."""
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return False, None
+            profile_id, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[handle]
+                return False, None
+            self._entries.move_to_end(handle)
+            return True, profile_id
+
+    def set(self, handle, profile_id):
+        ttl = self.ttl if profile_id is not None else self.negative_ttl
+        with self._lock:
+            self._entries[handle] = (profile_id, time.monotonic() + ttl)
+            self._entries.move_to_end(handle)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *handles):
+        with self._lock:
+            for handle in handles:
+                self._entries.pop(handle, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+handle_cache = HandleCache(
+    max_size=getattr(settings, "HANDLE_CACHE_MAX_SIZE", 10_000),
+    ttl=getattr(settings, "HANDLE_CACHE_TTL", 300),
+    negative_ttl=getattr(settings, "HANDLE_CACHE_NEGATIVE_TTL", 60),
+)
+
+
+def get_profile_for_handle(handle):
+    """
+    Load the profile for a handle, or return None if there isn't one.
+
+    Known-missing handles are answered from the cache; known ids are
+    fetched by primary key, with the handle checked as well so a stale
+    entry (renamed or deleted in another worker) falls back to a fresh
+    lookup.
+    """
+    handle = (handle or "").lower()
+    hit, profile_id = handle_cache.get(handle)
+    count_cache("handle", hit)
+    if hit and profile_id is None:
+        return None
+
+    profile = None
+    if hit:
+        profile = Profile.objects.filter(pk=profile_id, handle=handle).first()
+    if profile is None:
+        profile = Profile.objects.filter(handle=handle).first()
+    handle_cache.set(handle, profile.pk if profile else None)
+    return profile
+
+
+async def aget_profile_for_handle(handle):
+    """Async twin of get_profile_for_handle, using the async ORM."""
+    handle = (handle or "").lower()
+    hit, profile_id = handle_cache.get(handle)
+    count_cache("handle", hit)
+    if hit and profile_id is None:
+        return None
+
+    profile = None
+    if hit:
+        profile = await Profile.objects.filter(
+            pk=profile_id, handle=handle
+        ).afirst()
+    if profile is None:
+        profile = await Profile.objects.filter(handle=handle).afirst()
+    handle_cache.set(handle, profile.pk if profile else None)
+    return profile
+
+
+def remember_handle(profile):
+    handle_cache.set(profile.handle, profile.pk)
+
+
+def forget_handles(*handles):
+    """
+    Drop handle entries now, and again after commit in case a reader
+    re-cached pre-commit state in between.
+    """
+    handles = [h for h in handles if h]
+    handle_cache.invalidate(*handles)
+    transaction.on_commit(lambda: handle_cache.invalidate(*handles))
@@ -0,0 +1,135 @@
+import csv
+import json
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage, storages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import DailyStat, HourlyStat, Link, Profile, ProfileEvent
+
+
+FORMATS = ("jsonl", "csv")
+CONTENT_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+# Record type -> exported columns, in export order
+SECTIONS = {
+    "profile": (
+        "id", "handle", "display_name", "bio", "created_at", "updated_at",
+    ),
+    "link": (
+        "id", "title", "url", "position", "click_count",
+        "check_status", "checked_at", "created_at",
+    ),
+    "daily_stat": ("link_id", "kind", "bucket", "count"),
+    "hourly_stat": ("link_id", "kind", "bucket", "count"),
+    "event": ("link_id", "kind", "created_at"),
+}
+
+# Every column of every section, for the single CSV header
+CSV_COLUMNS = ["record"] + list(
+    dict.fromkeys(column for columns in SECTIONS.values() for column in columns)
+)
+
+
+def _querysets(profile):
+    return {
+        "profile": Profile.objects.filter(pk=profile.pk),
+        "link": Link.objects.filter(profile=profile).order_by("position", "id"),
+        "daily_stat": DailyStat.objects.filter(profile=profile).order_by("id"),
+        "hourly_stat": HourlyStat.objects.filter(profile=profile).order_by("id"),
+        "event": ProfileEvent.objects.filter(profile_id=profile.pk).order_by("id"),
+    }
+
+
+def iter_records(profile, chunk_size=2000):
+    """
+    (record type, row dict) for everything stored about ``profile``.
+
+    Rows come from .values() through iterator(), which uses a server-side
+    cursor where the database has them: only one chunk of rows is held at
+    a time, however large the account.
+    """
+    for section, queryset in _querysets(profile).items():
+        rows = queryset.values(*SECTIONS[section]).iterator(chunk_size=chunk_size)
+        for row in rows:
+            yield section, row
+
+
+def _buffered(pieces, size=64 * 1024):
+    # One write per ~64KB rather than per row
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _jsonl_lines(profile):
+    for section, row in iter_records(profile):
+        yield json.dumps({"record": section, **row}, cls=DjangoJSONEncoder) + "\n"
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each row back."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(profile):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for section, row in iter_records(profile):
+        row["record"] = section
+        yield writer.writerow(
+            [
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in (row.get(column) for column in CSV_COLUMNS)
+            ]
+        )
+
+
+def stream_export(profile, fmt="jsonl"):
+    """
+    The export of ``profile`` as an iterator of text chunks, for a
+    StreamingHttpResponse or a file. JSON Lines has one object per line
+    with a "record" key naming its type; CSV has one header covering
+    every record type, with the columns a type doesn't have left empty.
+    """
+    lines = {"jsonl": _jsonl_lines, "csv": _csv_lines}[fmt](profile)
+    return _buffered(lines)
+
+
+def export_filename(profile, fmt, now=None):
+    now = now or timezone.now()
+    return f"onelink-{profile.handle}-{now:%Y%m%d-%H%M%S}.{fmt}"
+
+
+def _storage():
+    if "exports" in settings.STORAGES:
+        return storages["exports"]
+    return default_storage
+
+
+def write_archive(profile, fmt="jsonl", storage=None):
+    """
+    Zip the export of ``profile`` into export storage (STORAGES
+    "exports", else the default storage) and return the stored name.
+    It's compressed into a temporary file on disk, not in memory.
+    """
+    name = export_filename(profile, fmt)
+    with tempfile.TemporaryFile() as tmp:
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(name, "w", force_zip64=True) as member:
+                for chunk in stream_export(profile, fmt):
+                    member.write(chunk.encode("utf-8"))
+        tmp.seek(0)
+        return (storage or _storage()).save(f"exports/{name}.zip", File(tmp))
@@ -1,6 +1,10 @@
 from django import forms
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.forms import BaseInlineFormSet
 
+from .jobs import enqueue
+from .imports import clean_links, guess_format, parse_links
 from .models import Profile, Link
 
 
@@ -34,6 +38,19 @@ class ProfileForm(forms.ModelForm):
     def clean_handle(self):
         return (self.cleaned_data.get("handle") or "").strip().lower()
 
+    def save(self, commit=True):
+        profile = super().save(commit=commit)
+        if commit and "profile_image" in self.changed_data:
+            # Resizing is left to the job worker; the page shows the
+            # original until the variants are ready.
+            image_name = profile.profile_image.name or ""
+            enqueue(
+                "profiles.build_avatar",
+                {"profile_id": profile.pk, "image_name": image_name},
+                key=f"avatar:{profile.pk}:{image_name}" if image_name else None,
+            )
+        return profile
+
 
 class LinkForm(forms.ModelForm):
     class Meta:
@@ -52,4 +69,91 @@ class LinkForm(forms.ModelForm):
                     "placeholder": "https://example.com",
                 }
             ),
-        }
\ No newline at end of file
+        }
+
+
+class LoadedRowChoiceField(forms.ModelChoiceField):
+    """
+    Hidden-id field that resolves submitted pks from rows the formset has
+    already loaded, rather than running ``queryset.get()`` per row.
+    """
+
+    def __init__(self, rows, *args, **kwargs):
+        self.rows = rows
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        obj = self.rows().get(str(value))
+        if obj is None:
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return obj
+
+
+class BaseLinkFormSet(BaseInlineFormSet):
+    """
+    Link formset whose validation costs one query (the profile's links)
+    no matter how many rows are submitted.
+    """
+
+    def _loaded_rows(self):
+        if not hasattr(self, "_rows_by_pk"):
+            self._rows_by_pk = {str(o.pk): o for o in self.get_queryset()}
+        return self._rows_by_pk
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        pk_name = self.model._meta.pk.name
+        field = form.fields[pk_name]
+        form.fields[pk_name] = LoadedRowChoiceField(
+            self._loaded_rows,
+            queryset=field.queryset,
+            initial=field.initial,
+            required=False,
+            widget=field.widget,
+        )
+
+
+class LinkImportForm(forms.Form):
+    file = forms.FileField(required=False)
+    data = forms.CharField(
+        required=False,
+        widget=forms.Textarea(
+            attrs={"rows": 8, "placeholder": "title,url — one per line"}
+        ),
+    )
+    format = forms.ChoiceField(
+        choices=[
+            ("", "Detect from file name"),
+            ("csv", "CSV"),
+            ("json", "JSON"),
+            ("jsonl", "JSON Lines"),
+        ],
+        required=False,
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        upload = cleaned.get("file")
+        if upload:
+            try:
+                text = upload.read().decode("utf-8-sig")
+            except UnicodeDecodeError:
+                raise ValidationError("The file must be UTF-8 text.")
+            fmt = cleaned.get("format") or guess_format(upload.name)
+        else:
+            text = cleaned.get("data") or ""
+            start = text.lstrip()[:1]
+            fmt = cleaned.get("format") or (
+                {"[": "json", "{": "jsonl"}.get(start, "csv")
+            )
+        if not text.strip():
+            raise ValidationError("Upload a file or paste some links.")
+
+        cleaned["links"] = clean_links(parse_links(text, fmt))
+        return cleaned
@@ -0,0 +1,252 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .metrics import count_cache
+from .models import Profile, handle_validator
+
+
+HANDLE_MIN_LENGTH = 5
+HANDLE_MAX_LENGTH = 15
+
+_NON_HANDLE_CHARS = re.compile(r"[^a-z0-9_]")
+
+# Suffixes run up to this many digits; every candidate for a base then
+# shares the prefix base[:HANDLE_MAX_LENGTH - MAX_SUFFIX_DIGITS].
+MAX_SUFFIX_DIGITS = 5
+
+
+def candidate_handle(base, n):
+    """
+    The n-th candidate for ``base``: the base itself for n == 0, otherwise
+    the base truncated just enough to fit the numeric suffix ``n``.
+    """
+    if n == 0:
+        return base[:HANDLE_MAX_LENGTH]
+    suffix = str(n)
+    return base[:HANDLE_MAX_LENGTH - len(suffix)] + suffix
+
+
+def handle_stem(base):
+    """The prefix every candidate handle for ``base`` starts with."""
+    return base.lower()[:HANDLE_MAX_LENGTH - MAX_SUFFIX_DIGITS]
+
+
+def handle_base(username):
+    """
+    A valid handle derived from ``username``: lowercased, with anything
+    outside [a-z0-9_] dropped and cut to HANDLE_MAX_LENGTH. Empty when
+    too little is left, so callers fall back to a generated one.
+    """
+    base = _NON_HANDLE_CHARS.sub("", (username or "").lower())
+    return base[:HANDLE_MAX_LENGTH] if len(base) >= HANDLE_MIN_LENGTH else ""
+
+
+def next_free_handle(base, reserved=(), taken=None):
+    """
+    Return the first free handle among base, base1, base2, ... or None if
+    every candidate up to MAX_SUFFIX_DIGITS digits is taken.
+
+    All candidates share one prefix, so a single indexed prefix query
+    fetches every handle that could collide and the search for a free
+    suffix happens in memory. Callers that already fetched the handles
+    under that prefix pass them as ``taken`` to skip the query.
+    ``reserved`` holds handles already promised to rows not yet inserted.
+    The answer can still lose a race with a concurrent signup; callers
+    insert inside a savepoint and retry on IntegrityError.
+    """
+    base = base.lower()[:HANDLE_MAX_LENGTH]
+    if taken is None:
+        taken = Profile.objects.filter(
+            handle__startswith=handle_stem(base)
+        ).values_list("handle", flat=True)
+    taken = set(taken)
+    taken.update(reserved)
+    for n in range(10 ** MAX_SUFFIX_DIGITS):
+        handle = candidate_handle(base, n)
+        if handle not in taken:
+            return handle
+    return None
+
+
+# ---------- Availability index ----------
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for ``capacity`` items."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        # Double hashing: k positions from two 64-bit halves
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._positions(item)
+        )
+
+
+class HandleIndex:
+    """
+    Per-process Bloom filter of every taken handle.
+
+    A handle the filter hasn't seen is certainly free (as of the last
+    refresh), so most availability checks never reach the database; a
+    possible hit is confirmed with an indexed lookup. Local creates and
+    renames are added through profiles.signals; changes made by other
+    workers are picked up every ``refresh`` seconds from
+    Profile.updated_at. Freed handles can't be removed from a Bloom
+    filter, so it's rebuilt from scratch every ``rebuild`` seconds, or
+    sooner once it fills up.
+    """
+
+    # Re-read this much before the last refresh, for rows saved (with
+    # updated_at set) before but committed after it
+    OVERLAP = timedelta(seconds=60)
+
+    def __init__(self, refresh, rebuild, error_rate=0.01):
+        self.refresh = refresh
+        self.rebuild = rebuild
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._filter = None
+        self._count = 0
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._watermark = None
+
+    def _build(self):
+        started = Profile.objects.order_by("-updated_at").values_list(
+            "updated_at", flat=True
+        ).first()
+        count = Profile.objects.count()
+        # Room to grow before the false-positive rate degrades
+        bloom = BloomFilter(max(2 * count, 1000), self.error_rate)
+        for handle in Profile.objects.values_list("handle", flat=True).iterator(
+            chunk_size=5000
+        ):
+            bloom.add(handle)
+        self._filter, self._count = bloom, count
+        self._watermark = started
+        self._built_at = self._refreshed_at = time.monotonic()
+
+    def _catch_up(self):
+        rows = Profile.objects.all()
+        if self._watermark is not None:
+            rows = rows.filter(updated_at__gte=self._watermark - self.OVERLAP)
+        for handle, updated_at in rows.values_list("handle", "updated_at"):
+            self._add(handle)
+            if self._watermark is None or updated_at > self._watermark:
+                self._watermark = updated_at
+        self._refreshed_at = time.monotonic()
+
+    def _add(self, handle):
+        if handle not in self._filter:
+            self._filter.add(handle)
+            self._count += 1
+
+    def _current(self):
+        now = time.monotonic()
+        if (
+            self._filter is None
+            or now - self._built_at >= self.rebuild
+            or self._count > self._filter.capacity
+        ):
+            self._build()
+        elif now - self._refreshed_at >= self.refresh:
+            self._catch_up()
+        return self._filter
+
+    def add(self, handle):
+        """Record a handle taken in this process."""
+        with self._lock:
+            if self._filter is not None:
+                self._add(handle.lower())
+
+    def might_be_taken(self, handle):
+        with self._lock:
+            return handle.lower() in self._current()
+
+    def is_taken(self, handle):
+        """Whether ``handle`` belongs to a profile; the filter, then the DB."""
+        handle = handle.lower()
+        if not self.might_be_taken(handle):
+            count_cache("handle_index", True)
+            return False
+        count_cache("handle_index", False)
+        return Profile.objects.filter(handle=handle).exists()
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+
+
+handle_index = HandleIndex(
+    refresh=getattr(settings, "HANDLE_INDEX_REFRESH", 30),
+    rebuild=getattr(settings, "HANDLE_INDEX_REBUILD", 3600),
+)
+
+
+def suggest_handles(handle, count=3, max_tries=50):
+    """
+    Up to ``count`` free handles like ``handle`` (handle1, handle2, ...).
+    Candidates the index has never seen are free; the rest are settled
+    with one query.
+    """
+    free, maybe = [], []
+    for n in range(1, max_tries + 1):
+        candidate = candidate_handle(handle, n)
+        if handle_index.might_be_taken(candidate):
+            maybe.append(candidate)
+        else:
+            free.append(candidate)
+            if len(free) == count:
+                return free
+    taken = set(
+        Profile.objects.filter(handle__in=maybe).values_list("handle", flat=True)
+    )
+    free += [c for c in maybe if c not in taken]
+    return sorted(free, key=lambda c: (len(c), c))[:count]
+
+
+def check_handle(handle, current=None):
+    """
+    Availability of ``handle`` for the profile currently using handle
+    ``current`` (None for nobody): {"handle", "available", "message",
+    "suggestions"}. Advisory only; the save is what enforces uniqueness.
+    """
+    handle = (handle or "").strip().lower().lstrip("@")
+    result = {"handle": handle, "available": False, "suggestions": []}
+    try:
+        handle_validator(handle)
+    except ValidationError as exc:
+        result["message"] = exc.messages[0]
+        return result
+    if handle == current or not handle_index.is_taken(handle):
+        result.update(available=True, message=f"@{handle} is available.")
+        return result
+    result["message"] = f"@{handle} is taken."
+    result["suggestions"] = suggest_handles(handle)
+    return result
@@ -0,0 +1,99 @@
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+
+# The avatar is shown at 128 CSS px; these cover 1x, 2x and 3x screens
+AVATAR_SIZES = (128, 256, 384)
+AVATAR_DISPLAY_SIZE = 128
+
+# (key, Pillow format, save options); WebP first so <picture> prefers it
+AVATAR_FORMATS = (
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpeg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+)
+
+AVATAR_DIR = "profiles/avatars"
+
+
+def _open_upright(field_file):
+    field_file.open("rb")
+    try:
+        image = Image.open(field_file)
+        image.load()
+    finally:
+        field_file.close()
+    # Apply the EXIF orientation to the pixels; the re-encoded variants
+    # carry no EXIF (or any other metadata) at all.
+    return ImageOps.exif_transpose(image)
+
+
+def _flatten(image):
+    """RGB copy of ``image`` with any transparency composited on white."""
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _encode(image, fmt, options):
+    buf = io.BytesIO()
+    image.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def render_avatar_variants(field_file):
+    """
+    Build square, centre-cropped avatars in every size and format.
+
+    Yields (key, size, bytes). Sizes larger than the source are skipped
+    (except the smallest, so there's always one of each format).
+    """
+    image = _flatten(_open_upright(field_file))
+    short_side = min(image.size)
+    sizes = [s for s in AVATAR_SIZES if s <= short_side] or AVATAR_SIZES[:1]
+    for size in sizes:
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for key, fmt, options in AVATAR_FORMATS:
+            if key == "webp" and not features.check("webp"):
+                continue
+            yield key, size, _encode(square, fmt, options)
+
+
+def delete_avatar_variants(storage, variants):
+    for key, _, _ in AVATAR_FORMATS:
+        for name in (variants or {}).get(key, {}).values():
+            storage.delete(name)
+
+
+def update_avatar_variants(profile):
+    """
+    Regenerate (or clear) the avatar variants for ``profile``'s current
+    image and save them through the image field's storage.
+
+    Saved with update_fields so the usual post_save cache purging runs.
+    """
+    field_file = profile.profile_image
+    storage = field_file.storage
+    old = profile.avatar_variants or {}
+
+    variants = {}
+    if field_file:
+        # Lets readers tell variants of an older upload from current ones
+        variants["source"] = field_file.name
+        stem = posixpath.splitext(posixpath.basename(field_file.name))[0]
+        for key, size, data in render_avatar_variants(field_file):
+            name = storage.save(
+                f"{AVATAR_DIR}/{profile.pk}/{stem}-{size}.{key}",
+                ContentFile(data),
+            )
+            variants.setdefault(key, {})[str(size)] = name
+
+    profile.avatar_variants = variants
+    profile.save(update_fields=["avatar_variants", "updated_at"])
+    delete_avatar_variants(storage, old)
+    return variants
@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Link, Profile
+from .signals import profile_links_changed
+
+
+FORMATS = ("csv", "json", "jsonl")
+
+
+def guess_format(filename, default="csv"):
+    name = (filename or "").lower()
+    if name.endswith(".jsonl"):
+        return "jsonl"
+    if name.endswith(".json"):
+        return "json"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def _json_row(item):
+    if isinstance(item, str):
+        return {"title": "", "url": item}
+    if isinstance(item, dict):
+        return {
+            "title": str(item.get("title") or ""),
+            "url": str(item.get("url") or ""),
+        }
+    raise ValidationError("Each JSON entry must be a URL or an object.")
+
+
+def parse_links(text, fmt):
+    """
+    Turn CSV, JSON or JSON Lines text into a list of {"title", "url"} dicts.
+
+    CSV may have a header naming ``url`` (and optionally ``title``);
+    without one, rows are read as ``url`` or ``title,url``. JSON may be a
+    list of URL strings or of objects with ``url``/``title`` keys; JSON
+    Lines has one such string or object per line.
+    """
+    if fmt == "json":
+        try:
+            data = json.loads(text)
+        except ValueError as exc:
+            raise ValidationError(f"Invalid JSON: {exc}")
+        if not isinstance(data, list):
+            raise ValidationError("JSON must be a list of links.")
+        return [_json_row(item) for item in data]
+    if fmt == "jsonl":
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(_json_row(json.loads(line)))
+            except ValueError as exc:
+                raise ValidationError(f"Line {number}: invalid JSON ({exc})")
+            except ValidationError as exc:
+                raise ValidationError(f"Line {number}: {exc.messages[0]}")
+        return rows
+    if fmt != "csv":
+        raise ValidationError(f"Unknown format {fmt!r}.")
+
+    records = [r for r in csv.reader(io.StringIO(text)) if any(r)]
+    if records and "url" in [c.strip().lower() for c in records[0]]:
+        header = [c.strip().lower() for c in records.pop(0)]
+        records = [dict(zip(header, r)) for r in records]
+        return [
+            {"title": (r.get("title") or ""), "url": (r.get("url") or "")}
+            for r in records
+        ]
+    return [
+        {"title": "", "url": r[0]} if len(r) == 1
+        else {"title": r[0], "url": r[1]}
+        for r in records
+    ]
+
+
+def clean_links(rows):
+    """
+    Validate every row in one pass and return the cleaned rows.
+
+    All problems are collected and raised together as a ValidationError,
+    each message prefixed with its 1-based row number.
+    """
+    max_rows = getattr(settings, "LINK_IMPORT_MAX_ROWS", 500)
+    if len(rows) > max_rows:
+        raise ValidationError(
+            f"Too many links ({len(rows)}); the limit is {max_rows}."
+        )
+
+    url_field = forms.URLField(max_length=200)
+    title_field = forms.CharField(max_length=255, required=False)
+    cleaned, errors = [], []
+    for n, row in enumerate(rows, start=1):
+        try:
+            cleaned.append(
+                {
+                    "title": title_field.clean(row["title"].strip()),
+                    "url": url_field.clean(row["url"].strip()),
+                }
+            )
+        except ValidationError as exc:
+            errors.extend(f"Row {n}: {m}" for m in exc.messages)
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def import_links(profile, rows):
+    """
+    Append cleaned rows to the profile's links in a single transaction.
+
+    Unlike Link.save(), which locks and aggregates once per link, this
+    takes the profile row lock once, reads MAX(position) once and
+    inserts everything with bulk_create.
+    """
+    with transaction.atomic():
+        # The same lock Link.save() takes, so the two can't interleave
+        Profile.objects.select_for_update().get(pk=profile.pk)
+        max_pos = Link.objects.filter(profile=profile).aggregate(
+            Max("position")
+        )["position__max"] or 0
+        links = Link.objects.bulk_create(
+            [
+                Link(
+                    profile=profile,
+                    title=row["title"],
+                    url=row["url"],
+                    position=max_pos + n,
+                )
+                for n, row in enumerate(rows, start=1)
+            ],
+            batch_size=500,
+        )
+        if links:
+            profile_links_changed.send(sender=Profile, profile=profile)
+    return links
@@ -0,0 +1,218 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .analytics import rollup
+from .images import update_avatar_variants
+from .linkcheck import check_links as sweep_links
+from .models import Job, Profile
+
+
+logger = logging.getLogger(__name__)
+
+# name -> (function, visibility timeout in seconds)
+TASKS = {}
+
+
+def register(name, timeout=None):
+    """
+    Register a function as a job handler under ``name``. It's called
+    with the job's payload as keyword arguments and must be safe to run
+    more than once: a job whose worker dies is retried after
+    ``timeout`` seconds (default JOB_VISIBILITY_TIMEOUT).
+    """
+
+    def decorator(func):
+        TASKS[name] = (func, timeout)
+        return func
+
+    return decorator
+
+
+def _visibility_timeout(name):
+    _, timeout = TASKS.get(name, (None, None))
+    return timeout or getattr(settings, "JOB_VISIBILITY_TIMEOUT", 300)
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    """
+    Queue ``name`` to run with ``payload`` and return the Job.
+
+    With an idempotency ``key``, enqueueing again returns the job already
+    stored under that key instead of adding another. Rows are written in
+    the caller's transaction, so a job is never visible to workers before
+    the data it refers to is committed.
+    """
+    if name not in TASKS:
+        raise ValueError(f"Unknown job {name!r}.")
+    fields = {
+        "name": name,
+        "payload": payload or {},
+        "idempotency_key": key,
+        "run_at": timezone.now() + timedelta(seconds=delay),
+    }
+    if max_attempts is not None:
+        fields["max_attempts"] = max_attempts
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(**fields)
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=key)
+
+
+def _claimable(now):
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING,
+        locked_until__lt=now,
+        attempts__lt=F("max_attempts"),
+    )
+
+
+def claim(worker, limit=1):
+    """
+    Claim up to ``limit`` due jobs for ``worker`` and return them.
+
+    Each candidate is taken with an UPDATE that only matches while the
+    row is still claimable and unchanged, so two workers racing for the
+    same job can't both win, on SQLite or Postgres alike.
+    """
+    now = timezone.now()
+    # Jobs whose worker kept dying on their last attempt are given up
+    Job.objects.filter(
+        status=Job.RUNNING,
+        locked_until__lt=now,
+        attempts__gte=F("max_attempts"),
+    ).update(
+        status=Job.FAILED,
+        last_error="Visibility timeout expired on the final attempt.",
+        locked_until=None,
+        finished_at=now,
+    )
+
+    candidates = list(
+        Job.objects.filter(_claimable(now))
+        .order_by("run_at", "id")
+        .values_list("id", "name", "attempts")[: limit * 2]
+    )
+    claimed = []
+    for pk, name, attempts in candidates:
+        if len(claimed) >= limit:
+            break
+        won = Job.objects.filter(
+            _claimable(now), pk=pk, attempts=attempts
+        ).update(
+            status=Job.RUNNING,
+            attempts=F("attempts") + 1,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=_visibility_timeout(name)),
+        )
+        if won:
+            claimed.append(Job.objects.get(pk=pk))
+    return claimed
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, in seconds, after ``attempts`` tries."""
+    base = getattr(settings, "JOB_RETRY_BASE_DELAY", 10)
+    cap = getattr(settings, "JOB_RETRY_MAX_DELAY", 3600)
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1)
+
+
+def run(job):
+    """
+    Run a claimed job and record the outcome. Returns True on success.
+
+    Outcomes are only written while this worker still holds the claim, so
+    a job that overran its lease and was picked up elsewhere isn't
+    clobbered.
+    """
+    ours = Job.objects.filter(
+        pk=job.pk,
+        status=Job.RUNNING,
+        locked_by=job.locked_by,
+        attempts=job.attempts,
+    )
+    func, _ = TASKS.get(job.name, (None, None))
+    try:
+        if func is None:
+            raise LookupError(f"No handler registered for {job.name!r}.")
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc(limit=10)
+        logger.exception("Job %s failed (attempt %s)", job, job.attempts)
+        if job.attempts >= job.max_attempts:
+            ours.update(
+                status=Job.FAILED,
+                last_error=error,
+                locked_until=None,
+                finished_at=timezone.now(),
+            )
+        else:
+            ours.update(
+                status=Job.QUEUED,
+                last_error=error,
+                locked_until=None,
+                run_at=timezone.now()
+                + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        return False
+
+    ours.update(
+        status=Job.DONE,
+        locked_until=None,
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def schedule_periodic(now=None):
+    """
+    Enqueue each job in JOB_SCHEDULE ({name: interval seconds}) once per
+    interval. The idempotency key is the interval number, so any number
+    of workers calling this queue it exactly once.
+    """
+    now = now or timezone.now()
+    for name, interval in getattr(settings, "JOB_SCHEDULE", {}).items():
+        slot = int(now.timestamp() // interval)
+        enqueue(name, key=f"schedule:{name}:{slot}")
+
+
+def prune(older_than_days=None):
+    """Delete finished jobs past the retention window; returns the count."""
+    if older_than_days is None:
+        older_than_days = getattr(settings, "JOB_RETENTION_DAYS", 7)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+# ---------- Tasks ----------
+
+
+@register("profiles.build_avatar")
+def build_avatar(profile_id, image_name):
+    profile = Profile.objects.filter(pk=profile_id).first()
+    # Deleted, or replaced by a newer upload with its own job
+    if profile is None or (profile.profile_image.name or "") != image_name:
+        return
+    update_avatar_variants(profile)
+
+
+@register("profiles.rollup_analytics", timeout=1800)
+def rollup_analytics():
+    rollup()
+
+
+@register("profiles.check_links", timeout=3600)
+def check_links():
+    sweep_links(limit=getattr(settings, "LINK_CHECK_BATCH", 2000))
@@ -0,0 +1,282 @@
+import hashlib
+import ipaddress
+import socket
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Link
+
+USER_AGENT = "OneLink-LinkChecker/1.0"
+MAX_REDIRECTS = 5
+
+# Servers that mishandle HEAD tend to answer with one of these; anything
+# else from a HEAD is believed
+HEAD_FALLBACK_STATUSES = {400, 403, 404, 405, 406, 409, 500, 501, 502, 503}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cache():
+    return caches[_setting("PROFILE_CACHE_ALIAS", "default")]
+
+
+def _cache_key(url):
+    return "linkcheck:" + hashlib.md5(url.encode()).hexdigest()
+
+
+def _vetted_address(host, allow_private=False):
+    """
+    The address a request for ``host`` should connect to, or None if
+    ``host`` resolves to any loopback/private/link-local address (unless
+    ``allow_private``). Raises socket.gaierror if it doesn't resolve.
+
+    The request connects to this address instead of resolving the name
+    again, so a DNS-rebinding host can't pass the check with a public
+    answer and then be reached at an internal one.
+    """
+    infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    addresses = [
+        ipaddress.ip_address(sockaddr[0].split("%")[0])
+        for *_, sockaddr in infos
+    ]
+    if not allow_private and not all(a.is_global for a in addresses):
+        return None
+    return addresses[0]
+
+
+class PinnedHostAdapter(HTTPAdapter):
+    """
+    HTTPAdapter for requests addressed to an IP with the real name in the
+    Host header (see HostPool.request): TLS sends that name for SNI and
+    checks the certificate against it, as if the name had been dialled.
+    """
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(
+            request, verify, cert
+        )
+        hostname = urlsplit("//" + request.headers.get("Host", "")).hostname
+        if host_params["scheme"] == "https" and hostname:
+            pool_kwargs["server_hostname"] = hostname
+            pool_kwargs["assert_hostname"] = hostname
+        return host_params, pool_kwargs
+
+
+class HostPool:
+    """
+    One pooled requests.Session per host, with at most ``per_host``
+    requests to a host in flight and ``interval`` seconds between the
+    starts of consecutive requests to it.
+    """
+
+    def __init__(self, per_host=2, interval=1.0):
+        self.per_host = per_host
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._slots = {}
+        self._next_start = defaultdict(float)
+
+    def _for(self, host):
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = PinnedHostAdapter(
+                    pool_connections=1, pool_maxsize=self.per_host
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                self._sessions[host] = session
+                self._slots[host] = threading.Semaphore(self.per_host)
+            return self._sessions[host], self._slots[host]
+
+    def _wait_turn(self, host):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start[host])
+            self._next_start[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def request(self, method, url, address, **kwargs):
+        """
+        Send the request to ``address`` (an ip_address ``url``'s host was
+        vetted at) rather than letting the connection resolve it again.
+        """
+        parts = urlsplit(url)
+        host = parts.hostname
+        if parts.port:
+            host = f"{host}:{parts.port}"
+        netloc = f"[{address}]" if address.version == 6 else str(address)
+        if parts.port:
+            netloc = f"{netloc}:{parts.port}"
+        session, slot = self._for(host)
+        with slot:
+            self._wait_turn(host)
+            return session.request(
+                method,
+                parts._replace(netloc=netloc).geturl(),
+                headers={"Host": host},
+                **kwargs,
+            )
+
+    def close(self):
+        for session in self._sessions.values():
+            session.close()
+
+
+class LinkChecker:
+    """
+    Checks URLs on a thread pool. Each URL is fetched at most once per
+    LINK_CHECK_CACHE_TTL, however many links point at it: results are
+    kept in the cache, keyed by URL.
+
+    The cache is only touched from the calling thread, so the worker
+    threads never open database connections of their own (for
+    DatabaseCache).
+    """
+
+    def __init__(self, workers=None, timeout=None, per_host=None,
+                 interval=None, allow_private=None):
+        self.workers = workers or _setting("LINK_CHECK_WORKERS", 8)
+        self.timeout = timeout or _setting("LINK_CHECK_TIMEOUT", 10)
+        self.pool = HostPool(
+            per_host=per_host or _setting("LINK_CHECK_PER_HOST", 2),
+            interval=(
+                interval
+                if interval is not None
+                else _setting("LINK_CHECK_HOST_INTERVAL", 1.0)
+            ),
+        )
+        self.allow_private = (
+            allow_private
+            if allow_private is not None
+            else _setting("LINK_CHECK_ALLOW_PRIVATE", False)
+        )
+
+    def _fetch(self, method, url):
+        """(status, error) for ``url``, following redirects by hand."""
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                return None, "Not an http(s) URL."
+            try:
+                address = _vetted_address(parts.hostname, self.allow_private)
+            except socket.gaierror:
+                return None, "Could not resolve the host."
+            if address is None:
+                return None, "Points at a private network address."
+            response = self.pool.request(
+                method,
+                url,
+                address,
+                timeout=self.timeout,
+                allow_redirects=False,
+                stream=True,  # GET: stop after the headers
+            )
+            response.close()
+            if response.is_redirect and "Location" in response.headers:
+                url = urljoin(url, response.headers["Location"])
+                continue
+            return response.status_code, ""
+        return None, "Too many redirects."
+
+    def check_url(self, url):
+        """(status, error) for ``url``: status None means no response."""
+        try:
+            status, error = self._fetch("HEAD", url)
+            if status in HEAD_FALLBACK_STATUSES:
+                status, error = self._fetch("GET", url)
+        except requests.Timeout:
+            status, error = None, "Timed out."
+        except requests.ConnectionError:
+            status, error = None, "Could not connect."
+        except requests.RequestException as exc:
+            status, error = None, str(exc)[:255] or type(exc).__name__
+        return status, error
+
+    def check_urls(self, urls):
+        """{url: (status, error)} for every URL in ``urls``, concurrently."""
+        keys = {_cache_key(url): url for url in urls}
+        cached = _cache().get_many(keys)
+        results = {keys[key]: tuple(outcome) for key, outcome in cached.items()}
+        misses = [url for key, url in keys.items() if key not in cached]
+        if misses:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                fetched = dict(zip(misses, executor.map(self.check_url, misses)))
+            self.pool.close()
+            _cache().set_many(
+                {_cache_key(url): outcome for url, outcome in fetched.items()},
+                _setting("LINK_CHECK_CACHE_TTL", 3600),
+            )
+            results.update(fetched)
+        return results
+
+
+def due_links(now=None):
+    """Links never checked, or last checked over LINK_CHECK_INTERVAL ago."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=_setting("LINK_CHECK_INTERVAL", 86400))
+    return Link.objects.filter(
+        Q(checked_at__isnull=True) | Q(checked_at__lt=cutoff)
+    ).order_by(F("checked_at").asc(nulls_first=True), "id")
+
+
+def _store(outcome, rows, now, chunk_size=500):
+    """Record ``outcome`` for (pk, url) ``rows``; returns the count."""
+    status, error = outcome
+    updated = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        # Skip links whose URL was edited while they were being checked
+        current = dict(
+            Link.objects.filter(pk__in=[pk for pk, _ in chunk])
+            .values_list("pk", "url")
+        )
+        updated += Link.objects.filter(
+            pk__in=[pk for pk, url in chunk if current.get(pk) == url]
+        ).update(check_status=status, check_error=error, checked_at=now)
+    return updated
+
+
+def check_links(links=None, limit=None, checker=None):
+    """
+    Check ``links`` (default: every due link, oldest check first, at most
+    ``limit``) and store the results. Each distinct URL is fetched once.
+    Returns counts of links and URLs checked and links found broken.
+    """
+    if links is None:
+        links = due_links()
+    rows = links.values_list("pk", "url")
+    rows = list(rows[:limit] if limit else rows)
+    by_url = defaultdict(list)
+    for pk, url in rows:
+        by_url[url].append(pk)
+
+    results = (checker or LinkChecker()).check_urls(by_url)
+
+    # One UPDATE per distinct outcome (and chunk), not one per link
+    by_outcome = defaultdict(list)
+    for url, outcome in results.items():
+        by_outcome[outcome].extend((pk, url) for pk in by_url[url])
+    now = timezone.now()
+    broken = 0
+    for outcome, outcome_rows in by_outcome.items():
+        updated = _store(outcome, outcome_rows, now)
+        if Link.check_failed(*outcome):
+            broken += updated
+    return {"links": len(rows), "urls": len(by_url), "broken": broken}
@@ -0,0 +1,120 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from profiles import benchmark
+
+
+SCENARIOS = (
+    "public_profile",
+    "editor_get",
+    "editor_post",
+    "register",
+    "login",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and benchmark the public profile, "
+        "link editor, register and login routes. Writes JSON results and "
+        "fails if they regress against --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=200)
+        parser.add_argument("--links", type=int, default=10,
+                            help="Links per profile.")
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Timed requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument(
+            "--alloc-samples",
+            type=int,
+            default=20,
+            help="Extra requests per scenario run under tracemalloc "
+            "(0 to skip allocation measurements).",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=SCENARIOS,
+            help="Only run this scenario (repeatable).",
+        )
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Seed for the request mix.")
+        parser.add_argument("--output", help="Write results JSON here.")
+        parser.add_argument(
+            "--baseline",
+            help="Results JSON from an earlier run to compare against.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=benchmark.DEFAULT_TOLERANCE,
+            help="Allowed relative slowdown against the baseline "
+            "(default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        if options["profiles"] < 1 or options["requests"] < 1:
+            raise CommandError("--profiles and --requests must be positive.")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as fh:
+                baseline = json.load(fh)
+
+        # Never touch the real database: everything runs against a fresh
+        # test database that is destroyed afterwards.
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            self.stdout.write(
+                f"Seeding {options['profiles']} profiles x "
+                f"{options['links']} links..."
+            )
+            benchmark.seed(options["profiles"], options["links"])
+            results = benchmark.run(
+                options["profiles"],
+                options["links"],
+                options["requests"],
+                warmup=options["warmup"],
+                alloc_samples=options["alloc_samples"],
+                only=options["scenario"],
+                seed_value=options["seed"],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, r in results["scenarios"].items():
+            self.stdout.write(
+                f"{name:<15} {r['throughput_rps']:>8.1f} req/s  "
+                f"p50 {r['p50_ms']:.2f}ms  p95 {r['p95_ms']:.2f}ms  "
+                f"p99 {r['p99_ms']:.2f}ms  "
+                f"{r['queries_per_request']} queries  "
+                f"{r['alloc_peak_kib']} KiB peak"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            problems = benchmark.compare(
+                results, baseline, tolerance=options["tolerance"]
+            )
+            if problems:
+                raise CommandError(
+                    "Regressions against baseline:\n  " + "\n  ".join(problems)
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions."))
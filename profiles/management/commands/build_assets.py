@@ -0,0 +1,69 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles import assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract the above-the-fold CSS for the public profile page into "
+        f"static/{assets.CRITICAL_CSS_PATH}, and subset the self-hosted "
+        "fonts. Run before collectstatic whenever site.css, the profile "
+        "template or the font sources change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fonts-src",
+            help="Directory holding the source TTFs listed in "
+            "profiles.assets.FONT_FACES, subset to woff2 "
+            "(default: settings.FONTS_SRC_DIR).",
+        )
+
+    def handle(self, *args, **options):
+        out_dir = Path(settings.STATICFILES_DIRS[0])
+
+        source = finders.find("css/site.css")
+        if not source:
+            raise CommandError("css/site.css not found in the static dirs.")
+        css = Path(source).read_text(encoding="utf-8")
+        critical = assets.extract_critical_css(
+            assets.render_sample_profile_page(), css
+        )
+        target = out_dir / assets.CRITICAL_CSS_PATH
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(critical + "\n", encoding="utf-8")
+        self.stdout.write(
+            f"Wrote {target} ({len(critical)} of {len(css)} bytes)."
+        )
+
+        fonts_src = options["fonts_src"] or getattr(
+            settings, "FONTS_SRC_DIR", None
+        )
+        if fonts_src and Path(fonts_src).is_dir():
+            try:
+                written = assets.subset_fonts(fonts_src, out_dir)
+            except ImportError:
+                raise CommandError(
+                    "Subsetting fonts needs fontTools: pip install fonttools"
+                )
+            missing = len(assets.FONT_FACES) - len(written)
+            for name in written:
+                self.stdout.write(f"Wrote {out_dir / name}.")
+            if missing:
+                self.stderr.write(
+                    f"{missing} font source(s) not found in "
+                    f"{fonts_src}; see FONT_FACES."
+                )
+        elif options["fonts_src"]:
+            raise CommandError(f"{fonts_src} is not a directory.")
+        else:
+            self.stderr.write(
+                f"No font sources in {fonts_src}; pages will load the "
+                "fonts from Google until they're added and built."
+            )
+
+        self.stdout.write(self.style.SUCCESS("Assets built."))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from profiles.images import update_avatar_variants
+from profiles.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized WebP/JPEG avatar variants for profiles whose "
+        "image predates them (or for every profile with --all)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild variants even for profiles that already have them.",
+        )
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(profile_image="").exclude(
+            profile_image__isnull=True
+        )
+        if not options["all"]:
+            profiles = profiles.filter(avatar_variants={})
+
+        built = failed = 0
+        for profile in profiles.iterator(chunk_size=200):
+            try:
+                update_avatar_variants(profile)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"@{profile.handle}: {exc}")
+                continue
+            built += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built avatars for {built} profile(s); {failed} failed."
+            )
+        )
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from profiles.linkcheck import LinkChecker, check_links, due_links
+from profiles.models import Link
+
+
+class Command(BaseCommand):
+    help = (
+        "Check stored link URLs for dead links and record each link's "
+        "status. By default only links not checked within "
+        "LINK_CHECK_INTERVAL are swept, oldest first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Check every link, however recently it was checked.",
+        )
+        parser.add_argument("--handle", help="Only this profile's links.")
+        parser.add_argument("--limit", type=int,
+                            help="Check at most this many links.")
+        parser.add_argument("--workers", type=int,
+                            help="Concurrent requests "
+                            "(default: LINK_CHECK_WORKERS).")
+        parser.add_argument("--timeout", type=float,
+                            help="Seconds per request "
+                            "(default: LINK_CHECK_TIMEOUT).")
+
+    def handle(self, *args, **options):
+        links = Link.objects.all() if options["all"] else due_links()
+        if options["handle"]:
+            links = links.filter(profile__handle=options["handle"].lower())
+        counts = check_links(
+            links,
+            limit=options["limit"],
+            checker=LinkChecker(
+                workers=options["workers"], timeout=options["timeout"]
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {counts['links']} link(s) across {counts['urls']} "
+                f"URL(s); {counts['broken']} broken."
+            )
+        )
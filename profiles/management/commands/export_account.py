@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.exports import FORMATS, stream_export, write_archive
+from profiles.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Export a profile with its links, stats and raw events as JSON Lines "
+        "or CSV, streamed to stdout or a file, or zipped into export storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("handle", help="Profile handle (without @).")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default="jsonl",
+            help="Output format (default: jsonl).",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="File to write, or - for stdout (default).",
+        )
+        parser.add_argument(
+            "--archive",
+            action="store_true",
+            help="Save a zip to export storage instead and print its name.",
+        )
+
+    def handle(self, *args, **options):
+        handle = options["handle"].lstrip("@").lower()
+        try:
+            profile = Profile.objects.get(handle=handle)
+        except Profile.DoesNotExist:
+            raise CommandError(f"No profile with handle @{handle}.")
+
+        fmt = options["format"]
+        if options["archive"]:
+            name = write_archive(profile, fmt)
+            self.stdout.write(self.style.SUCCESS(f"Saved {name}."))
+            return
+
+        if options["output"] == "-":
+            for chunk in stream_export(profile, fmt):
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+            for chunk in stream_export(profile, fmt):
+                fh.write(chunk)
+        self.stderr.write(f"Exported @{handle} to {options['output']}.")
@@ -0,0 +1,54 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.imports import (
+    FORMATS,
+    clean_links,
+    guess_format,
+    import_links,
+    parse_links,
+)
+from profiles.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import links from a CSV, JSON or JSON Lines file into a "
+        "profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("handle", help="Profile handle (without @).")
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format (default: from the file extension, else CSV).",
+        )
+
+    def handle(self, *args, **options):
+        handle = options["handle"].lstrip("@").lower()
+        try:
+            profile = Profile.objects.get(handle=handle)
+        except Profile.DoesNotExist:
+            raise CommandError(f"No profile with handle @{handle}.")
+
+        path = options["path"]
+        if path == "-":
+            text = sys.stdin.read()
+        else:
+            with open(path, encoding="utf-8-sig") as fh:
+                text = fh.read()
+        fmt = options["format"] or guess_format(path)
+
+        try:
+            rows = clean_links(parse_links(text, fmt))
+        except ValidationError as exc:
+            raise CommandError("\n".join(exc.messages))
+
+        links = import_links(profile, rows)
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {len(links)} links into @{handle}.")
+        )
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from profiles.prerender import prerender
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every public profile to <output>/@<handle>/index.html with "
+        "gzip/brotli variants. Only profiles changed since the last run are "
+        "re-rendered; pages of deleted or renamed profiles are removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            help="Output directory (default: PRERENDER_ROOT).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render every profile, changed or not.",
+        )
+
+    def handle(self, *args, **options):
+        root = options["output"] or settings.PRERENDER_ROOT
+        counts = prerender(root, force=options["force"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{counts['rendered']} rendered, {counts['removed']} removed, "
+                f"{counts['unchanged']} unchanged in {root}."
+            )
+        )
@@ -0,0 +1,95 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.provisioning import iter_records, provision_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users, profiles and links from a CSV or JSONL file into "
+        "the database in bulk batches, with resumable checkpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file of accounts.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Input format (default: from the file extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--unusable-passwords",
+            action="store_true",
+            help="Ignore any password column and create users who must "
+            "reset their password. Otherwise passwords must be pre-hashed.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Progress file (default: <path>.checkpoint).",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip records already committed according to the checkpoint.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or (
+            "jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv"
+        )
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+
+        done = 0
+        if options["resume"] and os.path.exists(checkpoint):
+            with open(checkpoint) as fh:
+                done = json.load(fh)["records"]
+            self.stdout.write(f"Resuming after record {done}.")
+
+        created = skipped = 0
+        started = time.monotonic()
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            records = islice(iter_records(fh, fmt), done, None)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                n_created, n_skipped = provision_batch(
+                    batch, unusable_passwords=options["unusable_passwords"]
+                )
+                for username, reason in n_skipped:
+                    self.stderr.write(f"Skipped {username}: {reason}")
+
+                done += len(batch)
+                created += n_created
+                skipped += len(n_skipped)
+                self._write_checkpoint(checkpoint, done)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{done} records read, {created} created, "
+                    f"{skipped} skipped "
+                    f"({created / elapsed if elapsed else 0:.0f} accounts/s)"
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done: {created} accounts created, {skipped} skipped in "
+                f"{time.monotonic() - started:.1f}s."
+            )
+        )
+
+    def _write_checkpoint(self, checkpoint, done):
+        # Written only after a batch commits; replace atomically
+        tmp = f"{checkpoint}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"records": done}, fh)
+        os.replace(tmp, checkpoint)
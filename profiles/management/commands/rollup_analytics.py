@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from profiles.analytics import rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll raw profile view/click events up into hourly and daily "
+        "stats, then prune raw events past the retention window."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=None,
+            help="Keep raw events this many days "
+            "(default: ANALYTICS_RAW_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=None,
+            help="Re-aggregate this far behind the last run to pick up "
+            "late events (default: ANALYTICS_LATE_EVENT_GRACE).",
+        )
+
+    def handle(self, *args, **options):
+        grace = options["grace_seconds"]
+        hours, pruned = rollup(
+            grace=timedelta(seconds=grace) if grace is not None else None,
+            retention_days=options["retention_days"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {hours} hour(s) of stats; pruned {pruned} raw event(s)."
+            )
+        )
@@ -0,0 +1,111 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from profiles import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Work through the database job queue with a pool of threads. "
+        "Run as many of these processes as you like; claims are atomic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Jobs run concurrently by this process (default: 4).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no jobs are due instead of polling forever.",
+        )
+        parser.add_argument(
+            "--no-schedule",
+            action="store_true",
+            help="Don't enqueue the periodic jobs in JOB_SCHEDULE.",
+        )
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        if threads < 1:
+            raise CommandError("--threads must be positive.")
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Finishing running jobs, then stopping...")
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        done = failed = 0
+        last_housekeeping = 0.0
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while not stopping.is_set():
+                if time.monotonic() - last_housekeeping > 60:
+                    if not options["no_schedule"]:
+                        jobs.schedule_periodic()
+                    jobs.prune()
+                    last_housekeeping = time.monotonic()
+
+                close_old_connections()
+                if len(running) < threads:
+                    claimed = jobs.claim(worker, limit=threads - len(running))
+                    running.update(
+                        pool.submit(self._run, job) for job in claimed
+                    )
+
+                if running:
+                    finished, running = wait(
+                        running,
+                        timeout=options["poll_interval"],
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in finished:
+                        if future.result():
+                            done += 1
+                        else:
+                            failed += 1
+                    continue
+                if options["burst"]:
+                    break
+                stopping.wait(options["poll_interval"])
+
+            for future in wait(running).done:
+                if future.result():
+                    done += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Worker {worker} stopped: {done} job(s) done, "
+                f"{failed} failed or retried."
+            )
+        )
+
+    def _run(self, job):
+        try:
+            return jobs.run(job)
+        finally:
+            # Each pool thread has its own connection; don't leak them
+            connections.close_all()
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1_000, 5_000, 20_000, 100_000, 500_000, 2_000_000)
+
+# Any other request method is labelled "other", so clients can't mint
+# new label values (and series) at will
+HTTP_METHODS = frozenset(
+    {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+)
+
+METRICS = {
+    # name: (type, help, buckets)
+    "onelink_http_requests_total": (
+        "counter", "Requests by URL name, method and status.", None,
+    ),
+    "onelink_http_request_duration_seconds": (
+        "histogram", "Request latency by URL name.", LATENCY_BUCKETS,
+    ),
+    "onelink_db_queries_per_request": (
+        "histogram", "Database queries per request by URL name.",
+        QUERY_COUNT_BUCKETS,
+    ),
+    "onelink_db_query_seconds_total": (
+        "counter", "Time spent in database queries by URL name.", None,
+    ),
+    "onelink_http_response_bytes": (
+        "histogram", "Response body size by URL name.", SIZE_BUCKETS,
+    ),
+    "onelink_cache_requests_total": (
+        "counter", "Application cache lookups by cache and result.", None,
+    ),
+}
+
+
+class Registry:
+    """
+    In-process metric store.
+
+    Updates are a dict lookup and an add under one short-held lock, so
+    it's cheap enough to leave on. Each process keeps its own; with
+    METRICS_DIR set, snapshots are written there so the endpoint can sum
+    every worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                # per-bucket counts (last is +Inf), then sum, then count
+                hist = self._histograms[key] = [0] * (len(buckets) + 3)
+            hist[bisect_left(buckets, value)] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [
+                    [name, list(labels), value]
+                    for (name, labels), value in self._counters.items()
+                ],
+                "histograms": [
+                    [name, list(labels), list(values)]
+                    for (name, labels), values in self._histograms.items()
+                ],
+            }
+
+
+registry = Registry()
+
+_last_write = 0.0
+_write_lock = threading.Lock()
+
+
+def _snapshot_path(pid=None):
+    return os.path.join(
+        settings.METRICS_DIR, f"metrics-{pid or os.getpid()}.json"
+    )
+
+
+def write_snapshot(force=False):
+    """Persist this process's metrics for the endpoint to aggregate."""
+    global _last_write
+    if not getattr(settings, "METRICS_DIR", None):
+        return
+    now = time.monotonic()
+    interval = getattr(settings, "METRICS_WRITE_INTERVAL", 10)
+    if not force and now - _last_write < interval:
+        return
+    if not _write_lock.acquire(blocking=False):
+        return  # another thread is already writing
+    try:
+        _last_write = now
+        path = _snapshot_path()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(registry.snapshot(), fh)
+        os.replace(tmp, path)
+    finally:
+        _write_lock.release()
+
+
+def collect():
+    """Merge snapshots from every worker, using live data for this one."""
+    snapshots = [registry.snapshot()]
+    metrics_dir = getattr(settings, "METRICS_DIR", None)
+    if metrics_dir and os.path.isdir(metrics_dir):
+        own = os.path.basename(_snapshot_path())
+        for name in os.listdir(metrics_dir):
+            if not name.endswith(".json") or name == own:
+                continue
+            try:
+                with open(os.path.join(metrics_dir, name)) as fh:
+                    snapshots.append(json.load(fh))
+            except (OSError, ValueError):
+                continue  # mid-replace or unreadable; skip this scrape
+
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0] * len(values))
+            for i, v in enumerate(values):
+                merged[i] += v
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(
+            k, str(v).replace("\\", "\\\\").replace('"', '\\"')
+        )
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus():
+    """Render all workers' metrics in the Prometheus text format."""
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+        for (n, labels), values in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], values[:-2]):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket"
+                    f"{_format_labels(labels, [('le', bound)])} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def count_cache(cache_name, hit):
+    registry.inc(
+        "onelink_cache_requests_total",
+        {"cache": cache_name, "result": "hit" if hit else "miss"},
+    )
+
+
+# ---------- Middleware ----------
+
+
+class _QueryTimer:
+    """connection.execute_wrapper hook counting queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def _record(request, response, elapsed, queries=None):
+    match = getattr(request, "resolver_match", None)
+    view = (match.view_name if match else None) or "<unresolved>"
+    labels = {"view": view}
+
+    registry.inc(
+        "onelink_http_requests_total",
+        {
+            "view": view,
+            "method": (
+                request.method if request.method in HTTP_METHODS else "other"
+            ),
+            "status": str(response.status_code),
+        },
+    )
+    registry.observe("onelink_http_request_duration_seconds", labels, elapsed)
+    if queries is not None:
+        registry.observe(
+            "onelink_db_queries_per_request", labels, queries.count
+        )
+        registry.inc("onelink_db_query_seconds_total", labels, queries.seconds)
+    if not response.streaming:
+        registry.observe(
+            "onelink_http_response_bytes", labels, len(response.content)
+        )
+    write_snapshot()
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Record latency, response size and (on the sync path) database query
+    count and time for every request, labelled by URL name.
+    """
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            # Async views run their queries on other threads, so only
+            # timing and size are recorded here.
+            start = time.perf_counter()
+            response = await get_response(request)
+            _record(request, response, time.perf_counter() - start)
+            return response
+
+    else:
+
+        def middleware(request):
+            queries = _QueryTimer()
+            start = time.perf_counter()
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(queries))
+                response = get_response(request)
+            _record(request, response, time.perf_counter() - start, queries)
+            return response
+
+    return middleware
@@ -0,0 +1,144 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .models import Profile
+
+
+# Readable by app.js: tells shared-cache public pages that this browser
+# has a session worth fetching the personalised nav for. It's only a
+# hint; the nav fragment still authenticates from the session.
+NAV_HINT_COOKIE = "onelink_signed_in"
+
+
+def ensure_profile_for(user):
+    """
+    Return the user's profile, creating a placeholder if they have none.
+
+    With ProfileModelBackend the profile arrives joined to the user, so
+    the common case is free.
+    """
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        profile, _ = Profile.objects.get_or_create(
+            user=user,
+            defaults={
+                "handle": f"user{user.id}",
+                "display_name": user.username or f"User {user.id}",
+            },
+        )
+        user.profile = profile
+        return profile
+
+
+def get_request_profile(request):
+    """
+    The signed-in user's profile for this request, or None if anonymous.
+
+    Resolved at most once per request; views should call this rather than
+    querying Profile themselves.
+    """
+    if not hasattr(request, "_cached_profile"):
+        user = request.user
+        request._cached_profile = (
+            ensure_profile_for(user) if user.is_authenticated else None
+        )
+    return request._cached_profile
+
+
+def set_nav_hint(response):
+    response.set_cookie(
+        NAV_HINT_COOKIE,
+        "1",
+        max_age=settings.SESSION_COOKIE_AGE,
+        secure=settings.SESSION_COOKIE_SECURE,
+        samesite="Lax",
+    )
+    return response
+
+
+def clear_nav_hint(response):
+    response.delete_cookie(NAV_HINT_COOKIE, samesite="Lax")
+    return response
+
+
+def _sync_nav_hint(request, response):
+    # Only when the request already resolved the viewer; never load the
+    # session just to maintain the hint.
+    if "_cached_profile" not in request.__dict__:
+        return
+    signed_in = request._cached_profile is not None
+    hinted = NAV_HINT_COOKIE in request.COOKIES
+    if signed_in and not hinted:
+        set_nav_hint(response)
+    elif hinted and not signed_in:
+        clear_nav_hint(response)
+
+
+@sync_and_async_middleware
+def current_profile_middleware(get_response):
+    """
+    Expose the signed-in user's profile to views and templates as
+    ``request.profile``. Lazy, so requests that never look at it (or at
+    request.user) pay nothing.
+
+    Also keeps the NAV_HINT_COOKIE in step with the session whenever a
+    request has looked at the profile anyway.
+    """
+
+    def attach(request):
+        request.profile = SimpleLazyObject(lambda: get_request_profile(request))
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            attach(request)
+            response = await get_response(request)
+            _sync_nav_hint(request, response)
+            return response
+
+    else:
+
+        def middleware(request):
+            attach(request)
+            response = get_response(request)
+            _sync_nav_hint(request, response)
+            return response
+
+    return middleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can sit in an async middleware chain.
+
+    The stock middleware is sync-only, which makes Django adapt every
+    request under ASGI through a thread before it reaches an async view.
+    Static lookups are in-memory dict reads, so they're just as safe to
+    do on the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.24 on 2026-10-17 22:50
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_alter_link_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='links_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='handle',
+            field=models.CharField(db_index=True, max_length=15, unique=True, validators=[django.core.validators.RegexValidator(message='Handle must be 5–15 characters, using only lowercase letters, numbers, or underscores.', regex='^[a-z0-9_]{5,15}$')]),
+        ),
+    ]
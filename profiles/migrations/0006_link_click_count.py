@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-17 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_profile_links_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='click_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,30 @@
+"""
+Full-text index over Profile.handle, display_name and bio (see
+profiles.search): an FTS5 table kept in sync by triggers on SQLite, a GIN
+index on a weighted tsvector expression on PostgreSQL, nothing elsewhere.
+"""
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from profiles.search import create_index
+
+    create_index(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    from profiles.search import drop_index
+
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0010_link_check"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0011_profile_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['updated_at'], name='profiles_pr_updated_d17d1b_idx'),
+        ),
+    ]
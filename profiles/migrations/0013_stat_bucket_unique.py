@@ -0,0 +1,44 @@
+# Generated by Django 4.2.24 on 2026-10-17 23:45
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_buckets(apps, schema_editor):
+    # Overlapping rollups could each insert a full copy of a bucket; keep
+    # the first copy so the constraints below can be created
+    for name in ("HourlyStat", "DailyStat"):
+        model = apps.get_model("profiles", name)
+        keep = (
+            model.objects.values("profile", "link", "kind", "bucket")
+            .annotate(first=Min("id"))
+            .values("first")
+        )
+        model.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0012_profile_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailystat',
+            constraint=models.UniqueConstraint(condition=models.Q(('link__isnull', False)), fields=('profile', 'link', 'kind', 'bucket'), name='uniq_dailystat_link_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailystat',
+            constraint=models.UniqueConstraint(condition=models.Q(('link__isnull', True)), fields=('profile', 'kind', 'bucket'), name='uniq_dailystat_profile_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='hourlystat',
+            constraint=models.UniqueConstraint(condition=models.Q(('link__isnull', False)), fields=('profile', 'link', 'kind', 'bucket'), name='uniq_hourlystat_link_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='hourlystat',
+            constraint=models.UniqueConstraint(condition=models.Q(('link__isnull', True)), fields=('profile', 'kind', 'bucket'), name='uniq_hourlystat_profile_bucket'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from contextlib import nullcontext
+
 from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.db.models.functions import Lower
@@ -41,8 +43,21 @@ class Profile(models.Model):
         blank=True,
         null=True,
     )
+    # Resized copies of profile_image written by profiles.images:
+    # {"source": image name, "webp": {"128": name, ...}, "jpeg": {...}}
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped whenever any of the profile's links change (see signals.py)
+    links_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         constraints = [
@@ -52,6 +67,8 @@ class Profile(models.Model):
                 name="uniq_profile_handle_ci",
             )
         ]
+        # For the handle index's incremental refresh (profiles.handles)
+        indexes = [models.Index(fields=["updated_at"])]
 
     def clean(self):
         super().clean()
@@ -69,6 +86,34 @@ class Profile(models.Model):
             self.handle = self.handle.lower()
         super().save(*args, **kwargs)
 
+    def avatar_sources(self):
+        """
+        ``srcset`` strings per format plus a fallback ``src`` for the
+        avatar variants, or None if they haven't been generated.
+        """
+        variants = self.avatar_variants or {}
+        if not (
+            self.profile_image
+            and variants.get("source") == self.profile_image.name
+            and variants.get("jpeg")
+        ):
+            return None  # not built yet for the current image
+        storage = self.profile_image.storage
+        sources = {}
+        for key in ("webp", "jpeg"):
+            names = variants.get(key)
+            if not names:
+                continue
+            sources[key] = ", ".join(
+                f"{storage.url(name)} {size}w"
+                for size, name in sorted(
+                    names.items(), key=lambda item: int(item[0])
+                )
+            )
+        smallest = min(variants["jpeg"], key=int)
+        sources["fallback"] = storage.url(variants["jpeg"][smallest])
+        return sources
+
 
 class Link(models.Model):
     profile = models.ForeignKey(
@@ -83,6 +128,23 @@ class Link(models.Model):
         blank=True,
         db_index=True,
     )
+    # Maintained by profiles.tracking in write-behind batches
+    click_count = models.PositiveBigIntegerField(default=0, editable=False)
+    # Result of the last dead-link check (profiles.linkcheck): the final
+    # HTTP status, or an error when no response came back at all. Cleared
+    # when the URL changes.
+    check_status = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    check_error = models.CharField(max_length=255, blank=True, editable=False)
+    checked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -95,19 +157,224 @@ class Link(models.Model):
         ]
         indexes = [models.Index(fields=["profile", "position"])]
 
+    CHECK_FIELDS = ["check_status", "check_error", "checked_at"]
+
     def __str__(self):
         return f"{self.title or self.url} → {self.url}"
 
+    @staticmethod
+    def check_failed(status, error):
+        # 429 means the site throttled the checker, not that it's gone
+        return bool(error) or (
+            status is not None and status >= 400 and status != 429
+        )
+
+    @property
+    def is_broken(self):
+        return self.checked_at is not None and self.check_failed(
+            self.check_status, self.check_error
+        )
+
+    def reset_check(self):
+        self.check_status = None
+        self.check_error = ""
+        self.checked_at = None
+
     def save(self, *args, **kwargs):
         from django.db.models import Max as DjMax
 
-        if self.profile_id and self.position is None:
-            with transaction.atomic():
-                max_pos = (
-                    Link.objects.select_for_update()
-                    .filter(profile_id=self.profile_id)
-                    .aggregate(DjMax("position"))["position__max"]
-                )
+        # Assigning the next position locks the profile row, as
+        # imports.import_links does, and holds it until the row is written
+        # so single saves and bulk imports can't claim the same position
+        # (locking the Link rows doesn't stop an import, nor the first link)
+        assign_position = bool(self.profile_id) and self.position is None
+        with transaction.atomic() if assign_position else nullcontext():
+            if assign_position:
+                Profile.objects.select_for_update().get(pk=self.profile_id)
+                max_pos = Link.objects.filter(
+                    profile_id=self.profile_id
+                ).aggregate(DjMax("position"))["position__max"]
                 self.position = (max_pos or 0) + 1
 
-        super().save(*args, **kwargs)
\ No newline at end of file
+            # Never write back a stale click_count over the batched
+            # increments, nor stale check results over the checker's,
+            # unless the URL changed and they're being cleared
+            if (
+                self.pk
+                and not self._state.adding
+                and kwargs.get("update_fields") is None
+            ):
+                skip = {"click_count"}
+                if self.url == getattr(self, "_loaded_url", self.url):
+                    skip.update(self.CHECK_FIELDS)
+                else:
+                    self.reset_check()
+                kwargs["update_fields"] = [
+                    f.name
+                    for f in self._meta.concrete_fields
+                    if not f.primary_key and f.name not in skip
+                ]
+
+            super().save(*args, **kwargs)
+
+
+class ProfileEvent(models.Model):
+    """
+    Raw, append-only view/click log written by profiles.tracking.
+
+    Rows are rolled up into HourlyStat/DailyStat and pruned by the
+    ``rollup_analytics`` command. Foreign keys skip database constraints
+    so buffered events for since-deleted links can still be inserted.
+    """
+
+    VIEW = "view"
+    CLICK = "click"
+    KIND_CHOICES = [(VIEW, "View"), (CLICK, "Click")]
+
+    profile = models.ForeignKey(
+        Profile,
+        related_name="+",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    link = models.ForeignKey(
+        Link,
+        related_name="+",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} @{self.profile_id} {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class StatBucket(models.Model):
+    """
+    Aggregated event count for one profile (link is NULL for profile
+    views) and kind over one time bucket.
+    """
+
+    profile = models.ForeignKey(
+        Profile,
+        related_name="%(class)ss",
+        on_delete=models.CASCADE,
+    )
+    link = models.ForeignKey(
+        Link,
+        related_name="%(class)ss",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(max_length=5, choices=ProfileEvent.KIND_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+        # One row per bucket, so a rollup can't double-count. NULLs never
+        # collide in a unique index, hence the separate profile-view one.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "link", "kind", "bucket"],
+                condition=models.Q(link__isnull=False),
+                name="uniq_%(class)s_link_bucket",
+            ),
+            models.UniqueConstraint(
+                fields=["profile", "kind", "bucket"],
+                condition=models.Q(link__isnull=True),
+                name="uniq_%(class)s_profile_bucket",
+            ),
+        ]
+
+
+class HourlyStat(StatBucket):
+    bucket = models.DateTimeField()
+
+    class Meta(StatBucket.Meta):
+        ordering = ["bucket"]
+        indexes = [models.Index(fields=["profile", "bucket"])]
+
+    def __str__(self):
+        return f"@{self.profile_id} {self.kind} {self.bucket:%Y-%m-%d %H}h"
+
+
+class DailyStat(StatBucket):
+    bucket = models.DateField()
+
+    class Meta(StatBucket.Meta):
+        ordering = ["bucket"]
+        indexes = [models.Index(fields=["profile", "bucket"])]
+
+    def __str__(self):
+        return f"@{self.profile_id} {self.kind} {self.bucket:%Y-%m-%d}"
+
+
+class RollupCursor(models.Model):
+    """
+    High-water mark for incremental analytics rollups: every hour before
+    ``rolled_up_until`` has been aggregated.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    rolled_up_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.rolled_up_until}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work for the database-backed queue in
+    profiles.jobs. Workers claim rows with a conditional UPDATE, so no
+    broker (and no SELECT ... FOR UPDATE) is needed.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Enqueueing the same key again returns the existing job
+    idempotency_key = models.CharField(
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    # Visibility timeout: a running job whose lease has passed is
+    # presumed lost with its worker and may be claimed again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+            models.Index(fields=["status", "locked_until"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
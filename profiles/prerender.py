@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.urls import resolve
+
+from .assets import build_version
+from .models import Link, Profile
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without it
+    brotli = None
+
+
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "index.html"
+
+
+def _base_url():
+    return getattr(settings, "PRERENDER_BASE_URL", "http://localhost")
+
+
+def page_dir(root, handle):
+    return Path(root) / f"@{handle}"
+
+
+def profile_version(updated_at, links_updated_at):
+    """What a pre-rendered page was built from; re-render when it changes."""
+    return "|".join(
+        [
+            updated_at.isoformat(),
+            links_updated_at.isoformat() if links_updated_at else "",
+        ]
+    )
+
+
+def build_fingerprint():
+    """
+    Hash of everything besides the profile that ends up in every page:
+    the build (templates and static files) and the site URL. A change
+    means every page is stale.
+    """
+    digest = hashlib.md5()
+    digest.update(build_version().encode())
+    digest.update(_base_url().encode())
+    return digest.hexdigest()
+
+
+def load_manifest(root):
+    try:
+        with open(Path(root) / MANIFEST_NAME) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_page(directory, html):
+    """Write index.html plus its precompressed .gz (and .br) variants."""
+    data = html.encode("utf-8")
+    index = directory / INDEX_NAME
+    _write_atomic(index, data)
+    # mtime=0 keeps unchanged pages byte-identical between runs
+    _write_atomic(
+        index.with_name(INDEX_NAME + ".gz"),
+        gzip.compress(data, compresslevel=9, mtime=0),
+    )
+    if brotli is not None:
+        _write_atomic(
+            index.with_name(INDEX_NAME + ".br"), brotli.compress(data)
+        )
+
+
+def _request_for(profile):
+    base = urlsplit(_base_url())
+    path = profile.get_absolute_url()
+    request = RequestFactory().get(
+        path,
+        HTTP_HOST=base.netloc,
+        secure=base.scheme == "https",
+    )
+    request.resolver_match = resolve(path)
+    return request
+
+
+def render_page(profile):
+    """The public page for ``profile``, as public_profile would render it."""
+    return render_to_string(
+        "profiles/profile_detail.html",
+        {
+            "profile": profile,
+            "links": profile.ordered_links,
+            "public_page": True,
+        },
+        request=_request_for(profile),
+    )
+
+
+def prerender(root=None, force=False, batch_size=200):
+    """
+    Bring the pre-rendered tree under ``root`` (default PRERENDER_ROOT)
+    up to date: render profiles that are new or changed since the last
+    run and remove pages for profiles deleted or renamed since.
+
+    Returns counts of pages rendered, removed and left unchanged.
+    """
+    root = Path(root or settings.PRERENDER_ROOT)
+    manifest = load_manifest(root)
+    fingerprint = build_fingerprint()
+    if manifest.get("fingerprint") != fingerprint:
+        force = True
+    built = {} if force else manifest.get("profiles", {})
+
+    current = {
+        str(pk): {
+            "handle": handle,
+            "version": profile_version(updated_at, links_updated_at),
+        }
+        for pk, handle, updated_at, links_updated_at in (
+            Profile.objects.values_list(
+                "pk", "handle", "updated_at", "links_updated_at"
+            ).iterator(chunk_size=2000)
+        )
+    }
+
+    # What's on disk after removing pages of deleted and renamed profiles
+    pages = {}
+    for pk, entry in manifest.get("profiles", {}).items():
+        now = current.get(pk)
+        if now is not None and now["handle"] == entry["handle"]:
+            pages[pk] = entry
+        else:
+            shutil.rmtree(page_dir(root, entry["handle"]), ignore_errors=True)
+    removed = len(manifest.get("profiles", {})) - len(pages)
+
+    stale = [pk for pk, entry in current.items() if built.get(pk) != entry]
+    profiles = Profile.objects.prefetch_related(
+        Prefetch(
+            "links",
+            queryset=Link.objects.order_by("position", "id"),
+            to_attr="ordered_links",
+        )
+    )
+    rendered = 0
+    for start in range(0, len(stale), batch_size):
+        for profile in profiles.filter(pk__in=stale[start:start + batch_size]):
+            pk = str(profile.pk)
+            old = pages.get(pk)
+            if old and old["handle"] != profile.handle:  # renamed mid-run
+                shutil.rmtree(page_dir(root, old["handle"]), ignore_errors=True)
+            write_page(page_dir(root, profile.handle), render_page(profile))
+            rendered += 1
+            # Record what was rendered, not what was listed above: the
+            # profile may have changed in between.
+            pages[pk] = {
+                "handle": profile.handle,
+                "version": profile_version(
+                    profile.updated_at, profile.links_updated_at
+                ),
+            }
+
+    # Written last: if the run dies part-way, the next one redoes the rest
+    _write_atomic(
+        root / MANIFEST_NAME,
+        json.dumps(
+            {"fingerprint": fingerprint, "profiles": pages}, indent=1
+        ).encode(),
+    )
+    return {
+        "rendered": rendered,
+        "removed": removed,
+        "unchanged": len(current) - len(stale),
+    }
@@ -0,0 +1,241 @@
+import csv
+import json
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .handles import handle_base, handle_stem, next_free_handle
+from .imports import clean_links
+from .models import Link, Profile, handle_validator
+
+
+# Key of the placeholder record iter_records yields for an unreadable line
+INVALID = "_invalid"
+
+# Prefix lookups ORed into one query when resolving handle collisions
+STEMS_PER_QUERY = 100
+
+
+def iter_records(fh, fmt):
+    """
+    Stream account records from an open CSV or JSONL file.
+
+    CSV columns: username, email, password, handle, display_name and
+    links (``url`` or ``title|url`` entries separated by spaces). JSONL
+    objects use the same keys, with ``links`` as a list of URL strings
+    or {"title", "url"} objects.
+    """
+    if fmt == "jsonl":
+        for number, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            # A bad line is yielded as a rejected record rather than
+            # raised, so it can't end the run (or shift the checkpoint)
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                record = {INVALID: f"line {number}: invalid JSON ({exc})"}
+            if not isinstance(record, dict):
+                record = {INVALID: f"line {number}: not a JSON object"}
+            yield record
+        return
+
+    for row in csv.DictReader(fh):
+        links = []
+        for item in (row.get("links") or "").split():
+            title, _, url = item.rpartition("|")
+            links.append({"title": title, "url": url})
+        row["links"] = links
+        yield row
+
+
+def _clean_record(record, unusable_passwords):
+    if INVALID in record:
+        raise ValidationError(record[INVALID])
+    username = str(record.get("username") or "").strip()
+    if not username:
+        raise ValidationError("missing username")
+    if len(username) > 150:
+        raise ValidationError("username too long")
+
+    password = record.get("password") or None
+    if unusable_passwords:
+        password = None
+    elif password:
+        try:
+            identify_hasher(password)
+        except ValueError:
+            raise ValidationError(
+                "password is not a recognised hash "
+                "(pass --unusable-passwords to ignore passwords)"
+            )
+
+    handle = str(record.get("handle") or "").strip().lower()
+    if handle:
+        handle_validator(handle)
+
+    links = []
+    for link in record.get("links") or []:
+        if isinstance(link, str):
+            link = {"title": "", "url": link}
+        links.append(
+            {
+                "title": str(link.get("title") or ""),
+                "url": str(link.get("url") or ""),
+            }
+        )
+
+    return {
+        "username": username,
+        "email": str(record.get("email") or "").strip(),
+        # make_password(None) gives an unusable password without hashing
+        "password": password or make_password(None),
+        # Empty if the username makes no valid handle; provision_batch
+        # then generates one
+        "handle": handle or handle_base(username),
+        "display_name": str(
+            record.get("display_name") or username
+        )[:50],
+        "links": clean_links(links),
+    }
+
+
+def _colliding(rows, taken):
+    """Rows whose handle is taken or already wanted by an earlier row."""
+    seen, colliding = set(), []
+    for r in rows:
+        if r["handle"] in taken or r["handle"] in seen:
+            colliding.append(r)
+        seen.add(r["handle"])
+    return colliding
+
+
+def _handles_under(stems):
+    """Every existing handle starting with any of ``stems``."""
+    stems = sorted(stems)
+    handles = set()
+    for start in range(0, len(stems), STEMS_PER_QUERY):
+        query = Q()
+        for stem in stems[start:start + STEMS_PER_QUERY]:
+            query |= Q(handle__startswith=stem)
+        handles.update(
+            Profile.objects.filter(query).values_list("handle", flat=True)
+        )
+    return handles
+
+
+def provision_batch(records, unusable_passwords=False):
+    """
+    Create users, profiles and links for one batch of raw records.
+
+    Everything is inserted with bulk_create inside one transaction, which
+    bypasses the per-user post_save profile signal; profiles are created
+    here in bulk instead. Returns (created, skipped) where ``skipped`` is
+    a list of (username, reason) pairs for invalid or duplicate rows.
+    """
+    skipped, rows, seen = [], [], set()
+    for record in records:
+        try:
+            row = _clean_record(record, unusable_passwords)
+        except ValidationError as exc:
+            skipped.append(
+                (record.get("username") or "?", "; ".join(exc.messages))
+            )
+            continue
+        if row["username"] in seen:
+            skipped.append((row["username"], "duplicate in input"))
+            continue
+        seen.add(row["username"])
+        rows.append(row)
+
+    with transaction.atomic():
+        existing = set(
+            User.objects.filter(username__in=seen).values_list(
+                "username", flat=True
+            )
+        )
+        skipped.extend((u, "user already exists") for u in existing)
+        rows = [r for r in rows if r["username"] not in existing]
+        if not rows:
+            return 0, skipped
+
+        User.objects.bulk_create(
+            [
+                User(
+                    username=r["username"],
+                    email=r["email"],
+                    password=r["password"],
+                )
+                for r in rows
+            ]
+        )
+        # Re-read ids rather than rely on bulk_create returning them
+        user_ids = dict(
+            User.objects.filter(
+                username__in=[r["username"] for r in rows]
+            ).values_list("username", "id")
+        )
+
+        for r in rows:
+            r["handle"] = r["handle"] or f"user{user_ids[r['username']]}"
+
+        # Requested handles that are free keep their name; the rest get
+        # the next free suffix, never handing one out twice in a batch.
+        wanted = {r["handle"] for r in rows}
+        taken = set(
+            Profile.objects.filter(handle__in=wanted).values_list(
+                "handle", flat=True
+            )
+        )
+        colliding = _colliding(rows, taken)
+        # Every handle under the colliding rows' prefixes, fetched up
+        # front instead of one prefix query per row
+        nearby = _handles_under({handle_stem(r["handle"]) for r in colliding})
+        assigned = set()
+        for r in rows:
+            handle = r["handle"]
+            if handle in taken or handle in assigned:
+                handle = (
+                    next_free_handle(handle, reserved=assigned, taken=nearby)
+                    or f"user{user_ids[r['username']]}"
+                )
+            assigned.add(handle)
+            r["handle"] = handle
+
+        now = timezone.now()
+        Profile.objects.bulk_create(
+            [
+                Profile(
+                    user_id=user_ids[r["username"]],
+                    handle=r["handle"],
+                    display_name=r["display_name"],
+                    links_updated_at=now if r["links"] else None,
+                )
+                for r in rows
+            ]
+        )
+        profile_ids = dict(
+            Profile.objects.filter(
+                handle__in=[r["handle"] for r in rows]
+            ).values_list("handle", "id")
+        )
+
+        Link.objects.bulk_create(
+            [
+                Link(
+                    profile_id=profile_ids[r["handle"]],
+                    title=link["title"],
+                    url=link["url"],
+                    position=n,
+                )
+                for r in rows
+                for n, link in enumerate(r["links"], start=1)
+            ],
+            batch_size=1000,
+        )
+
+    return len(rows), skipped
@@ -0,0 +1,235 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Profile
+
+
+# ---------- Index DDL (applied by migration 0011, repaired on migrate) ----------
+
+FTS_TABLE = "profiles_profile_fts"
+
+SQLITE_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        handle, display_name, bio,
+        content='profiles_profile', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='1 2 3'
+    )
+"""
+
+# Django rebuilds SQLite tables for many ALTERs, which drops triggers;
+# repair_index() puts them back after every migrate.
+SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON profiles_profile
+        BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, handle, display_name, bio)
+            VALUES (new.id, new.handle, new.display_name, new.bio);
+        END
+    """,
+    f"{FTS_TABLE}_ad": f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON profiles_profile
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, handle, display_name, bio)
+            VALUES ('delete', old.id, old.handle, old.display_name, old.bio);
+        END
+    """,
+    # Only when an indexed column changes, not on every avatar or
+    # link-version save
+    f"{FTS_TABLE}_au": f"""
+        CREATE TRIGGER {FTS_TABLE}_au
+        AFTER UPDATE OF handle, display_name, bio ON profiles_profile
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, handle, display_name, bio)
+            VALUES ('delete', old.id, old.handle, old.display_name, old.bio);
+            INSERT INTO {FTS_TABLE}(rowid, handle, display_name, bio)
+            VALUES (new.id, new.handle, new.display_name, new.bio);
+        END
+    """,
+}
+
+# Handle matches outrank display name matches, which outrank bio ones.
+# The query below must repeat this expression exactly to use the index.
+POSTGRES_DOCUMENT = """(
+    setweight(to_tsvector('simple'::regconfig, handle), 'A')
+    || setweight(to_tsvector('simple'::regconfig, display_name), 'B')
+    || setweight(to_tsvector('simple'::regconfig, bio), 'C')
+)"""
+
+POSTGRES_INDEX = f"""
+    CREATE INDEX IF NOT EXISTS profiles_profile_search
+    ON profiles_profile USING gin ({POSTGRES_DOCUMENT})
+"""
+
+
+def create_index(conn):
+    """Create the full-text index for ``conn``'s database, if supported."""
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(SQLITE_TABLE)
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+        elif conn.vendor == "postgresql":
+            cursor.execute(POSTGRES_INDEX)
+
+
+def drop_index(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif conn.vendor == "postgresql":
+            cursor.execute("DROP INDEX IF EXISTS profiles_profile_search")
+
+
+def repair_index(conn):
+    """
+    Recreate SQLite sync triggers lost to a table rebuild and resync the
+    index. Returns True if anything had to be repaired.
+    """
+    if conn.vendor != "sqlite":
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+            " AND name LIKE %s",
+            [f"{FTS_TABLE}%"],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+    if FTS_TABLE not in existing:
+        return False  # not migrated yet (or migrated backwards)
+    missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+    if not missing:
+        return False
+    with conn.cursor() as cursor:
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+# ---------- Queries ----------
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_HANDLE_CHARS = re.compile(r"[^a-z0-9_]")
+
+MAX_TERMS = 8
+
+
+def _terms(query):
+    return _WORD.findall(query.lower())[:MAX_TERMS]
+
+
+def _max_candidates():
+    return getattr(settings, "SEARCH_MAX_CANDIDATES", 5000)
+
+
+def _ids_sqlite(terms, limit):
+    # Every term is quoted (so FTS5 operators in user input are inert)
+    # and prefix-matched; the prefix indexes keep short prefixes fast
+    match = " ".join(f'"{term}"*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM ("
+            f" SELECT rowid, bm25({FTS_TABLE}, 10.0, 4.0, 1.0) AS score"
+            f" FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s"
+            f") ORDER BY score LIMIT %s",
+            [match, _max_candidates(), limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _ids_postgres(terms, limit):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id FROM ("
+            f" SELECT id, ts_rank({POSTGRES_DOCUMENT}, query) AS score"
+            f" FROM profiles_profile, to_tsquery('simple', %s) query"
+            f" WHERE {POSTGRES_DOCUMENT} @@ query LIMIT %s"
+            f") candidates ORDER BY score DESC, id LIMIT %s",
+            [tsquery, _max_candidates(), limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _ids_fallback(terms, limit):
+    # Unindexed: only for databases without a full-text backend here
+    from django.db.models import Q
+
+    profiles = Profile.objects.all()
+    for term in terms:
+        profiles = profiles.filter(
+            Q(handle__istartswith=term)
+            | Q(display_name__icontains=term)
+            | Q(bio__icontains=term)
+        )
+    return list(profiles.order_by("handle").values_list("id", flat=True)[:limit])
+
+
+def _handles_starting_with(prefix):
+    """Profiles whose handle starts with ``prefix``, via the handle index."""
+    profiles = Profile.objects.all()
+    if connection.vendor == "postgresql":
+        # LIKE 'abc%' uses the varchar_pattern_ops index Django adds
+        return profiles.filter(handle__startswith=prefix)
+    # SQLite won't use an index for LIKE ... ESCAPE; handles are
+    # [a-z0-9_], all of which sort below "~"
+    return profiles.filter(handle__gte=prefix, handle__lt=prefix + "~")
+
+
+def search_profiles(query, limit=20):
+    """
+    Profiles matching every word of ``query`` as a prefix, best first.
+    Handle matches rank above display name matches, then bio matches.
+
+    Only the first SEARCH_MAX_CANDIDATES full-text matches are ranked, so
+    a query matching a large part of a big directory stays fast; the
+    ranking is then best-of-a-sample rather than exact.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    ids = []
+    if len(terms) == 1 and not _HANDLE_CHARS.search(terms[0]):
+        # A short prefix can match a large share of all profiles, and
+        # ranking them all is what makes full-text search slow. Handle
+        # matches rank first anyway, and an index range scan finds them
+        # at once; full-text search only tops the list up.
+        ids = list(
+            _handles_starting_with(terms[0])
+            .order_by("handle")
+            .values_list("id", flat=True)[:limit]
+        )
+    if len(ids) < limit:
+        search = {
+            "sqlite": _ids_sqlite,
+            "postgresql": _ids_postgres,
+        }.get(connection.vendor, _ids_fallback)
+        ids += [pk for pk in search(terms, limit) if pk not in ids]
+    ids = ids[:limit]
+    by_id = Profile.objects.in_bulk(ids)
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def autocomplete_handles(prefix, limit=10):
+    """
+    (handle, display_name) pairs for handles starting with ``prefix``,
+    alphabetically (so an exact match comes first). A range scan over
+    the handle's unique index; no full-text lookup involved.
+    """
+    prefix = _HANDLE_CHARS.sub("", prefix.lower().lstrip("@"))
+    if not prefix:
+        return []
+    return list(
+        _handles_starting_with(prefix)
+        .order_by("handle")
+        .values_list("handle", "display_name")[:limit]
+    )
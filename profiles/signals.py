@@ -1,28 +1,117 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db import IntegrityError, connections, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import User
+from django.utils import timezone
 
-from .models import Profile
+from .cache import forget_handles, invalidate_profile_page
+from .handles import handle_base, handle_index, next_free_handle
+from .models import Link, Profile
+from .search import repair_index
+
+
+# Sent after bulk link writes that bypass Link.save()/delete(),
+# e.g. queryset.update() or bulk_create(). Pass profile=<Profile>.
+profile_links_changed = Signal()
+
+HANDLE_ALLOCATION_ATTEMPTS = 5
 
 
 @receiver(post_save, sender=User)
 def create_profile_for_user(sender, instance, created, **kwargs):
     if created and not hasattr(instance, "profile"):
-        # Pick a temporary unique handle; user can change it later
-        base = (instance.username or f"user{instance.id}").lower()
-        handle = base[:15] or f"user{instance.id}"
-
-        # Ensure uniqueness if needed
-        orig = handle
-        i = 1
-        while Profile.objects.filter(handle=handle).exists():
-            suffix = str(i)
-            allowed = max(0, 15 - len(suffix))
-            handle = (orig[:allowed] + suffix) or f"user{instance.id}"
-            i += 1
-
-        Profile.objects.create(
-            user=instance,
-            handle=handle,
-            display_name=instance.username or f"User {instance.id}",
-        )
\ No newline at end of file
+        # Pick a temporary unique handle; user can change it later. Same
+        # derivation as provisioning, so it always passes handle_validator
+        fallback = f"user{instance.id}"
+        base = handle_base(instance.username) or fallback
+
+        for attempt in range(HANDLE_ALLOCATION_ATTEMPTS):
+            handle = next_free_handle(base) or fallback
+            try:
+                # Savepoint, so losing a race to a concurrent signup
+                # (uniq_profile_handle_ci) doesn't poison the outer
+                # transaction; pick again from fresh data.
+                with transaction.atomic():
+                    Profile.objects.create(
+                        user=instance,
+                        handle=handle,
+                        display_name=instance.username or f"User {instance.id}",
+                    )
+                return
+            except IntegrityError:
+                if attempt == HANDLE_ALLOCATION_ATTEMPTS - 1:
+                    raise
+
+
+# ---------- Cache invalidation & link versioning ----------
+
+
+@receiver(post_init, sender=Profile)
+def remember_loaded_handle(sender, instance, **kwargs):
+    # Lets the save receiver purge the old URL after a handle change.
+    # Read __dict__ so deferred instances don't trigger a query.
+    instance._loaded_handle = instance.__dict__.get("handle")
+
+
+@receiver(post_save, sender=Profile)
+def purge_caches_on_profile_save(sender, instance, **kwargs):
+    # Covers creation (drops a cached "no such handle") and renames
+    invalidate_profile_page(instance.handle, instance._loaded_handle)
+    forget_handles(instance.handle, instance._loaded_handle)
+    handle_index.add(instance.handle)
+    instance._loaded_handle = instance.handle
+
+
+@receiver(post_delete, sender=Profile)
+def purge_caches_on_profile_delete(sender, instance, **kwargs):
+    invalidate_profile_page(instance.handle, instance._loaded_handle)
+    forget_handles(instance.handle, instance._loaded_handle)
+
+
+def _links_changed(profile_id):
+    # Cheap version marker for ETag/Last-Modified; no model save, so no
+    # profile signals fire.
+    Profile.objects.filter(pk=profile_id).update(
+        links_updated_at=timezone.now()
+    )
+
+
+def _purge_for_link(link):
+    _links_changed(link.profile_id)
+    try:
+        profile = link.profile
+    except Profile.DoesNotExist:
+        return
+    invalidate_profile_page(profile.handle)
+
+
+@receiver(post_init, sender=Link)
+def remember_loaded_url(sender, instance, **kwargs):
+    # Lets Link.save clear the check result after the URL is edited
+    instance._loaded_url = instance.__dict__.get("url")
+
+
+@receiver(post_save, sender=Link)
+def purge_page_on_link_save(sender, instance, **kwargs):
+    instance._loaded_url = instance.url
+    _purge_for_link(instance)
+
+
+@receiver(post_delete, sender=Link)
+def purge_page_on_link_delete(sender, instance, **kwargs):
+    _purge_for_link(instance)
+
+
+@receiver(profile_links_changed)
+def purge_page_on_bulk_link_change(sender, profile, **kwargs):
+    _links_changed(profile.pk)
+    invalidate_profile_page(profile.handle)
+
+
+# ---------- Search index ----------
+
+
+def repair_search_index(sender, using, **kwargs):
+    # Connected in ProfilesConfig.ready: SQLite table rebuilds in later
+    # migrations drop the FTS sync triggers
+    repair_index(connections[using])
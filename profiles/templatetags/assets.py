@@ -0,0 +1,29 @@
+from django import template
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+from profiles.assets import built_font_faces, read_static
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def inline_static(path):
+    """Contents of a static CSS file, for a <style> block."""
+    # A stray "</style>" (or "</script>") can't close the element early
+    return mark_safe(read_static(path).replace("</", "<\\/"))
+
+
+@register.simple_tag
+def site_url(path):
+    """``path`` on the canonical SITE_URL, whatever host was requested."""
+    return getattr(settings, "SITE_URL", "http://localhost:8000") + path
+
+
+@register.inclusion_tag("includes/fonts.html")
+def font_links():
+    return {
+        "faces": built_font_faces(),
+        "google_fallback": getattr(settings, "GOOGLE_FONTS_FALLBACK", True),
+    }
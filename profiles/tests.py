@@ -1,3 +1,1597 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404, HttpResponse
+from django.template import Context, Template
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    analytics,
+    benchmark,
+    exports,
+    imports,
+    jobs,
+    linkcheck,
+    metrics,
+    prerender,
+    provisioning,
+    search,
+    views,
+)
+from .assets import FONT_FACES, build_version, extract_critical_css
+from .cache import (
+    HandleCache,
+    get_cached_profile_page,
+    get_profile_for_handle,
+    handle_cache,
+)
+from .forms import ProfileForm
+from .handles import HandleIndex, handle_index
+from .middleware import NAV_HINT_COOKIE, AsyncWhiteNoiseMiddleware
+from .models import (
+    DailyStat,
+    HourlyStat,
+    Job,
+    Link,
+    Profile,
+    ProfileEvent,
+    handle_validator,
+)
+from .tracking import TrackingBuffer, tracking_buffer
+
+
+class HandleAllocationTests(TestCase):
+    def test_colliding_signup_uses_bounded_queries(self):
+        taken = ["john_smith"] + [f"john_smith{i}" for i in range(1, 3000)]
+        users = User.objects.bulk_create(
+            [User(username=f"seed{i}") for i in range(len(taken))]
+        )
+        Profile.objects.bulk_create(
+            [
+                Profile(user=user, handle=handle, display_name=handle)
+                for user, handle in zip(users, taken)
+            ]
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            user = User.objects.create(username="john_smith")
+
+        # User insert, existing-profile check, one prefix query, then
+        # savepoint + profile insert: independent of the 3000 collisions
+        self.assertLessEqual(len(ctx.captured_queries), 6)
+        self.assertEqual(user.profile.handle, "john_smith3000")
+
+    def test_suffix_truncates_long_base(self):
+        User.objects.create(username="abcdefghijklmno")
+        user = User.objects.create(username="ABCDEFGHIJKLMNO")
+        self.assertEqual(user.profile.handle, "abcdefghijklmn1")
+
+
+    def test_usernames_that_are_not_valid_handles(self):
+        handles = {}
+        for username in ("jo.doe", "a+b@x", "ab", "Jo.Doe"):
+            user = User.objects.create(username=username)
+            handle_validator(user.profile.handle)
+            handles[username] = (user.profile.handle, user.pk)
+        self.assertEqual(handles["jo.doe"][0], "jodoe")
+        self.assertEqual(handles["Jo.Doe"][0], "jodoe1")
+        for username in ("a+b@x", "ab"):  # too short once cleaned
+            handle, pk = handles[username]
+            self.assertEqual(handle, f"user{pk}")
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.profile = User.objects.create_user("rolled_up").profile
+        self.link = Link.objects.create(
+            profile=self.profile, title="A", url="https://a.test"
+        )
+        self.now = timezone.now()
+        ProfileEvent.objects.bulk_create(
+            [
+                ProfileEvent(
+                    profile=self.profile,
+                    link=self.link if i % 3 == 0 else None,
+                    kind=ProfileEvent.CLICK if i % 3 == 0 else ProfileEvent.VIEW,
+                    created_at=self.now - timedelta(minutes=20 * i),
+                )
+                for i in range(12)
+            ]
+        )
+
+    def totals(self):
+        return {
+            model.__name__: list(
+                model.objects.order_by("bucket", "kind", "link_id").values_list(
+                    "link_id", "kind", "bucket", "count"
+                )
+            )
+            for model in (HourlyStat, DailyStat)
+        }
+
+    def test_rerunning_over_the_same_events_does_not_double_count(self):
+        analytics.rollup(now=self.now)
+        first = self.totals()
+        self.assertEqual(sum(row[3] for row in first["HourlyStat"]), 12)
+        analytics.rollup(now=self.now)
+        analytics.rollup(now=self.now + timedelta(minutes=5))
+        self.assertEqual(self.totals(), first)
+
+    def test_buckets_are_unique(self):
+        analytics.rollup(now=self.now)
+        row = HourlyStat.objects.filter(link__isnull=True).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            HourlyStat.objects.create(
+                profile=self.profile, kind=row.kind, bucket=row.bucket, count=1
+            )
+
+
+class ProvisioningTests(TestCase):
+    def handles(self):
+        return dict(Profile.objects.values_list("user__username", "handle"))
+
+    def test_usernames_that_are_not_valid_handles(self):
+        created, skipped = provisioning.provision_batch(
+            [
+                {"username": "averyveryverylongusername"},
+                {"username": "jo.doe@x.com"},
+                {"username": "ab"},
+            ]
+        )
+        self.assertEqual((created, skipped), (3, []))
+        handles = self.handles()
+        for handle in handles.values():
+            handle_validator(handle)
+        self.assertEqual(handles["averyveryverylongusername"], "averyveryverylo")
+        self.assertEqual(handles["jo.doe@x.com"], "jodoexcom")
+        self.assertEqual(
+            handles["ab"], f"user{User.objects.get(username='ab').pk}"
+        )
+
+    def test_malformed_jsonl_line_is_rejected_not_fatal(self):
+        fh = io.StringIO(
+            '{"username": "first_one"}\n{oops\n[1]\n{"username": "last_one"}\n'
+        )
+        created, skipped = provisioning.provision_batch(
+            provisioning.iter_records(fh, "jsonl")
+        )
+        self.assertEqual(created, 2)
+        self.assertEqual(len(skipped), 2)
+        self.assertIn("line 2: invalid JSON", skipped[0][1])
+        self.assertIn("line 3: not a JSON object", skipped[1][1])
+
+    def test_collisions_cost_the_same_queries_at_any_batch_size(self):
+        User.objects.create_user("collide")
+
+        def run(prefix, n):
+            records = [
+                {"username": f"{prefix}{i}", "handle": "collide"}
+                for i in range(n)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                created, _ = provisioning.provision_batch(records)
+            self.assertEqual(created, n)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(run("small", 3), run("large", 30))
+        self.assertEqual(len(set(self.handles().values())), 34)
+
+    def test_command_resumes_from_checkpoint(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = Path(directory) / "accounts.jsonl"
+        path.write_text(
+            "".join(
+                json.dumps({"username": f"member{i}"}) + "\n" for i in range(5)
+            )
+        )
+        checkpoint = Path(f"{path}.checkpoint")
+        checkpoint.write_text(json.dumps({"records": 3}))
+
+        call_command(
+            "provision_users", str(path), "--resume", "--unusable-passwords",
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(sorted(self.handles()), ["member3", "member4"])
+        self.assertEqual(json.loads(checkpoint.read_text()), {"records": 5})
+
+
+class LinkImportTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("importer")
+        self.profile = user.profile
+        Link.objects.create(profile=self.profile, url="https://a.example")
+
+    def test_parse_csv_and_json(self):
+        self.assertEqual(
+            imports.parse_links("URL,Title\nhttps://x.example,X\n", "csv"),
+            [{"title": "X", "url": "https://x.example"}],
+        )
+        self.assertEqual(
+            imports.parse_links("https://x.example\nY,https://y.example\n", "csv"),
+            [
+                {"title": "", "url": "https://x.example"},
+                {"title": "Y", "url": "https://y.example"},
+            ],
+        )
+        self.assertEqual(
+            imports.parse_links(
+                '["https://x.example", {"title": "Y", "url": "https://y.example"}]',
+                "json",
+            ),
+            [
+                {"title": "", "url": "https://x.example"},
+                {"title": "Y", "url": "https://y.example"},
+            ],
+        )
+        for text in ("{oops", '{"url": "https://x.example"}', "[1]"):
+            with self.assertRaises(ValidationError):
+                imports.parse_links(text, "json")
+
+    def test_parse_json_lines(self):
+        self.assertEqual(imports.guess_format("links.jsonl"), "jsonl")
+        text = (
+            '{"title": "X", "url": "https://x.example"}\n\n'
+            '"https://y.example"\n'
+        )
+        self.assertEqual(
+            imports.parse_links(text, "jsonl"),
+            [
+                {"title": "X", "url": "https://x.example"},
+                {"title": "", "url": "https://y.example"},
+            ],
+        )
+        with self.assertRaisesMessage(ValidationError, "Line 2: invalid JSON"):
+            imports.parse_links('"https://x.example"\n{oops\n', "jsonl")
+        with self.assertRaisesMessage(ValidationError, "Line 1: Each JSON"):
+            imports.parse_links("[1]\n", "jsonl")
+
+    def test_bad_urls_are_reported_together_by_row(self):
+        rows = imports.parse_links(
+            "https://ok.example\nnot a url\nftp//nope\n", "csv"
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            imports.clean_links(rows)
+        messages = ctx.exception.messages
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(messages[0].startswith("Row 2: "))
+        self.assertTrue(messages[1].startswith("Row 3: "))
+
+    @override_settings(LINK_IMPORT_MAX_ROWS=2)
+    def test_row_limit(self):
+        rows = [{"title": "", "url": f"https://{i}.example"} for i in range(3)]
+        with self.assertRaisesMessage(ValidationError, "the limit is 2"):
+            imports.clean_links(rows)
+        self.assertEqual(len(imports.clean_links(rows[:2])), 2)
+
+    def test_single_save_inserts_before_releasing_the_lock(self):
+        with CaptureQueriesContext(connection) as ctx:
+            Link.objects.create(profile=self.profile, url="https://b.example")
+        statements = [q["sql"].split()[0] for q in ctx.captured_queries]
+        # The profile lock and MAX(position) read, then the INSERT, all
+        # inside the one savepoint
+        self.assertEqual(
+            statements[:4], ["SAVEPOINT", "SELECT", "SELECT", "INSERT"]
+        )
+        self.assertIn("RELEASE", statements[4:])
+
+    def test_duplicates_are_appended_in_order(self):
+        rows = imports.clean_links(
+            imports.parse_links("https://b.example\nhttps://b.example\n", "csv")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            imports.import_links(self.profile, rows)
+        # A single save after the import continues the same sequence
+        Link.objects.create(profile=self.profile, url="https://c.example")
+        self.assertEqual(
+            list(self.profile.links.values_list("url", "position")),
+            [
+                ("https://a.example", 1),
+                ("https://b.example", 2),
+                ("https://b.example", 3),
+                ("https://c.example", 4),
+            ],
+        )
+        self.profile.refresh_from_db()
+        self.assertIsNotNone(self.profile.links_updated_at)
+
+
+class LinkEditorTests(TestCase):
+    def setUp(self):
+        self.profile = User.objects.create_user("editor_1").profile
+
+    def formset(self, n):
+        """
+        A validated editor submission over ``n`` new links: delete the
+        first, reverse the rest, retitle one and add a row.
+        """
+        links = [
+            Link.objects.create(profile=self.profile, url=f"https://{i}.example")
+            for i in range(n)
+        ]
+        data = {
+            "links-TOTAL_FORMS": str(n + 1),
+            "links-INITIAL_FORMS": str(n),
+            "links-MIN_NUM_FORMS": "0",
+            "links-MAX_NUM_FORMS": "1000",
+        }
+        for i, link in enumerate(links):
+            data.update(
+                {
+                    f"links-{i}-id": str(link.pk),
+                    f"links-{i}-title": "Edited" if i == 1 else "",
+                    f"links-{i}-url": link.url,
+                    f"links-{i}-ORDER": str(n - i),
+                }
+            )
+        data["links-0-DELETE"] = "on"
+        data.update(
+            {f"links-{n}-url": "https://new.example", f"links-{n}-ORDER": "99"}
+        )
+        formset = views.LinkFormSet(
+            data,
+            instance=self.profile,
+            queryset=self.profile.links.order_by("position", "id"),
+        )
+        self.assertTrue(formset.is_valid(), formset.errors)
+        return formset
+
+    def test_query_count_does_not_grow_with_links(self):
+        for n in (3, 20):
+            Link.objects.all().delete()
+            formset = self.formset(n)
+            with self.assertNumQueries(8):
+                views._apply_link_changes(self.profile, formset)
+            urls = list(self.profile.links.values_list("url", flat=True))
+            self.assertEqual(
+                urls,
+                [f"https://{i}.example" for i in range(n - 1, 0, -1)]
+                + ["https://new.example"],
+            )
+            self.assertEqual(
+                list(self.profile.links.values_list("position", flat=True)),
+                list(range(1, n + 1)),
+            )
+
+    def test_deleted_links_take_their_stats(self):
+        formset = self.formset(3)
+        deleted = formset.forms[0].instance
+        DailyStat.objects.create(
+            profile=self.profile,
+            link=deleted,
+            kind=ProfileEvent.CLICK,
+            bucket=timezone.now().date(),
+            count=1,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            views._apply_link_changes(self.profile, formset)
+        self.assertFalse(Link.objects.filter(pk=deleted.pk).exists())
+        self.assertFalse(DailyStat.objects.exists())
+        self.profile.refresh_from_db()
+        self.assertIsNotNone(self.profile.links_updated_at)
+
+    def test_links_missing_from_the_post_follow_the_submitted_ones(self):
+        formset = self.formset(3)
+        # Added after the editor loaded, past a gap
+        Link.objects.create(
+            profile=self.profile, url="https://late.example", position=7
+        )
+        views._apply_link_changes(self.profile, formset)
+        self.assertEqual(
+            list(self.profile.links.values_list("url", "position")),
+            [
+                ("https://2.example", 1),
+                ("https://1.example", 2),
+                ("https://new.example", 3),
+                ("https://late.example", 4),
+            ],
+        )
+
+    def test_new_row_with_a_link_added_since_the_editor_loaded(self):
+        for name in ("a", "b"):
+            Link.objects.create(
+                profile=self.profile, url=f"https://{name}.example"
+            )
+        loaded = list(self.profile.links.order_by("position"))
+        # e.g. through the JSON create endpoint, in another tab
+        Link.objects.create(profile=self.profile, url="https://c.example")
+
+        data = {
+            "links-TOTAL_FORMS": "3",
+            "links-INITIAL_FORMS": "2",
+            "links-MIN_NUM_FORMS": "0",
+            "links-MAX_NUM_FORMS": "1000",
+            "links-2-url": "https://d.example",
+            "links-2-ORDER": "3",
+        }
+        for i, link in enumerate(loaded):
+            data.update(
+                {
+                    f"links-{i}-id": str(link.pk),
+                    f"links-{i}-url": link.url,
+                    f"links-{i}-ORDER": str(i + 1),
+                }
+            )
+        formset = views.LinkFormSet(
+            data,
+            instance=self.profile,
+            queryset=self.profile.links.filter(
+                pk__in=[link.pk for link in loaded]
+            ),
+        )
+        self.assertTrue(formset.is_valid(), formset.errors)
+        views._apply_link_changes(self.profile, formset)
+        self.assertEqual(
+            list(self.profile.links.values_list("url", "position")),
+            [
+                ("https://a.example", 1),
+                ("https://b.example", 2),
+                ("https://d.example", 3),
+                ("https://c.example", 4),
+            ],
+        )
+
+
+class TrackingTests(TestCase):
+    def setUp(self):
+        self.addCleanup(tracking_buffer.drain)
+        self.profile = User.objects.create_user("tracked_1").profile
+        self.link = Link.objects.create(
+            profile=self.profile, url="https://dest.example/"
+        )
+
+    def buffer(self, **kwargs):
+        buffer = TrackingBuffer(3600, **kwargs)
+        self.addCleanup(lambda: buffer._timer and buffer._timer.cancel())
+        return buffer
+
+    def test_redirect_buffers_the_click(self):
+        url = reverse("link-redirect", args=[self.link.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertRedirects(
+            response, "https://dest.example/", fetch_redirect_response=False
+        )
+        self.assertIn("no-cache", response["Cache-Control"])
+        missing = reverse("link-redirect", args=[self.link.pk + 1])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+        self.assertEqual(tracking_buffer.flush(), 1)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.click_count, 1)
+        event = ProfileEvent.objects.get()
+        self.assertEqual(
+            (event.profile_id, event.link_id, event.kind),
+            (self.profile.pk, self.link.pk, ProfileEvent.CLICK),
+        )
+
+    def test_flush_adds_up_clicks_in_one_update(self):
+        buffer = self.buffer()
+        for _ in range(3):
+            buffer.add_click(self.link.pk, self.profile.pk)
+        buffer.add_view(self.profile.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(buffer.flush(), 4)
+        writes = [
+            q["sql"].split()[0]
+            for q in ctx.captured_queries
+            if "SAVEPOINT" not in q["sql"]
+        ]
+        self.assertEqual(writes, ["UPDATE", "INSERT"])
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.click_count, 3)
+        self.assertEqual(ProfileEvent.objects.count(), 4)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_failed_flush_requeues_in_order_dropping_the_oldest(self):
+        buffer = self.buffer(max_events=3)
+        for _ in range(2):
+            buffer.add_click(self.link.pk, self.profile.pk)
+        with mock.patch(
+            "profiles.tracking._write_events", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        buffer.add_view(self.profile.pk)
+        buffer.add_view(self.profile.pk)
+
+        counts, events = buffer.drain()
+        self.assertEqual(counts, {self.link.pk: 2})
+        self.assertEqual(
+            [kind for _, _, kind, _ in events],
+            [ProfileEvent.CLICK, ProfileEvent.VIEW, ProfileEvent.VIEW],
+        )
+        times = [created_at for *_, created_at in events]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(buffer.dropped, 1)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(metrics, "registry", metrics.Registry())
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def counters(self):
+        counters, _ = metrics.collect()
+        return {
+            dict(labels).get("method"): value
+            for (name, labels), value in counters.items()
+            if name == "onelink_http_requests_total"
+        }
+
+    @override_settings(METRICS_DIR=None)
+    def test_middleware_labels_by_view_and_buckets_methods(self):
+        self.client.get("/")
+        self.client.generic("BREW", "/")
+        self.client.generic("PROPFIND", "/")
+        self.assertEqual(self.counters(), {"GET": 1, "other": 2})
+
+        _, histograms = metrics.collect()
+        key = ("onelink_db_queries_per_request", (("view", "index"),))
+        self.assertEqual(histograms[key][-1], 3)  # observations
+
+    def test_collect_sums_every_worker_snapshot(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = {"view": "index", "method": "GET", "status": "200"}
+        other = metrics.Registry()
+        other.inc("onelink_http_requests_total", labels, 2)
+        other.observe("onelink_http_request_duration_seconds", {}, 0.2)
+        Path(directory, "metrics-other.json").write_text(
+            json.dumps(other.snapshot())
+        )
+        Path(directory, "metrics-partial.json").write_text("{truncated")
+
+        self.registry.inc("onelink_http_requests_total", labels, 3)
+        self.registry.observe("onelink_http_request_duration_seconds", {}, 0.2)
+        with override_settings(METRICS_DIR=directory):
+            counters, histograms = metrics.collect()
+        self.assertEqual(
+            counters[
+                ("onelink_http_requests_total", tuple(sorted(labels.items())))
+            ],
+            5,
+        )
+        merged = histograms[("onelink_http_request_duration_seconds", ())]
+        self.assertEqual(merged[-1], 2)
+        self.assertAlmostEqual(merged[-2], 0.4)
+
+
+class RequestQueryCountTests(TestCase):
+    """
+    The signed-in user and their profile load in one joined query and are
+    shared by views and templates for the rest of the request.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("alice_1", password="pw-12345678")
+        cls.link = Link.objects.create(
+            profile=cls.user.profile, title="A", url="https://a.example"
+        )
+        User.objects.create_user("bobby_1", password="pw-12345678")
+
+    def setUp(self):
+        cache.clear()
+        handle_cache.clear()
+        self.addCleanup(tracking_buffer.drain)
+
+    def assertQueries(self, url, count, status=200):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status)
+
+    def test_anonymous_routes(self):
+        self.assertQueries("/", 0)
+        self.assertQueries("/@alice_1", 2)  # profile, links
+        self.assertQueries("/@alice_1", 0)  # page cache
+        self.assertQueries("/@missing_1", 1, status=404)
+        self.assertQueries("/@missing_1", 0, status=404)  # negative cache
+        self.assertQueries("/accounts/register/", 0)
+        self.assertQueries("/accounts/login/", 0)
+
+    def test_authenticated_routes(self):
+        self.client.force_login(self.user)
+        pk = self.link.pk
+        # Every route pays session + joined user/profile (2) up front
+        self.assertQueries("/", 2, status=302)
+        self.assertQueries("/post-login-redirect/", 2, status=302)
+        # Public pages never read the session: profile, links, as anonymous
+        self.assertQueries("/@alice_1", 2)
+        self.assertQueries("/@bobby_1", 2)
+        self.assertQueries("/nav/?view=profile-detail&handle=bobby_1", 2)
+        self.assertQueries("/links/", 3)  # + links
+        self.assertQueries("/links/stats/", 5)  # + three rollup queries
+        self.assertQueries("/links/import/", 2)
+        self.assertQueries("/links/create/", 2)
+        self.assertQueries(f"/links/{pk}/edit/", 3)  # + link
+        self.assertQueries(f"/links/{pk}/delete/", 3)
+        self.assertQueries("/accounts/register/", 2)
+        self.assertQueries("/accounts/login/", 2)
+
+    def test_sessions_from_the_stock_backend_stay_signed_in(self):
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        self.assertQueries("/links/", 4)  # + the profile, loaded separately
+
+        self.client.logout()
+        self.assertTrue(
+            self.client.login(username="alice_1", password="pw-12345678")
+        )
+        self.assertEqual(
+            self.client.session[BACKEND_SESSION_KEY],
+            "profiles.backends.ProfileModelBackend",
+        )
+
+
+    def test_failed_login_hashes_once(self):
+        encode = PBKDF2PasswordHasher.encode
+        for username in ("alice_1", "nobody_1"):
+            with mock.patch.object(
+                PBKDF2PasswordHasher, "encode", autospec=True,
+                side_effect=encode,
+            ) as hashed:
+                self.assertFalse(
+                    self.client.login(username=username, password="wrong-pw")
+                )
+            self.assertEqual(hashed.call_count, 1, username)
+
+
+class HandleCacheTests(TestCase):
+    def setUp(self):
+        handle_cache.clear()
+        self.addCleanup(handle_cache.clear)
+
+    def test_expiry_and_eviction(self):
+        resolver = HandleCache(max_size=2, ttl=60, negative_ttl=0)
+        resolver.set("missing", None)
+        self.assertEqual(resolver.get("missing"), (False, None))
+
+        resolver.set("first", 1)
+        resolver.set("second", 2)
+        resolver.get("first")  # now the most recently used
+        resolver.set("third", 3)
+        self.assertEqual(resolver.get("second"), (False, None))
+        self.assertEqual(resolver.get("first"), (True, 1))
+
+        resolver.invalidate("first")
+        self.assertEqual(resolver.get("first"), (False, None))
+
+    def test_missing_handles_are_cached_until_created(self):
+        self.assertIsNone(get_profile_for_handle("late_1"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_profile_for_handle("LATE_1"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user("late_1")
+        self.assertEqual(get_profile_for_handle("late_1"), user.profile)
+        with self.assertNumQueries(1):  # by primary key
+            get_profile_for_handle("late_1")
+
+    def test_stale_entry_falls_back_to_a_fresh_lookup(self):
+        first = User.objects.create_user("first_1").profile
+        second = User.objects.create_user("second_1").profile
+        # As if another worker had renamed a profile under us
+        handle_cache.set("second_1", first.pk)
+        with self.assertNumQueries(2):
+            self.assertEqual(get_profile_for_handle("second_1"), second)
+        self.assertEqual(handle_cache.get("second_1"), (True, second.pk))
+
+
+class NavHintTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(tracking_buffer.drain)
+        self.user = User.objects.create_user("hinted_1", password="pw-12345678")
+
+    def test_set_when_a_signed_in_request_loads_the_profile(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/links/")
+        self.assertEqual(response.cookies[NAV_HINT_COOKIE].value, "1")
+        # Already hinted: nothing more to send
+        response = self.client.get("/links/")
+        self.assertNotIn(NAV_HINT_COOKIE, response.cookies)
+
+    def test_public_pages_leave_the_hint_alone(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/@hinted_1")
+        self.assertNotIn(NAV_HINT_COOKIE, response.cookies)
+
+    def test_cleared_once_the_session_is_gone(self):
+        self.client.cookies[NAV_HINT_COOKIE] = "1"
+        response = self.client.get(reverse("handle-availability"))
+        self.assertEqual(response.cookies[NAV_HINT_COOKIE].value, "")
+
+        self.client.force_login(self.user)
+        self.client.cookies[NAV_HINT_COOKIE] = "1"
+        response = self.client.post(reverse("logout"))
+        self.assertEqual(response.cookies[NAV_HINT_COOKIE].value, "")
+
+
+class PublicPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        handle_cache.clear()
+        self.addCleanup(tracking_buffer.drain)
+        self.user = User.objects.create_user("alice_1", password="pw-12345678")
+
+    def test_signed_in_visitor_gets_shared_page(self):
+        anonymous = self.client.get("/@alice_1")
+        cache.clear()
+        self.client.force_login(self.user)
+        signed_in = self.client.get("/@alice_1")
+
+        self.assertEqual(signed_in.content, anonymous.content)
+        self.assertNotIn("Cookie", signed_in.get("Vary", ""))
+        self.assertIn("public", signed_in["Cache-Control"])
+        self.assertEqual(signed_in.cookies, {})
+
+    def test_nav_fragment_is_personalised(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/nav/?view=profile-detail&handle=alice_1")
+        data = response.json()
+        self.assertIn("Edit my profile", data["nav"])
+        self.assertIn("@alice_1 logged on", data["status"])
+        self.assertEqual(response.cookies[NAV_HINT_COOKIE].value, "1")
+
+        self.client.logout()
+        self.client.cookies[NAV_HINT_COOKIE] = "1"
+        response = self.client.get("/nav/?view=profile-detail&handle=alice_1")
+        self.assertIn("Sign in", response.json()["nav"])
+        self.assertEqual(response.cookies[NAV_HINT_COOKIE].value, "")
+
+    def test_if_none_match_gets_304_until_the_build_changes(self):
+        etag = self.client.get("/@alice_1")["ETag"]
+        # From the page cache, then from the database
+        for _ in range(2):
+            response = self.client.get("/@alice_1", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+            cache.clear()
+
+        self.addCleanup(build_version.cache_clear)
+        with override_settings(BUILD_VERSION="next-release"):
+            build_version.cache_clear()
+            response = self.client.get("/@alice_1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(SITE_URL="https://onelink.example")
+    def test_share_link_ignores_requested_host(self):
+        response = self.client.get("/@alice_1", HTTP_HOST="localhost")
+        self.assertContains(
+            response, "body=https%3A//onelink.example/%40alice_1"
+        )
+        self.assertNotContains(response, "localhost")
+
+    def test_writes_purge_the_cached_page(self):
+        profile = self.user.profile
+
+        def assert_purged(write, handle="alice_1"):
+            self.client.get(f"/@{handle}")
+            self.assertIsNotNone(get_cached_profile_page(handle))
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            self.assertIsNone(get_cached_profile_page(handle))
+
+        link = Link(profile=profile, url="https://a.example")
+        assert_purged(profile.save)
+        assert_purged(link.save)
+        link.title = "A"
+        assert_purged(link.save)
+        assert_purged(link.delete)
+
+        profile.handle = "alice_2"
+        assert_purged(profile.save)
+        self.assertEqual(self.client.get("/@alice_1").status_code, 404)
+        self.assertEqual(self.client.get("/@alice_2").status_code, 200)
+
+
+class AsyncPublicProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        handle_cache.clear()
+        self.addCleanup(tracking_buffer.drain)
+        user = User.objects.create_user("async_1")
+        Link.objects.create(profile=user.profile, url="https://a.example")
+
+    def request(self, path, headers=None):
+        request = AsyncRequestFactory().get(path, headers=headers)
+        request.resolver_match = resolve(path)
+        return request
+
+    async def test_matches_the_sync_view(self):
+        response = await views.public_profile_async(
+            self.request("/@async_1"), "async_1"
+        )
+        await cache.aclear()
+        expected = await sync_to_async(self.client.get)("/@async_1")
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["ETag"], expected["ETag"])
+
+        # Now from the page cache, and revalidated against it
+        cached = await views.public_profile_async(
+            self.request("/@async_1", {"If-None-Match": response["ETag"]}),
+            "async_1",
+        )
+        self.assertEqual(cached.status_code, 304)
+
+        with self.assertRaises(Http404):
+            await views.public_profile_async(
+                self.request("/@missing_1"), "missing_1"
+            )
+
+    async def test_whitenoise_stays_async(self):
+        async def get_response(request):
+            return HttpResponse("app")
+
+        middleware = AsyncWhiteNoiseMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = AsyncRequestFactory()
+
+        response = await middleware(factory.get("/@async_1"))
+        self.assertEqual(response.content, b"app")
+        css = staticfiles_storage.url("css/site.css")
+        response = await middleware(factory.get(css))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/css"))
+
+
+class CriticalCssTests(TestCase):
+    def test_keeps_only_rules_for_rendered_markup(self):
+        html = '<div class="card"><a id="go" href="#">Go</a></div>'
+        css = """
+        /* comment */
+        .card { padding: 1rem; }
+        .card a:hover, .unused { color: red; }
+        #go::after { content: "\\2192"; }
+        table td { border: 0; }
+        @media (max-width: 600px) { .card { padding: 0; } .unused { x: y; } }
+        @media print { .unused { display: none; } }
+        @keyframes spin { to { transform: rotate(1turn); } }
+        """
+        self.assertEqual(
+            extract_critical_css(html, css),
+            ".card{padding: 1rem}.card a:hover{color: red}"
+            '#go::after{content: "\\2192"}'
+            "@media (max-width: 600px){.card{padding: 0}}",
+        )
+
+    def test_profile_page_inlines_critical_css(self):
+        User.objects.create_user("alice_1", password="pw-12345678")
+        body = self.client.get("/@alice_1").content.decode()
+        head = body.split("</head>")[0]
+        self.assertIn("<style>:root{", head)
+        self.assertIn('rel="preload" href="/static/css/site.', head)
+        blocking = head.split("<noscript>")[0]
+        self.assertNotIn('rel="stylesheet" href="/static/css/site.', blocking)
+        self.assertRegex(head, r'js/app\.\w+\.js" defer')
+
+    def test_google_fonts_only_until_subsets_are_built(self):
+        def render():
+            return Template("{% load assets %}{% font_links %}").render(
+                Context()
+            )
+
+        with mock.patch(
+            "profiles.templatetags.assets.built_font_faces", return_value=[]
+        ):
+            self.assertIn("fonts.googleapis.com", render())
+            with override_settings(GOOGLE_FONTS_FALLBACK=False):
+                self.assertNotIn("googleapis", render())
+
+        face = FONT_FACES[1]
+        unhashed = {
+            **settings.STORAGES,
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage."
+                "StaticFilesStorage",
+            },
+        }
+        with mock.patch(
+            "profiles.templatetags.assets.built_font_faces", return_value=[face]
+        ), override_settings(STORAGES=unhashed):
+            html = render()
+        self.assertIn(f'href="/static/{face["output"]}" as="font"', html)
+        self.assertNotIn("googleapis", html)
+
+
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        "default": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+        },
+    },
+)
+class AvatarPipelineTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        cache.clear()
+        handle_cache.clear()
+        self.addCleanup(tracking_buffer.drain)
+        self.profile = User.objects.create_user("alice_1").profile
+
+    def _phone_photo(self):
+        # Stored sideways: red left half, blue right, with EXIF saying
+        # "rotate 90 degrees clockwise" plus a camera make to strip
+        image = Image.new("RGB", (600, 400), "blue")
+        image.paste("red", (0, 0, 300, 400))
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = "PhoneMaker"
+        buf = io.BytesIO()
+        image.save(buf, "JPEG", exif=exif.tobytes())
+        return SimpleUploadedFile("photo.jpg", buf.getvalue(), "image/jpeg")
+
+    def test_form_save_builds_upright_stripped_variants(self):
+        form = ProfileForm(
+            {
+                "display_name": "Alice",
+                "handle": "alice_1",
+                "bio": "",
+            },
+            {"profile_image": self._phone_photo()},
+            instance=self.profile,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        profile = form.save()
+        # Only the original is shown until the worker builds variants
+        self.assertIsNone(Profile.objects.get(pk=profile.pk).avatar_sources())
+        for job in jobs.claim("test", limit=10):
+            self.assertTrue(jobs.run(job))
+
+        variants = Profile.objects.get(pk=profile.pk).avatar_variants
+        self.assertEqual(set(variants), {"source", "webp", "jpeg"})
+        self.assertEqual(set(variants["jpeg"]), {"128", "256", "384"})
+        storage = profile.profile_image.storage
+        for key in ("webp", "jpeg"):
+            for size in variants[key]:
+                with storage.open(variants[key][size]) as fh:
+                    image = Image.open(fh)
+                    image.load()
+                self.assertEqual(image.size, (int(size), int(size)))
+                self.assertEqual(len(image.getexif()), 0)
+                # Upright: the red half is now on top
+                r, g, b = image.convert("RGB").getpixel((2, 2))
+                self.assertGreater(r, 200)
+                r, g, b = image.convert("RGB").getpixel((2, int(size) - 3))
+                self.assertGreater(b, 200)
+
+        html = self.client.get("/@alice_1").content.decode()
+        self.assertIn('type="image/webp"', html)
+        self.assertIn("384w", html)
+        self.assertIn('sizes="128px"', html)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        jobs.register("test.record")(lambda **kw: self.calls.append(kw))
+        self.addCleanup(jobs.TASKS.pop, "test.record")
+
+    def test_idempotency_key_enqueues_once(self):
+        first = jobs.enqueue("test.record", {"n": 1}, key="once")
+        again = jobs.enqueue("test.record", {"n": 2}, key="once")
+        self.assertEqual(first.pk, again.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_claim_is_exclusive_until_lease_expires(self):
+        job = jobs.enqueue("test.record", {"n": 1})
+        self.assertEqual([j.pk for j in jobs.claim("w1")], [job.pk])
+        self.assertEqual(jobs.claim("w2"), [])
+
+        # w1 died: once the visibility timeout passes, w2 takes it over
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        (reclaimed,) = jobs.claim("w2")
+        self.assertEqual(reclaimed.attempts, 2)
+        self.assertTrue(jobs.run(reclaimed))
+        self.assertEqual(self.calls, [{"n": 1}])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_failures_back_off_then_give_up(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        jobs.register("test.fail")(fail)
+        self.addCleanup(jobs.TASKS.pop, "test.fail")
+        job = jobs.enqueue("test.fail", max_attempts=2)
+
+        (claimed,) = jobs.claim("w1")
+        with self.assertLogs("profiles.jobs", "ERROR"):
+            self.assertFalse(jobs.run(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("boom", job.last_error)
+        self.assertEqual(jobs.claim("w1"), [])  # still backing off
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        (claimed,) = jobs.claim("w1")
+        with self.assertLogs("profiles.jobs", "ERROR"):
+            self.assertFalse(jobs.run(claimed))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+
+class BenchmarkTests(TestCase):
+    def test_small_run_reports_and_compares(self):
+        benchmark.seed(profiles=3, links_per_profile=2)
+        results = benchmark.run(3, 2, requests=3, warmup=1, alloc_samples=1)
+        self.addCleanup(tracking_buffer.drain)
+
+        self.assertEqual(
+            set(results["scenarios"]),
+            {"public_profile", "editor_get", "editor_post", "register", "login"},
+        )
+        self.assertEqual(benchmark.compare(results, results), [])
+
+        # One extra query per request is always a regression
+        baseline = {"scenarios": {"editor_get": dict(
+            results["scenarios"]["editor_get"],
+            queries_per_request=(
+                results["scenarios"]["editor_get"]["queries_per_request"] - 1
+            ),
+        )}}
+        problems = benchmark.compare(results, baseline)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("editor_get: queries/request", problems[0])
+
+
+class PrerenderTests(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.alice = User.objects.create_user("alice_1").profile
+        self.bob = User.objects.create_user("bob_22").profile
+        Link.objects.create(profile=self.alice, title="Blog",
+                            url="https://example.com", position=1)
+
+    def test_incremental_runs(self):
+        self.assertEqual(
+            prerender.prerender(self.root),
+            {"rendered": 2, "removed": 0, "unchanged": 0},
+        )
+        page = self.root / "@alice_1" / "index.html"
+        html = page.read_text()
+        self.assertIn("Blog", html)
+        self.assertEqual(
+            gzip.decompress((self.root / "@alice_1/index.html.gz").read_bytes()),
+            page.read_bytes(),
+        )
+
+        self.assertEqual(
+            prerender.prerender(self.root),
+            {"rendered": 0, "removed": 0, "unchanged": 2},
+        )
+
+        # A link edit re-renders alice only; bob is renamed, then deleted
+        Link.objects.create(profile=self.alice, title="Shop",
+                            url="https://example.org", position=2)
+        self.bob.handle = "bobby_22"
+        self.bob.save()
+        self.assertEqual(
+            prerender.prerender(self.root),
+            {"rendered": 2, "removed": 1, "unchanged": 0},
+        )
+        self.assertIn("Shop", page.read_text())
+        self.assertFalse((self.root / "@bob_22").exists())
+
+        self.bob.user.delete()
+        self.assertEqual(
+            prerender.prerender(self.root),
+            {"rendered": 0, "removed": 1, "unchanged": 1},
+        )
+        self.assertFalse((self.root / "@bobby_22").exists())
+
+
+class _StandInSite(BaseHTTPRequestHandler):
+    hits = []
+    hosts = []
+
+    def _reply(self, body):
+        type(self).hits.append((self.command, self.path))
+        type(self).hosts.append(self.headers["Host"])
+        if self.path == "/moved":
+            self.send_response(301)
+            self.send_header("Location", "/ok")
+        elif self.path == "/gone":
+            self.send_response(404)
+        elif self.path == "/no-head" and self.command == "HEAD":
+            self.send_response(405)
+        elif self.path == "/slow":
+            time.sleep(1)
+            self.send_response(200)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        if body:
+            self.wfile.write(b"ok")
+
+    def do_HEAD(self):
+        self._reply(body=False)
+
+    def do_GET(self):
+        self._reply(body=True)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(LINK_CHECK_ALLOW_PRIVATE=True, LINK_CHECK_HOST_INTERVAL=0)
+class LinkCheckTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInSite)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base = f"http://127.0.0.1:{server.server_port}"
+        _StandInSite.hits = []
+        _StandInSite.hosts = []
+
+        self.user = User.objects.create_user("alice_1", password="pw-12345678")
+        alice = self.user.profile
+        bob = User.objects.create_user("bob_22").profile
+        self.links = {
+            path: Link.objects.create(
+                profile=alice, title=path, url=self.base + path
+            )
+            for path in ("/ok", "/gone", "/no-head", "/moved", "/slow")
+        }
+        self.shared = Link.objects.create(profile=bob, url=self.base + "/ok")
+
+    def test_sweep_records_status_per_link(self):
+        counts = linkcheck.check_links(
+            checker=linkcheck.LinkChecker(timeout=0.3)
+        )
+        self.assertEqual(counts, {"links": 6, "urls": 5, "broken": 2})
+
+        def outcome(path):
+            link = Link.objects.get(pk=self.links[path].pk)
+            return link.check_status, link.check_error, link.is_broken
+
+        self.assertEqual(outcome("/ok"), (200, "", False))
+        self.assertEqual(outcome("/gone"), (404, "", True))
+        self.assertEqual(outcome("/no-head"), (200, "", False))
+        self.assertEqual(outcome("/moved"), (200, "", False))
+        self.assertEqual(outcome("/slow"), (None, "Timed out.", True))
+        self.assertEqual(
+            Link.objects.get(pk=self.shared.pk).check_status, 200
+        )
+        # Two links share /ok but it was fetched once for them (the
+        # other fetch is /moved's redirect); HEAD fell back to GET
+        self.assertEqual(_StandInSite.hits.count(("HEAD", "/ok")), 2)
+        self.assertIn(("GET", "/no-head"), _StandInSite.hits)
+
+        # Results are cached by URL, and nothing is due again yet
+        _StandInSite.hits = []
+        linkcheck.check_links(Link.objects.all())
+        self.assertEqual(linkcheck.check_links(), {
+            "links": 0, "urls": 0, "broken": 0,
+        })
+        self.assertEqual(_StandInSite.hits, [])
+
+        self.client.force_login(self.user)
+        self.assertContains(
+            self.client.get("/links/"), "Broken link: HTTP 404"
+        )
+
+        # Editing the URL clears the stale result
+        link = Link.objects.get(pk=self.links["/gone"].pk)
+        link.url = self.base + "/ok"
+        link.save()
+        self.assertIsNone(Link.objects.get(pk=link.pk).checked_at)
+
+    def test_connects_to_the_address_that_was_vetted(self):
+        port = self.base.rsplit(":", 1)[1]
+        url = f"http://links.example:{port}/ok"
+        vetted = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 0))]
+        # The name answers with a closed address after the first lookup, so
+        # the check only passes if the connection doesn't resolve it again
+        rebound = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.2", 0))]
+        lookups = []
+        real_getaddrinfo = socket.getaddrinfo
+
+        def getaddrinfo(host, *args, **kwargs):
+            if host != "links.example":
+                return real_getaddrinfo(host, *args, **kwargs)
+            lookups.append(host)
+            return vetted if len(lookups) == 1 else rebound
+
+        with mock.patch("socket.getaddrinfo", getaddrinfo):
+            self.assertEqual(
+                linkcheck.LinkChecker().check_url(url), (200, "")
+            )
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(_StandInSite.hosts, [f"links.example:{port}"])
+
+        with mock.patch("socket.getaddrinfo", return_value=vetted):
+            self.assertEqual(
+                linkcheck.LinkChecker(allow_private=False).check_url(url),
+                (None, "Points at a private network address."),
+            )
+        with mock.patch("socket.getaddrinfo", side_effect=socket.gaierror):
+            self.assertEqual(
+                linkcheck.LinkChecker().check_url(url),
+                (None, "Could not resolve the host."),
+            )
+
+
+class HandleAvailabilityTests(TestCase):
+    def setUp(self):
+        handle_index.clear()
+        for username in ["taken_one", "taken_one1", "taken_one2"]:
+            User.objects.create_user(username)
+
+    def test_free_handle_needs_no_query(self):
+        handle_index.is_taken("warmup")  # builds the filter
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertFalse(handle_index.is_taken("someone_new"))
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertTrue(handle_index.is_taken("TAKEN_ONE"))
+
+    def test_local_and_remote_changes_are_picked_up(self):
+        handle_index.is_taken("warmup")
+        User.objects.create_user("fresh_user")
+        self.assertTrue(handle_index.might_be_taken("fresh_user"))
+
+        # Another worker's rename reaches an index on its next refresh
+        index = HandleIndex(refresh=0, rebuild=3600)
+        index.is_taken("warmup")
+        Profile.objects.filter(handle="fresh_user").update(
+            handle="renamed_elsewhere", updated_at=timezone.now()
+        )
+        self.assertTrue(index.is_taken("renamed_elsewhere"))
+
+    def test_endpoint_reports_and_suggests(self):
+        data = self.client.get("/handles/check/?handle=@Taken_One").json()
+        self.assertFalse(data["available"])
+        self.assertEqual(data["message"], "@taken_one is taken.")
+        self.assertEqual(
+            data["suggestions"], ["taken_one3", "taken_one4", "taken_one5"]
+        )
+
+        self.assertTrue(
+            self.client.get("/handles/check/?handle=brand_new").json()["available"]
+        )
+        self.assertFalse(
+            self.client.get("/handles/check/?handle=ab").json()["available"]
+        )
+
+        self.client.force_login(User.objects.get(username="taken_one"))
+        self.assertTrue(
+            self.client.get("/handles/check/?handle=taken_one").json()["available"]
+        )
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        def make(username, display_name, bio):
+            profile = User.objects.create_user(username).profile
+            profile.display_name, profile.bio = display_name, bio
+            profile.save()
+            return profile
+
+        self.alice = make("alice_s", "Alice Smith", "Jazz pianist")
+        self.alina = make("alina_1", "Alina", "")
+        self.bob = make("bob_22", "Bob", "Alice's bandmate, plays bass")
+
+    def handles(self, query):
+        return [p.handle for p in search.search_profiles(query)]
+
+    def test_prefix_search_ranked_and_in_sync(self):
+        self.assertEqual(self.handles("ali")[-1], "bob_22")  # bio only
+        self.assertEqual(set(self.handles("ali")[:2]), {"alice_s", "alina_1"})
+        self.assertEqual(self.handles("jazz PIAN"), ["alice_s"])
+        self.assertEqual(self.handles('"bass" OR *'), [])  # syntax is inert
+
+        self.bob.bio = "Drummer"
+        self.bob.save()
+        self.alina.user.delete()
+        self.assertEqual(self.handles("ali"), ["alice_s"])
+        self.assertEqual(self.handles("drum"), ["bob_22"])
+
+    def test_lost_sqlite_triggers_are_repaired(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {search.FTS_TABLE}_au")
+        self.assertTrue(search.repair_index(connection))
+        self.assertFalse(search.repair_index(connection))
+        self.bob.display_name = "Roberto"
+        self.bob.save()
+        self.assertEqual(self.handles("robert"), ["bob_22"])
+
+    def test_search_page_and_autocomplete(self):
+        self.assertContains(self.client.get("/search/?q=jazz"), "@alice_s")
+        response = self.client.get("/search/handles/?q=@ALI")
+        self.assertEqual(
+            [r["handle"] for r in response.json()["results"]],
+            ["alice_s", "alina_1"],
+        )
+        self.assertEqual(response.json()["results"][0]["url"], "/@alice_s")
+        self.assertEqual(
+            self.client.get("/search/handles/?q=zz").json(), {"results": []}
+        )
+
+
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+class AdminScalingTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin_user", password="pw")
+        )
+        for username in ["alice_s", "alina_1", "bob_22"]:
+            profile = User.objects.create_user(username).profile
+            Link.objects.bulk_create(
+                [
+                    Link(
+                        profile=profile,
+                        title=f"L{i}",
+                        url=f"https://x.test/{i}",
+                        position=i,
+                    )
+                    for i in range(4)
+                ]
+            )
+
+    def test_link_changelist_queries_do_not_grow(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/admin/profiles/link/")
+        self.assertEqual(response.status_code, 200)
+        # Capped count: 12 links, but counting stops at limit + 1
+        self.assertEqual(response.context["cl"].result_count, 4)
+        Link.objects.filter(profile__handle="bob_22").delete()
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.client.get("/admin/profiles/link/")
+
+    def test_handle_filter_and_search(self):
+        for query in ["profile=%40Alice_s", "q=%40alice_s"]:
+            response = self.client.get(f"/admin/profiles/link/?{query}")
+            self.assertEqual(
+                {link.profile.handle for link in response.context["cl"].result_list},
+                {"alice_s"},
+            )
+        self.assertContains(
+            self.client.get("/admin/profiles/link/"), 'list="profile-handles"'
+        )
+
+    def test_profile_autocomplete_matches_handle_prefix(self):
+        response = self.client.get(
+            "/admin/autocomplete/?app_label=profiles&model_name=link"
+            "&field_name=profile&term=ali"
+        )
+        self.assertEqual(
+            [r["text"] for r in response.json()["results"]],
+            ["@alice_s", "@alina_1"],
+        )
+
+
+class AccountExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("export_me", password="pw")
+        self.profile = self.user.profile
+        link = Link.objects.create(
+            profile=self.profile, title="Site", url="https://example.com"
+        )
+        ProfileEvent.objects.bulk_create(
+            [
+                ProfileEvent(
+                    profile=self.profile,
+                    link=link if i % 2 else None,
+                    kind=ProfileEvent.CLICK if i % 2 else ProfileEvent.VIEW,
+                    created_at=timezone.now(),
+                )
+                for i in range(5)
+            ]
+        )
+        self.client.force_login(self.user)
+
+    def test_streams_jsonl_and_csv(self):
+        response = self.client.get("/links/export/")
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        records = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [r["record"] for r in records],
+            ["profile", "link"] + ["event"] * 5,
+        )
+        self.assertEqual(records[0]["handle"], "export_me")
+
+        response = self.client.get("/links/export/?format=csv")
+        rows = list(
+            csv.DictReader(
+                io.StringIO(b"".join(response.streaming_content).decode())
+            )
+        )
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1]["url"], "https://example.com")
+        self.assertEqual(rows[1]["kind"], "")
+
+        self.assertEqual(
+            self.client.get("/links/export/?format=xml").status_code, 400
+        )
+
+    def test_archive_written_to_storage(self):
+        storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, storage.location)
+        name = exports.write_archive(self.profile, "jsonl", storage=storage)
+        with storage.open(name) as fh, zipfile.ZipFile(fh) as archive:
+            (member,) = archive.namelist()
+            lines = archive.read(member).splitlines()
+        self.assertEqual(len(lines), 7)
+
+
+class ProfileApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profiles = []
+        for username in ["api_one", "api_two", "api_three"]:
+            profile = User.objects.create_user(username).profile
+            for i in range(3):
+                Link.objects.create(
+                    profile=profile, title=f"T{i}", url=f"https://x.test/{i}"
+                )
+            self.profiles.append(profile)
+
+    def test_single_profile_with_etag_and_invalidation(self):
+        response = self.client.get("/api/v1/profiles/API_one/")
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        data = response.json()
+        self.assertEqual(data["handle"], "api_one")
+        self.assertEqual([l["title"] for l in data["links"]], ["T0", "T1", "T2"])
+        etag = response["ETag"]
+        self.assertEqual(
+            self.client.get(
+                "/api/v1/profiles/api_one/", HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            304,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            link = self.profiles[0].links.get(title="T1")
+            link.title = "Renamed"
+            link.save()
+        response = self.client.get("/api/v1/profiles/api_one/")
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["links"][1]["title"], "Renamed")
+        self.assertEqual(
+            self.client.get("/api/v1/profiles/nobody/").status_code, 404
+        )
+
+    def test_batch_uses_constant_queries(self):
+        url = "/api/v1/profiles/?handles=api_three,@api_one,ghost,api_two"
+        with self.assertNumQueries(2):
+            data = self.client.get(url).json()
+        self.assertEqual(
+            [p["handle"] for p in data["profiles"]],
+            ["api_three", "api_one", "api_two"],
+        )
+        self.assertEqual(data["missing"], ["ghost"])
+        self.assertEqual(len(data["profiles"][0]["links"]), 3)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user("ghost")
+        self.assertEqual(self.client.get(url).json()["missing"], [])
+
+        too_many = ",".join(f"h{i}" for i in range(101))
+        response = self.client.get(f"/api/v1/profiles/?handles={too_many}")
+        self.assertEqual(response.status_code, 400)
+
+
+class LinkApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("link_owner")
+        self.profile = self.user.profile
+        self.links = [
+            Link.objects.create(
+                profile=self.profile, title=f"L{i}", url=f"https://x.test/{i}"
+            )
+            for i in range(4)
+        ]
+        self.client.force_login(self.user)
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type="application/json"
+        )
+
+    def order(self):
+        return list(
+            self.profile.links.order_by("position").values_list("title", flat=True)
+        )
+
+    def test_create_update_delete(self):
+        response = self.send(
+            "post", "/links/api/", {"title": "New", "url": "https://new.test"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["position"], 5)
+
+        link = self.links[1]
+        response = self.send("patch", f"/links/api/{link.pk}/", {"title": "Edit"})
+        self.assertEqual(response.json()["url"], "https://x.test/1")
+        link.refresh_from_db()
+        self.assertEqual(link.title, "Edit")
+        response = self.send("patch", f"/links/api/{link.pk}/", {"url": "nope"})
+        self.assertIn("url", response.json()["errors"])
+
+        self.assertEqual(
+            self.client.delete(f"/links/api/{link.pk}/").status_code, 204
+        )
+        self.assertEqual(self.order(), ["L0", "L2", "L3", "New"])
+
+    def test_move_writes_only_rows_in_between(self):
+        first, second, _, last = self.links
+        response = self.send(
+            "post", f"/links/api/{second.pk}/move/", {"position": 1}
+        )
+        self.assertEqual(
+            response.json()["positions"],
+            {str(second.pk): 1, str(first.pk): 2},
+        )
+        self.send("post", f"/links/api/{last.pk}/move/", {"position": 2})
+        self.assertEqual(self.order(), ["L1", "L3", "L0", "L2"])
+        self.assertEqual(
+            self.send(
+                "post", f"/links/api/{last.pk}/move/", {"position": "x"}
+            ).status_code,
+            400,
+        )
+
+    def test_other_users_links_are_forbidden(self):
+        link = self.links[0]
+        self.client.force_login(User.objects.create_user("intruder"))
+        self.assertEqual(
+            self.send("patch", f"/links/api/{link.pk}/", {"title": "x"}).status_code,
+            403,
+        )
+        self.assertEqual(self.client.delete(f"/links/api/{link.pk}/").status_code, 403)
+        # The form views had the same hole: test_func ran before the
+        # object was loaded
+        self.assertEqual(self.client.get(f"/links/{link.pk}/edit/").status_code, 403)
+        self.assertEqual(
+            self.client.post(f"/links/{link.pk}/delete/").status_code, 403
+        )
+        self.assertTrue(Link.objects.filter(pk=link.pk, title="L0").exists())
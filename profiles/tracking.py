@@ -0,0 +1,177 @@
+import atexit
+import logging
+import threading
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, F, PositiveBigIntegerField, Value, When
+from django.utils import timezone
+
+from .models import Link, ProfileEvent
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 500
+
+# Raw events kept per process while the database is unreachable; the
+# oldest are dropped beyond this (and counted in TrackingBuffer.dropped)
+# so a long outage can't exhaust memory. Click counts are never dropped.
+MAX_BUFFERED_EVENTS = 50_000
+
+
+def _write_click_counts(counts):
+    """
+    Add the buffered deltas to Link.click_count with one UPDATE per batch
+    of links, however many clicks each link received.
+    """
+    items = list(counts.items())
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start:start + FLUSH_BATCH_SIZE]
+        delta = Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in batch],
+            default=Value(0),
+            output_field=PositiveBigIntegerField(),
+        )
+        Link.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            click_count=F("click_count") + delta
+        )
+
+
+def _write_events(events):
+    ProfileEvent.objects.bulk_create(
+        [
+            ProfileEvent(
+                profile_id=profile_id,
+                link_id=link_id,
+                kind=kind,
+                created_at=created_at,
+            )
+            for profile_id, link_id, kind, created_at in events
+        ],
+        batch_size=FLUSH_BATCH_SIZE,
+    )
+
+
+class TrackingBuffer:
+    """
+    Per-process buffer of profile views and link clicks, written behind
+    the request.
+
+    Recording only touches in-memory structures; the first event after a
+    flush arms a timer, and when it fires everything buffered goes to the
+    database in a background thread: click deltas as one UPDATE per batch
+    of links, raw events as one bulk INSERT. Each gunicorn worker keeps
+    its own buffer, so a busy link costs a few writes per worker per
+    interval instead of one per click.
+    """
+
+    def __init__(self, interval, max_events=MAX_BUFFERED_EVENTS):
+        self.interval = interval
+        self.max_events = max_events
+        # Events discarded because the buffer was full
+        self.dropped = 0
+        self._counts = Counter()
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def _arm(self):
+        # Caller holds the lock
+        if self._timer is None:
+            self._timer = threading.Timer(
+                self.interval, self._flush_in_background
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _append(self, event):
+        # Caller holds the lock. A full deque drops its oldest event.
+        if len(self._events) == self.max_events:
+            self.dropped += 1
+        self._events.append(event)
+        self._arm()
+
+    def _requeue(self, counts, events):
+        """
+        Put back what a failed flush drained, ahead of anything recorded
+        since, so events stay in the order they happened. As in _append,
+        the oldest are dropped if that overfills the buffer.
+        """
+        with self._lock:
+            self._counts.update(counts)
+            pending = events + list(self._events)
+            excess = max(0, len(pending) - self.max_events)
+            self._events = deque(pending[excess:], maxlen=self.max_events)
+            self.dropped += excess
+            self._arm()
+        if excess:
+            logger.warning(
+                "Tracking buffer full; dropped the %d oldest events", excess
+            )
+
+    def add_click(self, link_id, profile_id):
+        with self._lock:
+            self._counts[link_id] += 1
+            self._append(
+                (profile_id, link_id, ProfileEvent.CLICK, timezone.now())
+            )
+
+    def add_view(self, profile_id):
+        with self._lock:
+            self._append(
+                (profile_id, None, ProfileEvent.VIEW, timezone.now())
+            )
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            events = list(self._events)
+            self._events.clear()
+            self._timer = None
+        return counts, events
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of events."""
+        counts, events = self.drain()
+        if not (counts or events):
+            return 0
+        try:
+            with transaction.atomic():
+                _write_click_counts(counts)
+                _write_events(events)
+        except Exception:
+            # Keep the data for the next attempt rather than losing it
+            self._requeue(counts, events)
+            raise
+        return len(events)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Flushing profile tracking events failed")
+        finally:
+            connections.close_all()
+
+
+tracking_buffer = TrackingBuffer(
+    getattr(settings, "LINK_CLICK_FLUSH_INTERVAL", 30)
+)
+
+
+def record_click(link_id, profile_id):
+    tracking_buffer.add_click(link_id, profile_id)
+
+
+def record_view(profile_id):
+    tracking_buffer.add_view(profile_id)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        tracking_buffer.flush()
+    except Exception:
+        logger.exception("Flushing profile tracking events at exit failed")
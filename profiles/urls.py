@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views as profile_views
 
@@ -17,11 +18,26 @@ urlpatterns = [
         profile_views.ProfileLinksEditorView.as_view(),
         name="link-list",
     ),
+    path(
+        "links/stats/",
+        profile_views.ProfileStatsView.as_view(),
+        name="profile-stats",
+    ),
+    path(
+        "links/export/",
+        profile_views.AccountExportView.as_view(),
+        name="account-export",
+    ),
     path(
         "links/create/",
         profile_views.LinkCreateView.as_view(),
         name="link-create",
     ),
+    path(
+        "links/import/",
+        profile_views.LinkImportView.as_view(),
+        name="link-import",
+    ),
     path(
         "links/<int:pk>/edit/",
         profile_views.LinkUpdateView.as_view(),
@@ -33,10 +49,83 @@ urlpatterns = [
         name="link-delete",
     ),
 
+    # Single-link JSON edits (used by the editor)
+    path(
+        "links/api/",
+        profile_views.LinkCreateApiView.as_view(),
+        name="link-api-create",
+    ),
+    path(
+        "links/api/<int:pk>/",
+        profile_views.LinkApiView.as_view(),
+        name="link-api",
+    ),
+    path(
+        "links/api/<int:pk>/move/",
+        profile_views.LinkMoveApiView.as_view(),
+        name="link-api-move",
+    ),
+
+    # Tracked outbound link
+    path(
+        "l/<int:pk>",
+        profile_views.link_redirect,
+        name="link-redirect",
+    ),
+
+    # Personalised nav for shared-cache public pages (see app.js)
+    path(
+        "nav/",
+        profile_views.site_nav,
+        name="site-nav",
+    ),
+
+    # Live handle check for the editor
+    path(
+        "handles/check/",
+        profile_views.handle_availability,
+        name="handle-availability",
+    ),
+
+    # Directory search and @mention autocomplete
+    path(
+        "search/",
+        profile_views.profile_search,
+        name="profile-search",
+    ),
+    path(
+        "search/handles/",
+        profile_views.handle_autocomplete,
+        name="handle-autocomplete",
+    ),
+
+    # Read-only JSON API
+    path(
+        "api/v1/profiles/",
+        profile_views.api_profiles,
+        name="api-profiles",
+    ),
+    path(
+        "api/v1/profiles/<str:handle>/",
+        profile_views.api_profile,
+        name="api-profile",
+    ),
+
+    # Prometheus metrics (staff or METRICS_TOKEN)
+    path(
+        "metrics/",
+        profile_views.metrics_endpoint,
+        name="metrics",
+    ),
+
     # Public profile (handle-based)
     path(
         "@<str:handle>",
-        profile_views.public_profile,
+        (
+            profile_views.public_profile_async
+            if settings.PUBLIC_PROFILE_ASYNC
+            else profile_views.public_profile
+        ),
         name="profile-detail",
     ),
 ]
\ No newline at end of file
@@ -1,5 +1,8 @@
+import hashlib
+import json
 import re
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
@@ -9,44 +12,68 @@ from django.contrib.auth.forms import (
 )
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import LoginView
+from django.core.exceptions import PermissionDenied
 from django.db import transaction
-from django.db.models import F
+from django.db.models import CASCADE, F
 from django.forms import inlineformset_factory
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import never_cache
 from django.views import View
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
+    FormView,
     ListView,
     UpdateView,
 )
-
-from .forms import LinkForm, ProfileForm
+from django.views.generic.detail import SingleObjectMixin
+
+from . import analytics, api, exports, metrics
+from .assets import build_version
+from .cache import (
+    acache_profile_page,
+    aget_cached_profile_page,
+    aget_profile_for_handle,
+    cache_profile_page,
+    get_cached_profile_page,
+    get_profile_for_handle,
+    remember_handle,
+)
+from .handles import check_handle
+from .forms import BaseLinkFormSet, LinkForm, LinkImportForm, ProfileForm
+from .imports import import_links
+from .middleware import clear_nav_hint, get_request_profile
 from .models import Link, Profile
+from .search import autocomplete_handles, search_profiles
+from .signals import profile_links_changed
+from .tracking import record_click, record_view
 
 
 LinkFormSet = inlineformset_factory(
     Profile,
     Link,
     form=LinkForm,
+    formset=BaseLinkFormSet,
     extra=1,  # give one blank row to create a new link
     can_delete=True,
     can_order=True,  # enable ordering in the formset
 )
 
 
-def _ensure_profile_for(user):
-    return Profile.objects.get_or_create(
-        user=user,
-        defaults={
-            "handle": f"user{user.id}",
-            "display_name": user.username or f"User {user.id}",
-        },
-    )
-
-
 class ProfileLoginView(LoginView):
     """
     Uses your index page form posting to 'login'.
@@ -72,17 +99,17 @@ class ProfileLogoutView(View):
     def get(self, request, *args, **kwargs):
         logout(request)  # flushes session
         messages.success(request, "You are now logged out")
-        return redirect("index")
+        return clear_nav_hint(redirect("index"))
 
     def post(self, request, *args, **kwargs):
         logout(request)
         messages.success(request, "You are now logged out")
-        return redirect("index")
+        return clear_nav_hint(redirect("index"))
 
 
 def index(request):
     if request.user.is_authenticated:
-        profile, _ = _ensure_profile_for(request.user)
+        profile = get_request_profile(request)
         return redirect(profile.get_absolute_url())
 
     form = AuthenticationForm(request)
@@ -101,12 +128,19 @@ class ProfileDetailView(DetailView):
 class OwnerRequiredMixin(UserPassesTestMixin):
     """
     Mixin to ensure the current user owns the related profile for this object.
+
+    dispatch() runs test_func() before any handler has loaded the object,
+    so it's fetched here (once; get_object() keeps it for the handler).
     """
 
+    def get_object(self, queryset=None):
+        if getattr(self, "_owned_object", None) is None:
+            self._owned_object = super().get_object(queryset)
+        return self._owned_object
+
     def test_func(self):
-        if hasattr(self, "object") and self.object:
-            return getattr(self.object.profile, "user_id", None) == self.request.user.id
-        return self.request.user.is_authenticated
+        profile = get_request_profile(self.request)
+        return profile is not None and self.get_object().profile_id == profile.pk
 
 
 # ---------- Inline formset helper ----------
@@ -135,6 +169,150 @@ def _is_real_formset_submission(post):
     return False
 
 
+def _apply_link_changes(profile, formset):
+    """
+    Persist a validated LinkFormSet by writing only the rows that changed.
+
+    Deleted rows go in one DELETE, edited or re-ordered rows in one bulk
+    UPDATE and new rows in one INSERT, so an edit costs a handful of
+    queries however many links the profile has. Positions are renumbered
+    1..n in the submitted ORDER, followed by any links added since the
+    editor loaded (which aren't in the POST), in their current order.
+    Rows that move are first parked above every current position so the
+    renumbering doesn't collide with itself; the caller holds the
+    profile row lock so nothing else writes positions meanwhile.
+    """
+    kept = []
+    to_delete = []
+    for form in formset.forms:
+        if not form.cleaned_data:
+            continue  # untouched blank row
+        if form.cleaned_data.get("DELETE"):
+            if form.instance.pk:
+                to_delete.append(form.instance.pk)
+            continue
+        kept.append(form)
+    kept.sort(key=lambda f: f.cleaned_data.get("ORDER") or 0)
+
+    if to_delete:
+        _delete_links(profile, to_delete)
+    # Positions as stored now, not as the editor loaded them
+    current = dict(
+        Link.objects.filter(profile=profile).values_list("pk", "position")
+    )
+    submitted = {form.instance.pk for form in kept}
+    unsubmitted = sorted(
+        (pk for pk in current if pk not in submitted),
+        key=lambda pk: (current[pk] or 0, pk),
+    )
+
+    moved, changed, created, new_urls = [], [], [], []
+    for position, form in enumerate(kept, start=1):
+        # ModelForm validation already copied title/url onto the instance
+        link = form.instance
+        if link.pk is None:
+            link.profile = profile
+            link.position = position
+            created.append(link)
+        elif current.get(link.pk) != position:
+            moved.append(link.pk)
+            link.position = position
+            changed.append(link)
+        elif {"title", "url"} & set(form.changed_data):
+            changed.append(link)
+        if link.pk and "url" in form.changed_data:
+            new_urls.append(link.pk)
+
+    shifted = []
+    for position, pk in enumerate(unsubmitted, start=len(kept) + 1):
+        if current[pk] != position:
+            moved.append(pk)
+            shifted.append(Link(pk=pk, position=position))
+
+    if moved:
+        total = len(kept) + len(unsubmitted)
+        offset = max([p for p in current.values() if p] + [total]) + 1
+        Link.objects.filter(pk__in=moved).update(
+            position=F("position") + offset
+        )
+    if shifted:
+        Link.objects.bulk_update(shifted, ["position"])
+    if changed:
+        Link.objects.bulk_update(changed, ["title", "url", "position"])
+    if new_urls:
+        # The last check was of the old URL
+        Link.objects.filter(pk__in=new_urls).update(
+            check_status=None, check_error="", checked_at=None
+        )
+    if created:
+        Link.objects.bulk_create(created)
+
+    if to_delete or moved or changed or created:
+        # Bulk writes skip Link signals, so purge once for all of them
+        profile_links_changed.send(sender=Profile, profile=profile)
+
+
+def _delete_links(profile, pks):
+    """
+    Delete ``profile``'s links in ``pks`` with one DELETE per table.
+
+    QuerySet.delete() would load every row and send post_delete for each
+    (a profile UPDATE and cache purge apiece); the caller sends a single
+    profile_links_changed instead. Rows cascading from Link, which have
+    no delete signals of their own, are deleted first by queryset.
+    """
+    for rel in Link._meta.related_objects:
+        if rel.on_delete is CASCADE:
+            rel.related_model._base_manager.filter(
+                **{f"{rel.field.name}__in": pks}
+            ).delete()
+    Link.objects.filter(profile=profile, pk__in=pks)._raw_delete(
+        Link.objects.db
+    )
+
+
+def _move_link(profile, link, index):
+    """
+    Move ``link`` to 1-based ``index`` in ``profile``'s link order.
+
+    The profile keeps its set of position values; they're reassigned in
+    the new order, so only the rows between the old and new place are
+    written (two for a move by one). Those are parked above every
+    current position first, as in _apply_link_changes. Returns
+    {pk: position} for the rows that moved.
+    """
+    # Same lock as Link.save() and imports.import_links()
+    Profile.objects.select_for_update().get(pk=profile.pk)
+    rows = list(
+        Link.objects.filter(profile=profile)
+        .order_by("position", "id")
+        .values_list("pk", "position")
+    )
+    order = [pk for pk, _ in rows if pk != link.pk]
+    order.insert(max(0, min(index - 1, len(order))), link.pk)
+
+    positions = [position for _, position in rows]
+    if None in positions:
+        positions = list(range(1, len(rows) + 1))
+    new_positions = dict(zip(order, positions))
+    moved = {
+        pk: new_positions[pk]
+        for pk, position in rows
+        if new_positions[pk] != position
+    }
+    if moved:
+        offset = max(filter(None, positions + [len(rows)])) + 1
+        Link.objects.filter(pk__in=moved).update(
+            position=F("position") + offset
+        )
+        Link.objects.bulk_update(
+            [Link(pk=pk, position=position) for pk, position in moved.items()],
+            ["position"],
+        )
+        profile_links_changed.send(sender=Profile, profile=profile)
+    return moved
+
+
 # ------------------------------------------
 
 
@@ -142,7 +320,7 @@ class ProfileLinksEditorView(LoginRequiredMixin, View):
     template_name = "profiles/profile_links.html"
 
     def get(self, request):
-        profile, _ = _ensure_profile_for(request.user)
+        profile = get_request_profile(request)
         formset = LinkFormSet(
             instance=profile,
             queryset=profile.links.order_by("position", "id"),
@@ -157,7 +335,7 @@ class ProfileLinksEditorView(LoginRequiredMixin, View):
         return render(request, self.template_name, context)
 
     def post(self, request):
-        profile, _ = _ensure_profile_for(request.user)
+        profile = get_request_profile(request)
         pform = ProfileForm(
             request.POST,
             request.FILES,
@@ -190,57 +368,67 @@ class ProfileLinksEditorView(LoginRequiredMixin, View):
             return render(request, self.template_name, context)
 
         with transaction.atomic():
-            profile = pform.save()
+            if pform.has_changed():
+                profile = pform.save()
 
             if _is_real_formset_submission(request.POST):
-                # Populate formset.deleted_objects
-                formset.save(commit=False)
-
-                # 1) Delete rows marked for deletion
-                to_delete = [
-                    obj
-                    for obj in getattr(formset, "deleted_objects", [])
-                    if obj.pk
-                ]
-                for obj in to_delete:
-                    obj.delete()
-
-                # 2) Bump positions to avoid unique collisions
-                Link.objects.filter(profile=profile).update(
-                    position=F("position") + 1000
-                )
-
-                # 3) Save forms we are keeping, in requested order
-                cleaned_forms = [
-                    f
-                    for f in formset.forms
-                    if f.cleaned_data
-                    and not f.cleaned_data.get("DELETE")
-                ]
-                ordered_forms = sorted(
-                    cleaned_forms,
-                    key=lambda f: f.cleaned_data.get("ORDER") or 0,
-                )
-
-                for idx, form in enumerate(ordered_forms, start=1):
-                    link = form.save(commit=False)
-                    link.profile = profile
-                    link.position = idx
-                    link.save()
-                # If you add M2M on Link in future: formset.save_m2m()
+                # Same lock as Link.save() and imports.import_links()
+                Profile.objects.select_for_update().get(pk=profile.pk)
+                _apply_link_changes(profile, formset)
 
         messages.success(request, "Profile updated.")
         # Redirect back to the editor so the success banner renders there
         return redirect(request.path)
 
 
+class ProfileStatsView(LoginRequiredMixin, View):
+    """
+    Owner dashboard: views and clicks read from the hourly/daily rollup
+    tables, never from the raw event log.
+    """
+
+    template_name = "profiles/profile_stats.html"
+
+    def get(self, request):
+        profile = get_request_profile(request)
+        context = {
+            "profile": profile,
+            "hourly": analytics.hourly_totals(profile),
+            "daily": analytics.daily_totals(profile),
+            "link_clicks": analytics.link_click_totals(profile),
+        }
+        return render(request, self.template_name, context)
+
+
+class AccountExportView(LoginRequiredMixin, View):
+    """
+    Download everything stored about the signed-in user's profile as
+    ``?format=jsonl`` (default) or ``csv``, streamed as it's read.
+    """
+
+    def get(self, request):
+        fmt = request.GET.get("format", "jsonl")
+        if fmt not in exports.FORMATS:
+            return HttpResponseBadRequest("Unknown export format.")
+        profile = get_request_profile(request)
+        response = StreamingHttpResponse(
+            exports.stream_export(profile, fmt),
+            content_type=f"{exports.CONTENT_TYPES[fmt]}; charset=utf-8",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{exports.export_filename(profile, fmt)}"'
+        )
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+
 class LinkListView(LoginRequiredMixin, ListView):
     model = Link
     template_name = "profiles/link_list.html"
     context_object_name = "links"
 
     def get_queryset(self):
-        profile, _ = _ensure_profile_for(self.request.user)
+        profile = get_request_profile(self.request)
         return profile.links.order_by("position", "id")
 
 
@@ -251,11 +439,129 @@ class LinkCreateView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy("link-list")
 
     def form_valid(self, form):
+        form.instance.profile = get_request_profile(self.request)
         resp = super().form_valid(form)
         messages.success(self.request, "Link created.")
         return resp
 
 
+# ---------- JSON link editing ----------
+# Single-link edits for the editor (app.js) without a full formset POST.
+
+
+def _link_json(link):
+    return {
+        "id": link.pk,
+        "title": link.title,
+        "url": link.url,
+        "position": link.position,
+    }
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _bad_request(errors):
+    return JsonResponse({"errors": errors}, status=400)
+
+
+class LinkCreateApiView(LoginRequiredMixin, View):
+    """POST {"title", "url"}: append a link to the signed-in profile."""
+
+    raise_exception = True
+
+    def post(self, request):
+        data = _json_body(request)
+        if data is None:
+            return _bad_request({"__all__": ["Expected a JSON object."]})
+        form = LinkForm(data)
+        if not form.is_valid():
+            return _bad_request(form.errors)
+        link = form.save(commit=False)
+        link.profile = get_request_profile(request)
+        link.save()
+        return JsonResponse(_link_json(link), status=201)
+
+
+class LinkApiView(
+    LoginRequiredMixin, OwnerRequiredMixin, SingleObjectMixin, View
+):
+    """
+    PATCH {"title"?, "url"?} updates one link, DELETE removes it. Each
+    touches that row (plus the profile's links_updated_at) only.
+    """
+
+    model = Link
+    raise_exception = True
+
+    def get_link(self):
+        link = self.get_object()
+        # Already loaded; saves the signal handlers a query
+        link.profile = get_request_profile(self.request)
+        return link
+
+    def patch(self, request, pk):
+        data = _json_body(request)
+        if data is None:
+            return _bad_request({"__all__": ["Expected a JSON object."]})
+        link = self.get_link()
+        form = LinkForm(
+            {"title": link.title, "url": link.url, **data}, instance=link
+        )
+        if not form.is_valid():
+            return _bad_request(form.errors)
+        if form.has_changed():
+            link = form.save()
+        return JsonResponse(_link_json(link))
+
+    def delete(self, request, pk):
+        self.get_link().delete()
+        return HttpResponse(status=204)
+
+
+class LinkMoveApiView(
+    LoginRequiredMixin, OwnerRequiredMixin, SingleObjectMixin, View
+):
+    """
+    POST {"position": n}: move a link to the n-th place (1-based) in the
+    profile's order. Answers with the new positions of the rows moved.
+    """
+
+    model = Link
+    raise_exception = True
+
+    def post(self, request, pk):
+        data = _json_body(request)
+        index = data.get("position") if data else None
+        if not isinstance(index, int) or isinstance(index, bool) or index < 1:
+            return _bad_request(
+                {"position": ["Expected a whole number from 1."]}
+            )
+        link = self.get_object()
+        with transaction.atomic():
+            moved = _move_link(get_request_profile(request), link, index)
+        return JsonResponse(
+            {"positions": {str(pk): pos for pk, pos in moved.items()}}
+        )
+
+
+class LinkImportView(LoginRequiredMixin, FormView):
+    form_class = LinkImportForm
+    template_name = "profiles/link_import.html"
+    success_url = reverse_lazy("link-list")
+
+    def form_valid(self, form):
+        profile = get_request_profile(self.request)
+        links = import_links(profile, form.cleaned_data["links"])
+        messages.success(self.request, f"Imported {len(links)} links.")
+        return super().form_valid(form)
+
+
 class LinkUpdateView(LoginRequiredMixin, OwnerRequiredMixin, UpdateView):
     model = Link
     fields = ["title", "url"]
@@ -294,7 +600,8 @@ def register(request):
 
         if form.is_valid():
             user = form.save()
-            login(request, user)
+            # Explicit now that ModelBackend is listed too
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
             messages.success(
                 request,
                 "Welcome to OneLink! Your account has been created.",
@@ -312,22 +619,305 @@ def post_login_redirect(request):
     if next_url:
         return redirect(next_url)
 
-    user = request.user
-    handle = (
-        getattr(getattr(user, "profile", None), "handle", None)
-        or user.username
+    profile = get_request_profile(request)
+
+    # Prime the resolver for the public page we're about to send them to
+    remember_handle(profile)
+    return redirect("profile-detail", handle=profile.handle)
+
+
+def _profile_validators(profile):
+    """
+    Strong ETag and Last-Modified timestamp for a public profile page.
+
+    Link edits don't touch Profile.updated_at, so links_updated_at is
+    folded in as well, and so is the build: a deploy that changes the
+    templates or static files changes every page.
+    """
+    changed = max(filter(None, [profile.updated_at, profile.links_updated_at]))
+    raw = ":".join(
+        [
+            build_version(),
+            str(profile.pk),
+            profile.handle,
+            profile.updated_at.isoformat(),
+            profile.links_updated_at.isoformat()
+            if profile.links_updated_at
+            else "",
+        ]
+    )
+    etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+    return etag, int(changed.timestamp())
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, "PUBLIC_PROFILE_MAX_AGE", 0),
+    )
+    return response
+
+
+def _cached_page_response(request, cached):
+    etag, last_modified = cached["etag"], cached["last_modified"]
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    ) or HttpResponse(
+        cached["content"],
+        content_type=cached["content_type"],
+    )
+    return _set_validators(response, etag, last_modified)
+
+
+def _render_public_page(request, profile, links):
+    # public_page keeps base.html off request.user, the session and
+    # messages, so the page is the same for every visitor and carries no
+    # Vary: Cookie. Signed-in visitors get their nav from site_nav.
+    return render(
+        request,
+        "profiles/profile_detail.html",
+        {"profile": profile, "links": links, "public_page": True},
     )
-    return redirect("profile-detail", handle=handle)
 
 
 def public_profile(request, handle):
-    profile = get_object_or_404(Profile, handle=handle.lower())
-    links = profile.links.order_by("position", "id")
+    """
+    Public profile page, rendered identically for every visitor.
+
+    Never reads the session or the user, so a visit costs no session or
+    auth queries and the response may be kept by shared caches
+    (revalidated with the ETag).
+    """
+    cached = get_cached_profile_page(handle)
+    if cached is not None:
+        record_view(cached["profile_id"])
+        return _cached_page_response(request, cached)
+
+    profile = get_profile_for_handle(handle)
+    if profile is None:
+        raise Http404("No such profile.")
+    record_view(profile.pk)
+    etag, last_modified = _profile_validators(profile)
+
+    # Answer revalidations before the links query and template render
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return _set_validators(not_modified, etag, last_modified)
+
+    response = _render_public_page(
+        request, profile, profile.links.order_by("position", "id")
+    )
+    _set_validators(response, etag, last_modified)
+    cache_profile_page(profile, response, etag, last_modified)
+    return response
+
+
+async def public_profile_async(request, handle):
+    """
+    Native async public_profile, routed instead of the sync view when
+    PUBLIC_PROFILE_ASYNC is set (for ASGI deployments). Uses the async
+    cache and ORM; like the sync view it never touches the session.
+    """
+    cached = await aget_cached_profile_page(handle)
+    if cached is not None:
+        record_view(cached["profile_id"])
+        return _cached_page_response(request, cached)
+
+    profile = await aget_profile_for_handle(handle)
+    if profile is None:
+        raise Http404("No such profile.")
+    record_view(profile.pk)
+    etag, last_modified = _profile_validators(profile)
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        return _set_validators(not_modified, etag, last_modified)
+
+    links = [link async for link in profile.links.order_by("position", "id")]
+    response = _render_public_page(request, profile, links)
+    _set_validators(response, etag, last_modified)
+    await acache_profile_page(profile, response, etag, last_modified)
+    return response
+
+
+@never_cache
+def site_nav(request):
+    """
+    The visitor's nav items, login status and flash messages as HTML
+    snippets. app.js swaps them into public pages for signed-in visitors,
+    since those pages are rendered without them.
+    """
+    get_request_profile(request)  # lets the middleware sync the hint cookie
     context = {
-        "profile": profile,
-        "links": links,
+        "nav_view": request.GET.get("view", ""),
+        "nav_handle": request.GET.get("handle", ""),
     }
-    return render(request, "profiles/profile_detail.html", context)
+    return JsonResponse(
+        {
+            slot: render_to_string(f"includes/{name}.html", context, request)
+            for slot, name in (
+                ("nav", "site_nav"),
+                ("status", "login_status"),
+                ("messages", "messages"),
+            )
+        }
+    )
+
+
+@never_cache
+def link_redirect(request, pk):
+    """
+    Count a click and send the visitor on to the link's URL.
+
+    The click is buffered in memory (see profiles.tracking), so the
+    redirect only waits on a primary-key read. never_cache keeps
+    browsers and CDNs from short-circuiting later clicks.
+    """
+    row = Link.objects.filter(pk=pk).values_list("url", "profile_id").first()
+    if row is None:
+        raise Http404("No such link.")
+    url, profile_id = row
+    record_click(pk, profile_id)
+    return HttpResponseRedirect(url)
+
+
+@never_cache
+def handle_availability(request):
+    """
+    JSON availability of ``?handle=`` for the editor's live check, with
+    free alternatives when it's taken. The signed-in user's own handle
+    counts as available.
+    """
+    profile = get_request_profile(request)
+    return JsonResponse(
+        check_handle(
+            request.GET.get("handle", "")[:50],
+            current=profile.handle if profile else None,
+        )
+    )
+
+
+# ---------- Read-only JSON API (v1) ----------
+
+
+def _api_response(request, data, etag, last_modified):
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    ) or JsonResponse(data)
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response, public=True, max_age=getattr(settings, "API_MAX_AGE", 60)
+    )
+    return response
+
+
+def api_profile(request, handle):
+    """A profile and its ordered links, as JSON."""
+    entry = api.get_entries([handle]).get(handle.lower())
+    if entry is None:
+        return JsonResponse({"error": "No such profile."}, status=404)
+    return _api_response(
+        request, entry["data"], quote_etag(entry["etag"]), entry["last_modified"]
+    )
+
+
+def api_profiles(request):
+    """
+    Several profiles at once: ``?handles=a,b,c`` (at most API_BATCH_LIMIT),
+    returned in the order asked for, with unknown handles listed under
+    "missing". Costs no queries when all are cached, two otherwise.
+    """
+    handles = list(
+        dict.fromkeys(
+            h.strip().lstrip("@").lower()
+            for h in request.GET.get("handles", "").split(",")
+            if h.strip().lstrip("@")
+        )
+    )
+    if not handles:
+        return JsonResponse({"error": "Pass ?handles=a,b,c."}, status=400)
+    if len(handles) > api.batch_limit():
+        return JsonResponse(
+            {"error": f"At most {api.batch_limit()} handles per request."},
+            status=400,
+        )
+    found = api.get_entries(handles)
+    entries = [found[h] for h in handles if h in found]
+    etag, last_modified = api.combined_validators(entries)
+    data = {
+        "profiles": [entry["data"] for entry in entries],
+        "missing": [h for h in handles if h not in found],
+    }
+    return _api_response(request, data, etag, last_modified)
+
+
+# ---------- Search ----------
+
+
+def profile_search(request):
+    """Public directory search over handles, display names and bios."""
+    query = request.GET.get("q", "").strip()[:100]
+    results = search_profiles(
+        query, limit=getattr(settings, "SEARCH_RESULTS_LIMIT", 20)
+    ) if query else []
+    return render(
+        request,
+        "profiles/profile_search.html",
+        {"query": query, "results": results},
+    )
+
+
+def handle_autocomplete(request):
+    """
+    JSON handles starting with ``q``, for @mention pickers. The same for
+    every visitor, so browsers and shared caches may keep it briefly.
+    """
+    matches = autocomplete_handles(
+        request.GET.get("q", "")[:15],
+        limit=getattr(settings, "AUTOCOMPLETE_LIMIT", 10),
+    )
+    response = JsonResponse(
+        {
+            "results": [
+                {
+                    "handle": handle,
+                    "display_name": display_name,
+                    "url": reverse("profile-detail", args=[handle]),
+                }
+                for handle, display_name in matches
+            ]
+        }
+    )
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+def _may_scrape_metrics(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    auth = request.headers.get("Authorization", "")
+    if token and auth.startswith("Bearer "):
+        return constant_time_compare(auth[len("Bearer "):], token)
+    return request.user.is_active and request.user.is_staff
+
+
+@never_cache
+def metrics_endpoint(request):
+    """Prometheus scrape target, summed over every worker process."""
+    if not _may_scrape_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 def debug_msg(request):
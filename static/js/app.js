@@ -39,10 +39,82 @@ window.profileLinksEditor = function profileLinksEditor(){
   function getContainer(){
     return document.querySelector('[data-formset-container]') || document.getElementById('linksList');
   }
+  function savedRows(container){
+    return Array.prototype.filter.call(container.querySelectorAll('[data-form-row]'), function(card){
+      var idInput = card.querySelector('input[name$="-id"]');
+      return idInput && idInput.value;
+    });
+  }
+  // Keep the hidden ORDER fields in DOM order, so a later full submit
+  // doesn't undo moves made through the JSON API
+  function syncOrder(container){
+    var cards = container.querySelectorAll('[data-form-row]');
+    for (var i = 0; i < cards.length; i++) {
+      var order = cards[i].querySelector('input[name$="-ORDER"]');
+      if (order) order.value = String(i + 1);
+    }
+  }
+  // Drop a saved row deleted through the API and renumber the rows after
+  // it, so the formset still posts contiguous form indexes
+  function removeFormRow(card){
+    var form = document.querySelector('form.profile-shell');
+    var info = form && getFormsetInfo(form);
+    var container = getContainer();
+    var idInput = card.querySelector('input[name$="-id"]');
+    var m = info && idInput && idInput.name.match(/-(\d+)-id$/);
+    if (card.parentNode) card.parentNode.removeChild(card);
+    if (!m || !container) return;
+    var removed = parseInt(m[1], 10);
+    var re = new RegExp('^(id_)?(' + info.prefix + '-)(\\d+)(-)');
+    var els = container.querySelectorAll('[name], [id], [for]');
+    for (var i = 0; i < els.length; i++) {
+      ['name', 'id', 'for'].forEach(function(attr){
+        var v = els[i].getAttribute(attr);
+        var parts = v && v.match(re);
+        if (parts && parseInt(parts[3], 10) > removed) {
+          els[i].setAttribute(attr, v.replace(re, (parts[1] || '') + parts[2] + (parseInt(parts[3], 10) - 1) + '-'));
+        }
+      });
+    }
+    var initialEl = form.querySelector('input[name="' + info.prefix + '-INITIAL_FORMS"]');
+    [info.totalEl, initialEl].forEach(function(el){
+      if (el) el.value = String(Math.max(0, (parseInt(el.value, 10) || 0) - 1));
+    });
+    syncOrder(container);
+  }
   // ----------------------------------
 
+  // ---- single-link JSON API (see LinkApiView) ----
+  function apiBase(){
+    var container = getContainer();
+    return container ? container.getAttribute('data-link-api') : null;
+  }
+  function linkApi(method, url, data){
+    var token = document.querySelector('input[name="csrfmiddlewaretoken"]');
+    return fetch(url, {
+      method: method,
+      credentials: 'same-origin',
+      headers: {'Content-Type': 'application/json', 'X-CSRFToken': token ? token.value : ''},
+      body: data ? JSON.stringify(data) : undefined
+    }).then(function(r){
+      if (!r.ok && r.status !== 400) throw new Error('HTTP ' + r.status);
+      if (r.status === 204) return {ok: true, body: {}};
+      return r.json().then(function(body){ return {ok: r.ok, body: body}; });
+    });
+  }
+  function firstError(errors){
+    for (var key in errors) {
+      if (errors[key] && errors[key].length) return errors[key][0];
+    }
+    return 'Could not save this link.';
+  }
+  // -------------------------------------------------
+
   return {
     errors: {},
+    handleStatus: '',
+    handleSuggestions: [],
+    _handleTimer: null,
 
     // Control per-row button: "Add" vs "Delete"
     setRowButtonState: function(card, mode){
@@ -115,12 +187,52 @@ window.profileLinksEditor = function profileLinksEditor(){
           this.onLinkFieldBlur(e);
         }.bind(this), true); // capture helps when focus changes quickly
       }
+
+      // Delegated up/down buttons on saved rows
+      if (container) {
+        container.addEventListener('click', function(e){
+          var btn = e.target && e.target.closest ? e.target.closest('[data-move-link]') : null;
+          if (!btn) return;
+          e.preventDefault();
+          this.moveLink(btn.closest('[data-form-row]'), parseInt(btn.getAttribute('data-move-link'), 10));
+        }.bind(this));
+      }
     },
 
     onHandleInput: function(e){
       var v = (e && e.target && e.target.value ? e.target.value : '').toLowerCase().replace(/[^a-z0-9_\\.]/g, '');
       if (e && e.target) e.target.value = v;
       this.errors.handle = (v.length < 5) ? 'Handle must be at least 5 characters.' : '';
+      this.handleStatus = '';
+      this.handleSuggestions = [];
+      clearTimeout(this._handleTimer);
+      if (this.errors.handle || !e || !e.target) return;
+      // Ask the server once typing pauses; drop answers for older input
+      var url = e.target.dataset.availabilityUrl;
+      if (!url) return;
+      this._handleTimer = setTimeout(function(){
+        fetch(url + '?handle=' + encodeURIComponent(v), { credentials: 'same-origin' })
+          .then(function(r){ return r.ok ? r.json() : null; })
+          .then(function(data){
+            if (!data || data.handle !== e.target.value) return;
+            if (data.available) {
+              this.handleStatus = data.message;
+            } else {
+              this.errors.handle = data.message;
+              this.handleSuggestions = data.suggestions || [];
+            }
+          }.bind(this))
+          .catch(function(){});
+      }.bind(this), 300);
+    },
+
+    useHandle: function(handle){
+      var input = document.querySelector('input[name="handle"]');
+      if (!input) return;
+      input.value = handle;
+      this.errors.handle = '';
+      this.handleSuggestions = [];
+      this.saveProfile({ target: input });
     },
 
     updateBioPlaceholder: function(e){
@@ -188,14 +300,51 @@ window.profileLinksEditor = function profileLinksEditor(){
       // Row now has both fields filled → switch button to Delete
       this.setRowButtonState(card, 'delete');
 
-      // Autosave as before
-      var ps = document.querySelector('form.profile-shell');
-      var root = (ps ? ps.closest('body') : null) || document;
-      syncBioToForm(root);
-
       var form = input.form || document.querySelector('form.profile-shell');
-      if (form && form.requestSubmit) { form.requestSubmit(); }
-      else if (form) { form.submit(); } // with novalidate, autosave always posts
+      function submitAll(){
+        // Full formset POST: the fallback when the JSON API isn't there
+        var ps = document.querySelector('form.profile-shell');
+        var root = (ps ? ps.closest('body') : null) || document;
+        syncBioToForm(root);
+        if (form && form.requestSubmit) { form.requestSubmit(); }
+        else if (form) { form.submit(); } // with novalidate, autosave always posts
+      }
+
+      // Save just this row through the JSON API
+      var base = apiBase();
+      if (!base) return submitAll();
+      var idInput = card.querySelector('input[name$="-id"]');
+      var id = idInput && idInput.value;
+      var pill = card.querySelector('[data-edited-pill]');
+      linkApi(id ? 'PATCH' : 'POST', id ? base + id + '/' : base, {title: titleVal, url: urlVal})
+        .then(function(res){
+          if (!res.ok) {
+            if (pill) pill.textContent = firstError(res.body.errors);
+            return;
+          }
+          // A new row needs a fresh render to become an ordinary saved row
+          if (!id) return window.location.reload();
+          if (pill) pill.textContent = 'Saved';
+        })
+        .catch(submitAll);
+    },
+
+    moveLink: function(card, delta){
+      var container = getContainer();
+      var base = apiBase();
+      if (!card || !container || !base) return;
+      var rows = savedRows(container);
+      var from = rows.indexOf(card);
+      var to = from + delta;
+      if (from < 0 || to < 0 || to >= rows.length) return;
+      var id = card.querySelector('input[name$="-id"]').value;
+      linkApi('POST', base + id + '/move/', {position: to + 1})
+        .then(function(res){
+          if (!res.ok) return;
+          container.insertBefore(card, delta < 0 ? rows[to] : rows[to].nextSibling);
+          syncOrder(container);
+        })
+        .catch(function(){});
     },
 
     addLink: function(){
@@ -258,16 +407,24 @@ window.profileLinksEditor = function profileLinksEditor(){
       if(!del) return;
       if(!window.confirm('Delete this link?')) return;
 
-      // Mark for deletion and submit WITHOUT HTML5 validation
-      del.checked = true;
-      var ps = document.querySelector('.profile-shell');
-      var root = (ps ? ps.closest('body') : null) || document;
-      syncBioToForm(root);
-      var f = card.closest ? card.closest('form') : null;
-      var form2 = f || document.querySelector('form.profile-shell');
-      if (form2) {
-        form2.submit();   // bypass validation so delete always posts
+      function submitDelete(){
+        // Mark for deletion and submit WITHOUT HTML5 validation
+        del.checked = true;
+        var ps = document.querySelector('.profile-shell');
+        var root = (ps ? ps.closest('body') : null) || document;
+        syncBioToForm(root);
+        var f = card.closest ? card.closest('form') : null;
+        var form2 = f || document.querySelector('form.profile-shell');
+        if (form2) {
+          form2.submit();   // bypass validation so delete always posts
+        }
       }
+
+      var base = apiBase();
+      if (!base) return submitDelete();
+      linkApi('DELETE', base + idInput.value + '/')
+        .then(function(){ removeFormRow(card); })
+        .catch(submitDelete);
     }
   };
 };
@@ -336,6 +493,28 @@ function gotoHandle() {
 
 
 /** From: onelink/templates/base.html */
+// Public profile pages are rendered the same for everyone so they can be
+// cached; signed-in visitors fetch their own nav, status and messages.
+(function(){
+  var nav = document.querySelector('[data-nav-src]');
+  if (!nav) return;
+  if (document.cookie.split('; ').indexOf('onelink_signed_in=1') === -1) return;
+
+  fetch(nav.getAttribute('data-nav-src'), {
+    credentials: 'same-origin',
+    headers: { 'Accept': 'application/json' }
+  })
+    .then(function(res){ return res.ok ? res.json() : null; })
+    .then(function(slots){
+      if (!slots) return;
+      Object.keys(slots).forEach(function(name){
+        var el = document.querySelector('[data-nav-slot="' + name + '"]');
+        if (el) el.innerHTML = slots[name];
+      });
+    })
+    .catch(function(err){ console.error('Loading nav failed', err); });
+})();
+
 (function(){
   var btn = document.querySelector('.nav-toggle');
   var nav = document.getElementById('site-nav');